@@ -1,18 +1,43 @@
 from flask import Flask, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 from extensions import db, login_manager, migrate
+from utils.db_engine import configure_engine_options, install_engine_profile
+from utils.db_routing import configure_replica_bind, read_replica
+from utils.sql_instrumentation import install_sql_instrumentation
+from utils.metrics import install_metrics
+from utils.sampling_profiler import install_profiler
+from utils.tracing import install_tracing
+from utils.rate_limit import configure_rate_limits
+from utils.compression import install_compression
+from utils.assets import install_assets
+from utils import queries
 from datetime import datetime, timedelta
-from sqlalchemy import func
 import subprocess
 
 def create_app():
     app = Flask(__name__, static_url_path='', static_folder='static')
     app.config.from_object(Config)
+    if app.config.get('TRUSTED_PROXIES'):
+        # request.remote_addr is the client from X-Forwarded-For, not the proxy
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
 
     # Initialize Flask extensions
+    configure_engine_options(app)
+    configure_replica_bind(app)
     db.init_app(app)
+    # First, so its after_request hook sees the final body
+    install_compression(app)
+    install_engine_profile(app, db)
+    install_sql_instrumentation(app, db)
+    install_metrics(app)
+    install_profiler(app)
+    install_tracing(app, db)
+    configure_rate_limits(app)
+    install_assets(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
@@ -25,10 +50,13 @@ def create_app():
     from models.test_session import TestSession
     from models.response import Response
     from models.question import Question
+    from models.domain_score import DomainScore
+    from models.offline_response_stat import OfflineResponseStat
+    from models.question_bank_version import QuestionBankVersion
 
-    @login_manager.user_loader
-    def load_user(id):
-        return User.query.get(int(id))
+    # Cached identity instead of a User SELECT on every request
+    from utils.user_cache import install_user_cache
+    install_user_cache(app, login_manager)
 
     # Register blueprints
     from routes.auth import auth_bp
@@ -41,6 +69,7 @@ def create_app():
     app.register_blueprint(profile_bp)
 
     @app.route('/')
+    @read_replica
     def home():
         user_stats = None
         recent_performance = None
@@ -48,7 +77,7 @@ def create_app():
         
         if current_user.is_authenticated:
             # Get user statistics
-            user_tests = TestSession.query.filter_by(user_id=current_user.id).all()
+            user_tests = queries.user_tests(current_user.id).all()
             
             if user_tests:
                 total_tests = len(user_tests)
@@ -62,10 +91,7 @@ def create_app():
                 check_date = today
                 
                 while True:
-                    has_test = TestSession.query.filter(
-                        TestSession.user_id == current_user.id,
-                        func.date(TestSession.start_time) == check_date
-                    ).first()
+                    has_test = queries.test_on_day(current_user.id, check_date).first()
                     
                     if has_test:
                         streak += 1
@@ -87,18 +113,7 @@ def create_app():
                 
                 # Get recent performance by category (last 7 days)
                 week_ago = datetime.now() - timedelta(days=7)
-                recent_responses = db.session.query(
-                    Question.category,
-                    func.count(Response.id).label('total'),
-                    func.sum(Response.is_correct).label('correct')
-                ).join(
-                    Response, Response.question_id == Question.id
-                ).join(
-                    TestSession, TestSession.id == Response.test_session_id
-                ).filter(
-                    TestSession.user_id == current_user.id,
-                    TestSession.start_time >= week_ago
-                ).group_by(Question.category).all()
+                recent_responses = queries.recent_performance(current_user.id, week_ago).all()
                 
                 recent_performance = {}
                 for category, total, correct in recent_responses:
@@ -111,17 +126,7 @@ def create_app():
             
             # Get weekly leaderboard
             week_ago = datetime.now() - timedelta(days=7)
-            leaderboard_data = db.session.query(
-                User.username,
-                func.avg(TestSession.score).label('avg_score')
-            ).join(
-                TestSession, TestSession.user_id == User.id
-            ).filter(
-                TestSession.start_time >= week_ago,
-                TestSession.end_time.isnot(None)
-            ).group_by(User.id).order_by(
-                func.avg(TestSession.score).desc()
-            ).limit(10).all()
+            leaderboard_data = queries.leaderboard(week_ago).all()
             
             leaderboard = [
                 {'username': username, 'score': round(avg_score, 1)} 
@@ -147,4 +152,6 @@ def create_app():
 app = create_app()
 
 if __name__ == '__main__':
+    from utils.metrics import registry
+    registry.enable_flush()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -4,6 +4,112 @@ class Config:
     # Database configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///iq_test.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Optional read-only replica for analytics reads (routes marked @read_replica).
+    # Locally this can be a second SQLite file kept in sync with scripts/sync_replica.py
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+
+    # Engine profile: "auto" picks "sqlite" or "server" from the database URL,
+    # "default" leaves SQLAlchemy's defaults untouched (see utils/db_engine.py)
+    DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'auto')
+
+    # SQLite profile (applied as PRAGMAs on every new connection)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+
+    # Server profile (PostgreSQL/MySQL connection pool)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+
+    # Per-request SQL counts/timing in the log and the request metrics, and in
+    # X-SQL-* headers for admins or in debug mode (see
+    # utils/sql_instrumentation.py); a statement repeated more than the
+    # threshold within one request is reported as a likely N+1
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') == '1'
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+
+    # Prometheus-style /metrics (see utils/metrics.py). Each serving worker
+    # (wsgi.py) writes its numbers to METRICS_DIR (default <instance>/metrics)
+    # and the endpoint merges them. Scrapes must send METRICS_TOKEN as a bearer
+    # token; without it the endpoint answers 403
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # On-demand sampling profiler controlled from /admin/profiler; captures and
+    # collapsed stacks live in PROFILER_DIR (default <instance>/profiles)
+    PROFILER_DIR = os.environ.get('PROFILER_DIR')
+
+    # tracemalloc snapshots kept per worker for /admin/memory diffs
+    MEMORY_SNAPSHOT_LIMIT = int(os.environ.get('MEMORY_SNAPSHOT_LIMIT', 10))
+
+    # Request tracing (see utils/tracing.py): share of requests traced, where
+    # finished traces go ("memory" ring buffer per worker or a shared "jsonl"
+    # file rotated to TRACE_FILE.1 past TRACE_FILE_MAX_BYTES, 0 = never) and a
+    # cap on spans per trace
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.0))
+    TRACE_SINK = os.environ.get('TRACE_SINK', 'memory')
+    TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', 200))
+    TRACE_FILE = os.environ.get('TRACE_FILE')
+    TRACE_FILE_MAX_BYTES = int(os.environ.get('TRACE_FILE_MAX_BYTES', 50 * 1024 * 1024))
+    TRACE_MAX_SPANS = int(os.environ.get('TRACE_MAX_SPANS', 1000))
+
+    # Per-worker cache of the logged-in user's identity fields (see
+    # utils/user_cache.py); 0 disables it and loads the User row per request
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 30))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+
+    # Number of reverse proxies in front of the app whose X-Forwarded-For /
+    # -Proto / -Host headers are trusted; 0 when clients connect directly.
+    # The rate limits key on the client address this yields
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+    # Token-bucket limits for login/registration as "attempts/seconds", per
+    # client IP, per (username, client IP) pair and per username; the login
+    # username limit counts failed logins only (see utils/rate_limit.py).
+    # The sqlite backend shares buckets between the workers of a host
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE')
+    RATE_LIMIT_LOGIN_IP = os.environ.get('RATE_LIMIT_LOGIN_IP', '30/60')
+    RATE_LIMIT_LOGIN_USERNAME_IP = os.environ.get('RATE_LIMIT_LOGIN_USERNAME_IP', '10/300')
+    RATE_LIMIT_LOGIN_USERNAME = os.environ.get('RATE_LIMIT_LOGIN_USERNAME', '50/900')
+    RATE_LIMIT_REGISTER_IP = os.environ.get('RATE_LIMIT_REGISTER_IP', '10/3600')
+    RATE_LIMIT_REGISTER_USERNAME = os.environ.get('RATE_LIMIT_REGISTER_USERNAME', '5/3600')
+
+    # Compiled question bank written by scripts/compile_question_bank.py
+    # (defaults to <instance>/question_bank.iqb, see utils/question_pack.py).
+    # Question lookups fall back to the database while the file is missing.
+    QUESTION_PACK = os.environ.get('QUESTION_PACK')
+    QUESTION_PACK_ENABLED = os.environ.get('QUESTION_PACK_ENABLED', '1') == '1'
+
+    # gzip/brotli for text responses (see utils/compression.py). Brotli needs
+    # the optional 'brotli' package; levels are gzip 1-9 and brotli 0-11.
+    # Compressed bodies are cached per worker, keyed by the uncompressed body
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1') == '1'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 500))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_LEVEL = int(os.environ.get('COMPRESSION_BROTLI_LEVEL', 4))
+    COMPRESSION_MIMETYPES = [mimetype.strip() for mimetype in os.environ.get(
+        'COMPRESSION_MIMETYPES',
+        'text/html,text/css,text/plain,text/csv,text/javascript,application/javascript,'
+        'application/json,image/svg+xml').split(',') if mimetype.strip()]
+    COMPRESSION_CACHE_SIZE = int(os.environ.get('COMPRESSION_CACHE_SIZE', 64))
+    COMPRESSION_CACHE_MAX_BODY = int(os.environ.get('COMPRESSION_CACHE_MAX_BODY', 1024 * 1024))
+
+    # Fingerprinted CSS/JS bundles written by scripts/build_assets.py (default
+    # static/dist, see utils/assets.py). Templates fall back to the source
+    # files while there is no build or ASSETS_ENABLED is off
+    ASSET_DIR = os.environ.get('ASSET_DIR')
+    ASSETS_ENABLED = os.environ.get('ASSETS_ENABLED', '1') == '1'
+    
+    # Cold-storage segments written by scripts/archive_responses.py
+    # (defaults to <instance>/archive, see utils/response_archive.py)
+    RESPONSE_ARCHIVE_DIR = os.environ.get('RESPONSE_ARCHIVE_DIR')
     
     # Security
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
@@ -1,113 +1,92 @@
 #!/usr/bin/env python3
 """
-Script to create a combined questions file from questions.json and questions2.json
-This creates a single, deduplicated file that contains all the best questions from both sources.
+Script to build one combined question bank from any number of source files.
+
+Sources are given lowest precedence first; a later source wins when ids
+collide (by default questions2.json overrides questions.json). Each source is
+streamed and validated in a worker pool, so banks much larger than memory can
+be merged (see utils/question_bank.py).
+
+    python create_combined_questions.py
+    python create_combined_questions.py static/questions.json static/questions2.json extra.jsonl \
+        --output static/questions_combined.json --errors rejected.jsonl
+    python create_combined_questions.py --dedup-report duplicates.json --auto-merge same-answer
 """
 
+import argparse
 import json
 import sys
+import time
 
-def load_questions_from_file(filepath):
-    """Load questions from a JSON file"""
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Error: File {filepath} not found.")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in {filepath}: {e}")
-        return None
+from utils.question_bank import QuestionBankError, build_bank, print_build_report
+from utils.question_dedup import MERGE_POLICIES, drop_questions, find_duplicates, merged_ids
 
-def combine_questions(questions1, questions2):
-    """
-    Combine questions from both files, removing duplicates.
-    Preference is given to questions2.json as it has better quality questions.
-    """
-    combined = {}
-    
-    # Process questions from both files
-    for data, source in [(questions1, "questions.json"), (questions2, "questions2.json")]:
-        if not data:
-            continue
-            
-        for category, difficulties in data.items():
-            if category not in combined:
-                combined[category] = {"easy": {}, "medium": {}, "hard": {}}
-            
-            for difficulty, questions in difficulties.items():
-                if difficulty not in combined[category]:
-                    combined[category][difficulty] = {}
-                
-                for question in questions:
-                    q_id = question.get('id')
-                    if q_id:
-                        # If question already exists, keep the one from questions2.json (better quality)
-                        if q_id not in combined[category][difficulty] or source == "questions2.json":
-                            combined[category][difficulty][q_id] = {
-                                'question': question,
-                                'source': source
-                            }
-    
-    # Convert back to list format
-    result = {}
-    for category, difficulties in combined.items():
-        result[category] = {}
-        for difficulty, questions in difficulties.items():
-            result[category][difficulty] = [item['question'] for item in questions.values()]
-    
-    return result
+DEFAULT_SOURCES = ['static/questions.json', 'static/questions2.json']
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='Merge question bank files')
+    parser.add_argument('sources', nargs='*', default=DEFAULT_SOURCES,
+                        help='Bank files (JSON or JSONL), lowest precedence first')
+    parser.add_argument('--output', default='static/questions_combined.json',
+                        help='Nested JSON, or JSONL when the name ends in .jsonl')
+    parser.add_argument('--workers', type=int, help='Validation processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Questions per validation task')
+    parser.add_argument('--errors', help='Write invalid questions with their problems to this JSONL file')
+    parser.add_argument('--dedup-report', help='Find near-duplicate questions and write the review report (JSON) here')
+    parser.add_argument('--similarity', type=float, default=0.8, help='Estimated Jaccard similarity for near-duplicates')
+    parser.add_argument('--auto-merge', choices=MERGE_POLICIES, default='off',
+                        help='Drop near-duplicates from the output: same-answer merges those with the same '
+                             'category and correct answer')
+    args = parser.parse_args()
+
     print("🔄 Creating combined questions file...")
     print("=" * 50)
-    
-    # Load questions from both files
-    questions1 = load_questions_from_file('static/questions.json')
-    questions2 = load_questions_from_file('static/questions2.json')
-    
-    if not questions1 and not questions2:
-        print("❌ No valid question files found!")
-        return 1
-    
-    print(f"📁 Loaded questions from:")
-    if questions1:
-        total1 = sum(len(diff_questions) for cat in questions1.values() for diff_questions in cat.values())
-        print(f"   - questions.json: {total1} questions")
-    if questions2:
-        total2 = sum(len(diff_questions) for cat in questions2.values() for diff_questions in cat.values())
-        print(f"   - questions2.json: {total2} questions")
-    
-    # Combine questions and remove duplicates
-    print("\n🔄 Combining questions and removing duplicates...")
-    combined_questions = combine_questions(questions1, questions2)
-    
-    total_combined = sum(len(diff_questions) for cat in combined_questions.values() for diff_questions in cat.values())
-    print(f"📋 Final question count after deduplication: {total_combined}")
-    
-    # Save combined questions
-    output_file = 'static/questions_combined.json'
+
+    started = time.perf_counter()
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(combined_questions, f, indent=2, ensure_ascii=False)
-        
-        print(f"\n✅ Combined questions saved to: {output_file}")
-        
-        # Show statistics
-        print(f"\n📊 Statistics by category:")
-        for category, difficulties in combined_questions.items():
-            easy_count = len(difficulties.get('easy', []))
-            medium_count = len(difficulties.get('medium', []))
-            hard_count = len(difficulties.get('hard', []))
-            total_cat = easy_count + medium_count + hard_count
-            print(f"   {category}: {total_cat} total (Easy: {easy_count}, Medium: {medium_count}, Hard: {hard_count})")
-        
-        return 0
-        
-    except Exception as e:
-        print(f"❌ Error saving combined file: {e}")
+        report = build_bank(args.sources, args.output, workers=args.workers, chunk_size=args.chunk_size,
+                            errors_path=args.errors)
+    except (OSError, QuestionBankError) as e:
+        print(f"❌ Error building combined file: {e}")
         return 1
 
+    print_build_report(report)
+
+    if args.dedup_report or args.auto_merge != 'off':
+        print("\n🔎 Looking for near-duplicate questions...")
+        duplicates = find_duplicates(args.output, threshold=args.similarity, policy=args.auto_merge,
+                                     workers=args.workers, chunk_size=args.chunk_size)
+        similar = sum(len(cluster['duplicates']) for cluster in duplicates['clusters'])
+        print(f"   {len(duplicates['clusters'])} clusters, {similar} near-duplicates "
+              f"({duplicates['candidate_pairs']} candidate pairs compared)")
+        if args.dedup_report:
+            with open(args.dedup_report, 'w', encoding='utf-8') as f:
+                json.dump(duplicates, f, indent=2, ensure_ascii=False)
+            print(f"   Review report saved to: {args.dedup_report}")
+        merged = merged_ids(duplicates)
+        if merged:
+            print(f"   Merged (dropped from output): {drop_questions(args.output, merged)}")
+            for cluster in duplicates['clusters']:
+                for duplicate in cluster['duplicates']:
+                    if duplicate['merge']:
+                        report.counts[(duplicate['category'], duplicate['difficulty'])] -= 1
+
+    print(f"\n✅ Combined questions saved to: {args.output} ({time.perf_counter() - started:.2f}s)")
+
+    # Show statistics
+    print(f"\n📊 Statistics by category:")
+    categories = {}
+    for (category, difficulty), count in report.counts.items():
+        categories.setdefault(category, {})[difficulty] = count
+    for category, difficulties in categories.items():
+        easy_count = difficulties.get('easy', 0)
+        medium_count = difficulties.get('medium', 0)
+        hard_count = difficulties.get('hard', 0)
+        total_cat = easy_count + medium_count + hard_count
+        print(f"   {category}: {total_cat} total (Easy: {easy_count}, Medium: {medium_count}, Hard: {hard_count})")
+
+    return 0 if report.total else 1
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,61 @@
+"""Add full-text search index over questions
+
+Revision ID: 3f9c2a7d1b84
+Revises: 00e3a26a95b1
+Create Date: 2026-10-19 09:12:41.203518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b84'
+down_revision = '00e3a26a95b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other backends use the LIKE fallback in utils/question_search.py
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS question_fts USING fts5(
+            question_text, options,
+            content='question', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS question_fts_ai AFTER INSERT ON question BEGIN
+            INSERT INTO question_fts(rowid, question_text, options)
+            VALUES (new.rowid, new.question_text, new.options);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS question_fts_ad AFTER DELETE ON question BEGIN
+            INSERT INTO question_fts(question_fts, rowid, question_text, options)
+            VALUES ('delete', old.rowid, old.question_text, old.options);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS question_fts_au AFTER UPDATE ON question BEGIN
+            INSERT INTO question_fts(question_fts, rowid, question_text, options)
+            VALUES ('delete', old.rowid, old.question_text, old.options);
+            INSERT INTO question_fts(rowid, question_text, options)
+            VALUES (new.rowid, new.question_text, new.options);
+        END
+    """)
+    op.execute("INSERT INTO question_fts(question_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute('DROP TRIGGER IF EXISTS question_fts_au')
+    op.execute('DROP TRIGGER IF EXISTS question_fts_ad')
+    op.execute('DROP TRIGGER IF EXISTS question_fts_ai')
+    op.execute('DROP TABLE IF EXISTS question_fts')
@@ -0,0 +1,28 @@
+"""Add packed response blob to test sessions
+
+Revision ID: 5a2e9c7b3f16
+Revises: c4d7f1a9e235
+Create Date: 2026-10-19 15:27:06.331874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a2e9c7b3f16'
+down_revision = 'c4d7f1a9e235'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('test_session', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('packed_responses', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    # Packed sessions have no Response rows left; unpack them first with
+    # scripts/pack_responses.py --unpack or their answers are lost
+    with op.batch_alter_table('test_session', schema=None) as batch_op:
+        batch_op.drop_column('packed_responses')
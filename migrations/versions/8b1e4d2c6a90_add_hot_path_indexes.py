@@ -0,0 +1,44 @@
+"""Add secondary indexes for hot query paths
+
+Revision ID: 8b1e4d2c6a90
+Revises: 3f9c2a7d1b84
+Create Date: 2026-10-19 11:04:18.557102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4d2c6a90'
+down_revision = '3f9c2a7d1b84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('response', schema=None) as batch_op:
+        batch_op.create_index('ix_response_test_session_id', ['test_session_id'], unique=False)
+        batch_op.create_index('ix_response_question_id', ['question_id'], unique=False)
+
+    with op.batch_alter_table('test_session', schema=None) as batch_op:
+        batch_op.create_index('ix_test_session_user_id_start_time', ['user_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_test_session_start_time', ['start_time'], unique=False)
+        batch_op.create_index('ix_test_session_end_time', ['end_time'], unique=False)
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.create_index('ix_question_category_difficulty', ['category', 'difficulty'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_index('ix_question_category_difficulty')
+
+    with op.batch_alter_table('test_session', schema=None) as batch_op:
+        batch_op.drop_index('ix_test_session_end_time')
+        batch_op.drop_index('ix_test_session_start_time')
+        batch_op.drop_index('ix_test_session_user_id_start_time')
+
+    with op.batch_alter_table('response', schema=None) as batch_op:
+        batch_op.drop_index('ix_response_question_id')
+        batch_op.drop_index('ix_response_test_session_id')
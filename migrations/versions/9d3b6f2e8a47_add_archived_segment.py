@@ -0,0 +1,28 @@
+"""Add archived segment to test sessions
+
+Revision ID: 9d3b6f2e8a47
+Revises: 5a2e9c7b3f16
+Create Date: 2026-10-19 16:48:12.507213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3b6f2e8a47'
+down_revision = '5a2e9c7b3f16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('test_session', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_segment', sa.String(length=7), nullable=True))
+
+
+def downgrade():
+    # Archived sessions keep their answers only in the segment files; restore
+    # them first with scripts/archive_responses.py --restore or they are lost
+    with op.batch_alter_table('test_session', schema=None) as batch_op:
+        batch_op.drop_column('archived_segment')
@@ -0,0 +1,87 @@
+"""Record the question bank version in one row and backfill content hashes
+
+Revision ID: a8c4e2f7d316
+Revises: f5b8d3a1c6e9
+Create Date: 2026-10-20 14:08:33.527914
+
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c4e2f7d316'
+down_revision = 'f5b8d3a1c6e9'
+branch_labels = None
+depends_on = None
+
+
+# models.question.CONTENT_FIELDS and content_hash() as of this revision
+CONTENT_FIELDS = ('question_text', 'options', 'correct_answer', 'category', 'difficulty', 'question_type',
+                  'points', 'display_time', 'length', 'input_type', 'time_limit')
+
+question = sa.table(
+    'question',
+    sa.column('id', sa.String),
+    sa.column('content_hash', sa.String),
+    sa.column('question_text', sa.String),
+    sa.column('options', sa.JSON),
+    sa.column('correct_answer', sa.String),
+    sa.column('category', sa.String),
+    sa.column('difficulty', sa.String),
+    sa.column('question_type', sa.String),
+    sa.column('points', sa.Integer),
+    sa.column('display_time', sa.Integer),
+    sa.column('length', sa.Integer),
+    sa.column('input_type', sa.String),
+    sa.column('time_limit', sa.Integer),
+)
+
+
+def _content_hash(values):
+    payload = json.dumps([values.get(field) for field in CONTENT_FIELDS],
+                         sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _bank_version(pairs):
+    # utils.question_pack.bank_digest(), shortened like bank_version()
+    digest = hashlib.sha256()
+    for question_id, content_hash in sorted(pairs):
+        digest.update(f'{question_id}\x00{content_hash or ""}\n'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def upgrade():
+    op.create_table('question_bank_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.String(length=16), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # b7f3c1e9d254 left content_hash NULL on existing rows
+    bind = op.get_bind()
+    columns = [question.c[field] for field in CONTENT_FIELDS]
+    legacy = bind.execute(sa.select(question.c.id, *columns).where(question.c.content_hash.is_(None))).all()
+    for row in legacy:
+        bind.execute(
+            question.update().where(question.c.id == row[0])
+            .values(content_hash=_content_hash(dict(zip(CONTENT_FIELDS, row[1:]))))
+        )
+
+    pairs = bind.execute(sa.select(question.c.id, question.c.content_hash)).all()
+    op.bulk_insert(
+        sa.table('question_bank_version', sa.column('id', sa.Integer), sa.column('version', sa.String),
+                 sa.column('updated_at', sa.DateTime)),
+        [{'id': 1, 'version': _bank_version(pairs), 'updated_at': datetime.utcnow()}]
+    )
+
+
+def downgrade():
+    # The backfilled hashes stay: they are what ingestion would write anyway
+    op.drop_table('question_bank_version')
@@ -0,0 +1,57 @@
+"""Add content hash to questions
+
+Revision ID: b7f3c1e9d254
+Revises: 9d3b6f2e8a47
+Create Date: 2026-10-19 21:05:37.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7f3c1e9d254'
+down_revision = '9d3b6f2e8a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+    # Existing rows are hashed by the next ingestion run, which compares their
+    # stored columns and fills in the hash without rewriting unchanged content
+
+
+def downgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
+
+    # On SQLite the batch copy renumbered question rowids and dropped the
+    # full-text triggers of 3f9c2a7d1b84; restore both
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite' or bind.execute(sa.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'question_fts'"
+    )).first() is None:
+        return
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS question_fts_ai AFTER INSERT ON question BEGIN
+            INSERT INTO question_fts(rowid, question_text, options)
+            VALUES (new.rowid, new.question_text, new.options);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS question_fts_ad AFTER DELETE ON question BEGIN
+            INSERT INTO question_fts(question_fts, rowid, question_text, options)
+            VALUES ('delete', old.rowid, old.question_text, old.options);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS question_fts_au AFTER UPDATE ON question BEGIN
+            INSERT INTO question_fts(question_fts, rowid, question_text, options)
+            VALUES ('delete', old.rowid, old.question_text, old.options);
+            INSERT INTO question_fts(rowid, question_text, options)
+            VALUES (new.rowid, new.question_text, new.options);
+        END
+    """)
+    op.execute("INSERT INTO question_fts(question_fts) VALUES ('rebuild')")
@@ -0,0 +1,101 @@
+"""Normalize domain scores into their own table
+
+Revision ID: c4d7f1a9e235
+Revises: 8b1e4d2c6a90
+Create Date: 2026-10-19 13:41:52.918230
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d7f1a9e235'
+down_revision = '8b1e4d2c6a90'
+branch_labels = None
+depends_on = None
+
+
+test_session = sa.table(
+    'test_session',
+    sa.column('id', sa.Integer),
+    sa.column('domain_scores', sa.JSON),
+    sa.column('confidence_interval', sa.JSON),
+)
+
+
+def _decode(value):
+    # calculate_score used to json.dumps() into a JSON column, so values may be
+    # a JSON string holding another JSON document
+    try:
+        while isinstance(value, str):
+            value = json.loads(value)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def upgrade():
+    op.create_table('domain_score',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('test_session_id', sa.Integer(), nullable=False),
+        sa.Column('domain', sa.String(length=50), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['test_session_id'], ['test_session.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('test_session_id', 'domain', name='uq_domain_score_session_domain')
+    )
+    with op.batch_alter_table('domain_score', schema=None) as batch_op:
+        batch_op.create_index('ix_domain_score_domain_score', ['domain', 'score'], unique=False)
+
+    # Backfill rows and rewrite the JSON columns as single-encoded documents
+    bind = op.get_bind()
+    domain_score = sa.table(
+        'domain_score',
+        sa.column('test_session_id', sa.Integer),
+        sa.column('domain', sa.String),
+        sa.column('score', sa.Integer),
+    )
+    sessions = bind.execute(
+        sa.select(test_session.c.id, test_session.c.domain_scores, test_session.c.confidence_interval)
+        .where(sa.or_(test_session.c.domain_scores.isnot(None), test_session.c.confidence_interval.isnot(None)))
+    ).all()
+
+    rows = []
+    for session_id, domain_scores, confidence_interval in sessions:
+        scores = _decode(domain_scores)
+        interval = _decode(confidence_interval)
+        for domain, score in (scores or {}).items():
+            try:
+                rows.append({'test_session_id': session_id, 'domain': domain, 'score': int(round(float(score)))})
+            except (TypeError, ValueError):
+                continue
+        bind.execute(
+            test_session.update().where(test_session.c.id == session_id)
+            .values(domain_scores=scores, confidence_interval=interval)
+        )
+
+    if rows:
+        op.bulk_insert(domain_score, rows)
+
+
+def downgrade():
+    # Restore the double-encoded strings the previous code expects
+    bind = op.get_bind()
+    sessions = bind.execute(
+        sa.select(test_session.c.id, test_session.c.domain_scores, test_session.c.confidence_interval)
+    ).all()
+    for session_id, domain_scores, confidence_interval in sessions:
+        bind.execute(
+            test_session.update().where(test_session.c.id == session_id).values(
+                domain_scores=json.dumps(domain_scores) if domain_scores is not None else None,
+                confidence_interval=json.dumps(confidence_interval) if confidence_interval is not None else None
+            )
+        )
+
+    with op.batch_alter_table('domain_score', schema=None) as batch_op:
+        batch_op.drop_index('ix_domain_score_domain_score')
+
+    op.drop_table('domain_score')
@@ -0,0 +1,42 @@
+"""Add running totals of packed and archived responses
+
+Revision ID: e2a6c9f4b713
+Revises: b7f3c1e9d254
+Create Date: 2026-10-19 23:12:40.631508
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a6c9f4b713'
+down_revision = 'b7f3c1e9d254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('offline_response_stat',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('question_id', sa.String(length=10), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('correct', sa.Integer(), nullable=False),
+        sa.Column('time_sum', sa.Float(), nullable=False),
+        sa.Column('time_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'question_id', name='uq_offline_response_stat_user_question')
+    )
+    with op.batch_alter_table('offline_response_stat', schema=None) as batch_op:
+        batch_op.create_index('ix_offline_response_stat_question_id', ['question_id'], unique=False)
+    # Sessions packed or archived before this revision are counted by
+    # scripts/pack_responses.py --rebuild-stats
+
+
+def downgrade():
+    with op.batch_alter_table('offline_response_stat', schema=None) as batch_op:
+        batch_op.drop_index('ix_offline_response_stat_question_id')
+
+    op.drop_table('offline_response_stat')
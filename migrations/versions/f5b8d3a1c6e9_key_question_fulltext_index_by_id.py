@@ -0,0 +1,116 @@
+"""Key the question full-text index by question id
+
+Revision ID: f5b8d3a1c6e9
+Revises: e2a6c9f4b713
+Create Date: 2026-10-20 09:27:15.804163
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b8d3a1c6e9'
+down_revision = 'e2a6c9f4b713'
+branch_labels = None
+depends_on = None
+
+
+DROP = [
+    'DROP TRIGGER IF EXISTS question_fts_au',
+    'DROP TRIGGER IF EXISTS question_fts_ad',
+    'DROP TRIGGER IF EXISTS question_fts_ai',
+    'DROP TABLE IF EXISTS question_fts',
+    'DROP TABLE IF EXISTS question_fts_key',
+]
+
+
+def upgrade():
+    # The external-content index joined on question.rowid, which a batch
+    # rebuild of the question table renumbers (and whose triggers it drops).
+    # The new index stores its own copy of the text next to question.id;
+    # question_fts_key gives each question a stable FTS rowid so the triggers
+    # delete through an index instead of scanning for the id.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for statement in DROP:
+        op.execute(statement)
+    op.execute("""
+        CREATE VIRTUAL TABLE question_fts USING fts5(
+            id UNINDEXED, question_text, options,
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TABLE question_fts_key (
+            fts_rowid INTEGER PRIMARY KEY,
+            id VARCHAR(10) NOT NULL UNIQUE
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER question_fts_ai AFTER INSERT ON question BEGIN
+            INSERT OR IGNORE INTO question_fts_key(id) VALUES (new.id);
+            INSERT INTO question_fts(rowid, id, question_text, options)
+            VALUES ((SELECT fts_rowid FROM question_fts_key WHERE id = new.id),
+                    new.id, new.question_text, new.options);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER question_fts_ad AFTER DELETE ON question BEGIN
+            DELETE FROM question_fts WHERE rowid = (SELECT fts_rowid FROM question_fts_key WHERE id = old.id);
+            DELETE FROM question_fts_key WHERE id = old.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER question_fts_au AFTER UPDATE ON question BEGIN
+            DELETE FROM question_fts WHERE rowid = (SELECT fts_rowid FROM question_fts_key WHERE id = old.id);
+            DELETE FROM question_fts_key WHERE id = old.id;
+            INSERT OR IGNORE INTO question_fts_key(id) VALUES (new.id);
+            INSERT INTO question_fts(rowid, id, question_text, options)
+            VALUES ((SELECT fts_rowid FROM question_fts_key WHERE id = new.id),
+                    new.id, new.question_text, new.options);
+        END
+    """)
+    op.execute("INSERT INTO question_fts_key(id) SELECT id FROM question")
+    op.execute("""
+        INSERT INTO question_fts(rowid, id, question_text, options)
+        SELECT k.fts_rowid, q.id, q.question_text, q.options
+        FROM question q JOIN question_fts_key k ON k.id = q.id
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for statement in DROP:
+        op.execute(statement)
+    op.execute("""
+        CREATE VIRTUAL TABLE question_fts USING fts5(
+            question_text, options,
+            content='question', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER question_fts_ai AFTER INSERT ON question BEGIN
+            INSERT INTO question_fts(rowid, question_text, options)
+            VALUES (new.rowid, new.question_text, new.options);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER question_fts_ad AFTER DELETE ON question BEGIN
+            INSERT INTO question_fts(question_fts, rowid, question_text, options)
+            VALUES ('delete', old.rowid, old.question_text, old.options);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER question_fts_au AFTER UPDATE ON question BEGIN
+            INSERT INTO question_fts(question_fts, rowid, question_text, options)
+            VALUES ('delete', old.rowid, old.question_text, old.options);
+            INSERT INTO question_fts(rowid, question_text, options)
+            VALUES (new.rowid, new.question_text, new.options);
+        END
+    """)
+    op.execute("INSERT INTO question_fts(question_fts) VALUES ('rebuild')")
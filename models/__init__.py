@@ -3,5 +3,9 @@ from .user import User
 from .question import Question
 from .test_session import TestSession
 from .response import Response
+from .domain_score import DomainScore
+from .offline_response_stat import OfflineResponseStat
+from .question_bank_version import QuestionBankVersion
 
-__all__ = ['db', 'User', 'Question', 'TestSession', 'Response']
+__all__ = ['db', 'User', 'Question', 'TestSession', 'Response', 'DomainScore', 'OfflineResponseStat',
+           'QuestionBankVersion']
@@ -0,0 +1,16 @@
+from extensions import db
+
+class DomainScore(db.Model):
+    """One row per (test session, cognitive domain) index score"""
+    __table_args__ = (
+        db.UniqueConstraint('test_session_id', 'domain', name='uq_domain_score_session_domain'),
+        db.Index('ix_domain_score_domain_score', 'domain', 'score'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    test_session_id = db.Column(db.Integer, db.ForeignKey('test_session.id'), nullable=False)
+    domain = db.Column(db.String(50), nullable=False)  # e.g. "Working Memory"
+    score = db.Column(db.Integer, nullable=False)  # age-adjusted index score (mean=100, SD=15)
+
+    def __repr__(self):
+        return f'<DomainScore {self.test_session_id} {self.domain}={self.score}>'
@@ -0,0 +1,23 @@
+from extensions import db
+
+class OfflineResponseStat(db.Model):
+    """
+    Running totals of the answers that are no longer Response rows (packed or
+    archived sessions), one row per (user, question). Kept up to date by
+    utils/response_store.py when rows are packed, archived or restored.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'question_id', name='uq_offline_response_stat_user_question'),
+        db.Index('ix_offline_response_stat_question_id', 'question_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    question_id = db.Column(db.String(10), nullable=False)  # no FK: the question may be pruned from the bank later
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    time_sum = db.Column(db.Float, nullable=False, default=0.0)
+    time_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<OfflineResponseStat {self.user_id} {self.question_id} {self.correct}/{self.attempts}>'
@@ -1,7 +1,28 @@
+import hashlib
+import json
+
+from sqlalchemy import event
+
 from extensions import db
 from datetime import datetime
 
+# Columns that define a question's content; content_hash covers exactly these
+CONTENT_FIELDS = ('question_text', 'options', 'correct_answer', 'category', 'difficulty', 'question_type',
+                  'points', 'display_time', 'length', 'input_type', 'time_limit')
+
+
+def content_hash(values):
+    """sha256 of the content fields of a row dict, stable across runs and backends"""
+    payload = json.dumps([values.get(field) for field in CONTENT_FIELDS],
+                         sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
 class Question(db.Model):
+    __table_args__ = (
+        db.Index('ix_question_category_difficulty', 'category', 'difficulty'),
+    )
+
     id = db.Column(db.String(10), primary_key=True)  # e.g., "vc_e1"
     question_text = db.Column(db.String(500), nullable=False)
     options = db.Column(db.JSON)  # Store options as JSON array
@@ -14,8 +35,20 @@ class Question(db.Model):
     length = db.Column(db.Integer)  # for digit-span questions
     input_type = db.Column(db.String(20))  # "text", "multiple-choice"
     time_limit = db.Column(db.Integer)  # time limit in seconds
+    content_hash = db.Column(db.String(64))  # see content_hash(); lets ingestion skip unchanged rows
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     responses = db.relationship('Response', backref='question', lazy=True)
 
+    def compute_content_hash(self):
+        return content_hash({field: getattr(self, field) for field in CONTENT_FIELDS})
+
     def __repr__(self):
         return f'<Question {self.id}: {self.question_text[:30]}...>'
+
+
+@event.listens_for(Question, 'before_insert')
+@event.listens_for(Question, 'before_update')
+def _refresh_content_hash(mapper, connection, target):
+    # Unit-of-work writes (admin edits, scripts adding Question objects); bulk
+    # ingestion computes the hash itself in utils/question_ingest.py
+    target.content_hash = target.compute_content_hash()
@@ -0,0 +1,16 @@
+from extensions import db
+from datetime import datetime
+
+class QuestionBankVersion(db.Model):
+    """
+    Single row holding the current bank digest (see utils/question_pack.py).
+    Rewritten in the same transaction as every commit that changes the
+    question table, so workers learn of a change by reading one row instead
+    of hashing the bank.
+    """
+    id = db.Column(db.Integer, primary_key=True)  # always 1
+    version = db.Column(db.String(16), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<QuestionBankVersion {self.version}>'
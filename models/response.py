@@ -2,6 +2,11 @@ from extensions import db
 from datetime import datetime
 
 class Response(db.Model):
+    __table_args__ = (
+        db.Index('ix_response_test_session_id', 'test_session_id'),
+        db.Index('ix_response_question_id', 'question_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     test_session_id = db.Column(db.Integer, db.ForeignKey('test_session.id'), nullable=False)
     question_id = db.Column(db.String(10), db.ForeignKey('question.id'), nullable=False)  # Changed to String to match Question.id
@@ -3,6 +3,12 @@ from datetime import datetime
 import json
 
 class TestSession(db.Model):
+    __table_args__ = (
+        db.Index('ix_test_session_user_id_start_time', 'user_id', 'start_time'),
+        db.Index('ix_test_session_start_time', 'start_time'),
+        db.Index('ix_test_session_end_time', 'end_time'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
@@ -16,45 +22,77 @@ class TestSession(db.Model):
     domain_scores = db.Column(db.JSON)
     confidence_interval = db.Column(db.JSON)
     reliability_coefficient = db.Column(db.Float)
+    # Answers of finished sessions packed by scripts/pack_responses.py (see utils/response_packing.py)
+    packed_responses = db.deferred(db.Column(db.LargeBinary))
+    # "YYYY-MM" segment holding the answers once moved to cold storage (see utils/response_archive.py)
+    archived_segment = db.Column(db.String(7))
+    domain_score_rows = db.relationship('DomainScore', backref='test_session', lazy=True,
+                                        cascade='all, delete-orphan', order_by='DomainScore.id')
 
-    def calculate_score(self, user_age=18):
-        """Calculate IQ score using scientific methodology"""
+    def calculate_score(self, user_age=18, responses=None):
+        """Calculate IQ score using scientific methodology (from the stored responses unless given)"""
         # Import here to avoid circular imports
         from utils.iq_calculator import ScientificIQCalculator
+        from utils.response_store import get_session_responses
         
         calculator = ScientificIQCalculator()
         
-        # Calculate scientific IQ score
-        results = calculator.calculate_fsiq(self.responses, user_age)
+        # Calculate scientific IQ score (packed and archived sessions have no Response rows)
+        if responses is None:
+            responses = get_session_responses(self, with_questions=True)
+        results = calculator.calculate_fsiq(responses, user_age)
         
         # Update all the scientific metrics
         self.fsiq = results['fsiq']
         self.score = results['fsiq']  # Set score to IQ score for compatibility
         self.percentile = results['percentile_rank']
         self.classification = results['classification']['level']
-        self.domain_scores = json.dumps(results['domain_scores'])
-        self.confidence_interval = json.dumps(results['confidence_intervals'])
+        self.set_domain_scores(results['domain_scores'])
+        self.confidence_interval = results['confidence_intervals']
         self.reliability_coefficient = results['reliability']['coefficient']
         
         return self.score
 
+    def set_domain_scores(self, scores):
+        """Store domain scores both as normalized rows and as the JSON summary"""
+        from models.domain_score import DomainScore
+
+        cleaned = {}
+        for domain, score in (scores or {}).items():
+            try:
+                cleaned[domain] = int(round(float(score)))
+            except (TypeError, ValueError):
+                continue
+
+        self.domain_scores = cleaned
+        existing = {row.domain: row for row in self.domain_score_rows}
+        for domain, score in cleaned.items():
+            if domain in existing:
+                existing.pop(domain).score = score
+            else:
+                self.domain_score_rows.append(DomainScore(domain=domain, score=score))
+        for row in existing.values():
+            self.domain_score_rows.remove(row)
+
     def get_domain_scores_dict(self):
         """Get domain scores as a dictionary"""
-        if self.domain_scores:
-            try:
-                return json.loads(self.domain_scores)
-            except (json.JSONDecodeError, TypeError):
-                return {}
-        return {}
+        if self.domain_score_rows:
+            return {row.domain: row.score for row in self.domain_score_rows}
+        return _decode_json(self.domain_scores)
 
     def get_confidence_interval_dict(self):
         """Get confidence interval as a dictionary"""
-        if self.confidence_interval:
-            try:
-                return json.loads(self.confidence_interval)
-            except (json.JSONDecodeError, TypeError):
-                return {}
-        return {}
+        return _decode_json(self.confidence_interval)
 
     def __repr__(self):
         return f'<TestSession {self.id} - User {self.user_id}>'
+
+
+def _decode_json(value):
+    """Decode a JSON column value, including legacy double-encoded strings"""
+    try:
+        while isinstance(value, str):
+            value = json.loads(value)
+    except json.JSONDecodeError:
+        return {}
+    return value if isinstance(value, dict) else {}
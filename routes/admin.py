@@ -1,11 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response as HTTPResponse, stream_with_context, current_app, abort
 from flask_login import login_required, current_user
 from models.user import User
 from models.question import Question
 from models.test_session import TestSession
-from models.response import Response
 from extensions import db
+from utils import queries
+from utils.db_routing import read_replica
+from utils.question_pack import refresh_pack
+from utils.question_search import search_questions
+from utils.response_store import offline_response_stats, merge_success_stats
+from utils.response_export import stream_export, ExportError, EXPORT_FORMATS
+from utils.memory_profiling import (MemoryProfilingError, cache_sizes, diff_snapshots, start_tracing,
+                                     stop_tracing, take_snapshot, top_allocations, tracing_status)
+from utils.tracing import get_trace, recent_traces
+from utils.sampling_profiler import (ProfilerError, collapsed_stacks, list_captures, profiler_dir,
+                                     read_capture, start_capture, stop_capture)
 from functools import wraps
+from datetime import datetime
+import time
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -23,7 +35,7 @@ def dashboard():
     questions_count = Question.query.count()
     users_count = User.query.count()
     tests_count = TestSession.query.count()
-    recent_tests = TestSession.query.order_by(TestSession.start_time.desc()).limit(5).all()
+    recent_tests = queries.recent_tests().all()
     
     return render_template('admin/dashboard.html',
                          questions_count=questions_count,
@@ -34,8 +46,39 @@ def dashboard():
 @admin_bp.route('/questions')
 @admin_required
 def questions():
-    questions = Question.query.order_by(Question.category, Question.difficulty).all()
-    return render_template('admin/questions.html', questions=questions)
+    query = request.args.get('q', '').strip()
+    if query:
+        questions = [question for question, rank in search_questions(query, limit=200)]
+    else:
+        questions = Question.query.order_by(Question.category, Question.difficulty).all()
+    return render_template('admin/questions.html', questions=questions, query=query)
+
+@admin_bp.route('/questions/search')
+@admin_required
+def search_questions_api():
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 50, type=int), 500)
+
+    started = time.perf_counter()
+    results = search_questions(query, limit=limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    return jsonify({
+        'query': query,
+        'count': len(results),
+        'elapsed_ms': round(elapsed_ms, 2),
+        'results': [
+            {
+                'id': question.id,
+                'question': question.question_text,
+                'options': question.options or [],
+                'category': question.category,
+                'difficulty': question.difficulty,
+                'rank': rank
+            }
+            for question, rank in results
+        ]
+    })
 
 @admin_bp.route('/question/add', methods=['GET', 'POST'])
 @admin_required
@@ -50,11 +93,12 @@ def add_question():
         )
         db.session.add(question)
         db.session.commit()
+        refresh_pack()
         flash('Question added successfully!', 'success')
         return redirect(url_for('admin.questions'))
     return render_template('admin/question_form.html')
 
-@admin_bp.route('/question/<int:id>/edit', methods=['GET', 'POST'])
+@admin_bp.route('/question/<id>/edit', methods=['GET', 'POST'])
 @admin_required
 def edit_question(id):
     question = Question.query.get_or_404(id)
@@ -65,16 +109,19 @@ def edit_question(id):
         question.category = request.form['category']
         question.difficulty = int(request.form['difficulty'])
         db.session.commit()
+        # Grading reads the compiled pack; rebuild it from what was just committed
+        refresh_pack()
         flash('Question updated successfully!', 'success')
         return redirect(url_for('admin.questions'))
     return render_template('admin/question_form.html', question=question)
 
-@admin_bp.route('/question/<int:id>/delete', methods=['POST'])
+@admin_bp.route('/question/<id>/delete', methods=['POST'])
 @admin_required
 def delete_question(id):
     question = Question.query.get_or_404(id)
     db.session.delete(question)
     db.session.commit()
+    refresh_pack()
     flash('Question deleted successfully!', 'success')
     return redirect(url_for('admin.questions'))
 
@@ -86,27 +133,219 @@ def users():
 
 @admin_bp.route('/statistics')
 @admin_required
+@read_replica
 def statistics():
     # Get overall statistics
     total_tests = TestSession.query.count()
     avg_score = db.session.query(db.func.avg(TestSession.score)).scalar() or 0
     
+    # Responses of packed or archived sessions are no longer rows; aggregate them separately
+    offline_stats = offline_response_stats()
+
     # Get statistics by category
-    category_stats = db.session.query(
-        Question.category,
-        db.func.count(Response.id).label('attempts'),
-        db.func.avg(Response.is_correct).label('success_rate')
-    ).join(Response).group_by(Question.category).all()
+    category_stats = merge_success_stats(queries.success_stats(Question.category).all(),
+                                         offline_stats['category'], 'category')
     
     # Get statistics by difficulty
-    difficulty_stats = db.session.query(
-        Question.difficulty,
-        db.func.count(Response.id).label('attempts'),
-        db.func.avg(Response.is_correct).label('success_rate')
-    ).join(Response).group_by(Question.difficulty).all()
+    difficulty_stats = merge_success_stats(queries.success_stats(Question.difficulty).all(),
+                                           offline_stats['difficulty'], 'difficulty')
+
+    # Get index score distribution by cognitive domain
+    domain_stats = queries.domain_stats().all()
     
     return render_template('admin/statistics.html',
                          total_tests=total_tests,
                          avg_score=round(avg_score, 2),
                          category_stats=category_stats,
-                         difficulty_stats=difficulty_stats)
+                         difficulty_stats=difficulty_stats,
+                         domain_stats=domain_stats)
+
+@admin_bp.route('/export/<dataset>')
+@admin_required
+def export(dataset):
+    fmt = request.args.get('format', 'csv')
+    try:
+        body = stream_export(
+            fmt=fmt,
+            dataset=dataset,
+            chunk_size=min(request.args.get('chunk_size', 5000, type=int), 50000),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            category=request.args.get('category'),
+            user_id=request.args.get('user_id'),
+            username=request.args.get('username')
+        )
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"{dataset}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    # A generator body is sent with chunked transfer encoding
+    return HTTPResponse(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@admin_bp.route('/profiler')
+@admin_required
+def profiler():
+    directory = profiler_dir(current_app)
+    capture = read_capture(directory)
+    running = bool(capture and capture['until'] > time.time())
+    captures = [
+        {'id': capture_id, 'samples': sum(collapsed_stacks(directory, capture_id).values())}
+        for capture_id in list_captures(directory)
+    ]
+    return render_template('admin/profiler.html',
+                         capture=capture,
+                         running=running,
+                         remaining=int(capture['until'] - time.time()) if running else 0,
+                         captures=captures,
+                         endpoints=sorted(current_app.view_functions))
+
+@admin_bp.route('/profiler/start', methods=['POST'])
+@admin_required
+def start_profiler():
+    endpoint = request.form.get('endpoint') or None
+    if endpoint and endpoint not in current_app.view_functions:
+        flash(f'Unknown endpoint {endpoint}', 'error')
+        return redirect(url_for('admin.profiler'))
+    try:
+        capture = start_capture(
+            profiler_dir(current_app),
+            endpoint=endpoint,
+            percentage=request.form.get('percentage', 100, type=float),
+            duration=request.form.get('duration', 60, type=int),
+            interval_ms=request.form.get('interval_ms', 5, type=int)
+        )
+    except ProfilerError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.profiler'))
+    flash(f"Profiling started ({capture['id']})", 'success')
+    return redirect(url_for('admin.profiler'))
+
+@admin_bp.route('/profiler/stop', methods=['POST'])
+@admin_required
+def stop_profiler():
+    stop_capture(profiler_dir(current_app))
+    flash('Profiling stopped', 'success')
+    return redirect(url_for('admin.profiler'))
+
+@admin_bp.route('/profiler/<capture_id>.collapsed')
+@admin_required
+def download_profile(capture_id):
+    directory = profiler_dir(current_app)
+    if capture_id not in list_captures(directory):
+        abort(404)
+    stacks = collapsed_stacks(directory, capture_id)
+    body = ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+    # Collapsed stacks render with flamegraph.pl, inferno or speedscope
+    return HTTPResponse(
+        body,
+        mimetype='text/plain',
+        headers={'Content-Disposition': f'attachment; filename="profile-{capture_id}.collapsed"'}
+    )
+
+@admin_bp.route('/memory')
+@admin_required
+def memory():
+    # Per worker: the numbers describe the process that served this request
+    status = tracing_status()
+    status['caches'] = cache_sizes()
+    return jsonify(status)
+
+@admin_bp.route('/memory/start', methods=['POST'])
+@admin_required
+def start_memory_tracing():
+    start_tracing(frames=min(max(request.args.get('frames', 1, type=int), 1), 50))
+    return jsonify(tracing_status())
+
+@admin_bp.route('/memory/stop', methods=['POST'])
+@admin_required
+def stop_memory_tracing():
+    stop_tracing()
+    return jsonify(tracing_status())
+
+@admin_bp.route('/memory/snapshot', methods=['POST'])
+@admin_required
+def memory_snapshot():
+    try:
+        snapshot_id = take_snapshot(keep=current_app.config['MEMORY_SNAPSHOT_LIMIT'])
+        top = top_allocations(
+            snapshot_id,
+            key_type=request.args.get('key_type', 'lineno'),
+            limit=min(request.args.get('limit', 20, type=int), 200)
+        )
+    except MemoryProfilingError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'id': snapshot_id, 'top': top, 'caches': cache_sizes()})
+
+@admin_bp.route('/memory/snapshot/<int:snapshot_id>')
+@admin_required
+def memory_snapshot_top(snapshot_id):
+    try:
+        top = top_allocations(
+            snapshot_id,
+            key_type=request.args.get('key_type', 'lineno'),
+            limit=min(request.args.get('limit', 20, type=int), 200)
+        )
+    except MemoryProfilingError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify({'id': snapshot_id, 'top': top})
+
+@admin_bp.route('/memory/diff')
+@admin_required
+def memory_diff():
+    old_id = request.args.get('from', type=int)
+    new_id = request.args.get('to', type=int)
+    if old_id is None or new_id is None:
+        return jsonify({'error': 'from and to snapshot ids are required'}), 400
+    try:
+        diff = diff_snapshots(
+            old_id, new_id,
+            key_type=request.args.get('key_type', 'lineno'),
+            limit=min(request.args.get('limit', 20, type=int), 200)
+        )
+    except MemoryProfilingError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'from': old_id, 'to': new_id, 'diff': diff})
+
+@admin_bp.route('/traces')
+@admin_required
+def traces():
+    endpoint = request.args.get('endpoint')
+    min_ms = request.args.get('min_ms', 0, type=float)
+    items = [
+        trace for trace in recent_traces(limit=min(request.args.get('limit', 100, type=int), 1000))
+        if trace['duration_ms'] >= min_ms and (not endpoint or trace['spans'][0]['attrs'].get('endpoint') == endpoint)
+    ]
+    return render_template('admin/traces.html',
+                         traces=items,
+                         endpoint=endpoint,
+                         min_ms=min_ms,
+                         sample_rate=current_app.config['TRACE_SAMPLE_RATE'],
+                         sink=current_app.config['TRACE_SINK'])
+
+@admin_bp.route('/traces/<trace_id>')
+@admin_required
+def trace_detail(trace_id):
+    trace = get_trace(trace_id)
+    if trace is None:
+        abort(404)
+
+    # Depth-first order with nesting depth for the waterfall
+    children = {}
+    for item in trace['spans']:
+        children.setdefault(item['parent'], []).append(item)
+    rows = []
+    stack = [(item, 0) for item in reversed(children.get(None, []))]
+    while stack:
+        item, depth = stack.pop()
+        rows.append({'span': item, 'depth': depth})
+        stack.extend((child, depth + 1) for child in reversed(children.get(item['id'], [])))
+
+    if request.args.get('format') == 'json':
+        return jsonify(trace)
+    return render_template('admin/trace_detail.html', trace=trace, rows=rows,
+                         total_ms=max(trace['duration_ms'], 0.001))
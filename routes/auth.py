@@ -2,9 +2,24 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from extensions import db
 from models.user import User
+from utils.rate_limit import check_limits, record_failure
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+def _username_key(username):
+    return (username or '').strip().lower()
+
+def rate_limited(scope, username, template):
+    """429 response if the client IP, its attempts on this username or the username's limit is exhausted, else None"""
+    username = _username_key(username)
+    allowed, retry_after = check_limits(scope, ip=request.remote_addr,
+                                        username_ip=f'{username}|{request.remote_addr}' if username else None,
+                                        username=username)
+    if allowed:
+        return None
+    flash('Too many attempts. Please wait a moment and try again.')
+    return render_template(template), 429, {'Retry-After': str(int(retry_after) + 1)}
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -13,6 +28,10 @@ def register():
         password = request.form.get('password')
         age = request.form.get('age')
         
+        limited = rate_limited('register', username, 'auth/register.html')
+        if limited:
+            return limited
+        
         # Validate age
         if not age or age.strip() == '':
             flash('Age is required')
@@ -51,6 +70,10 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        # Checked before the User lookup so rejected attempts never reach the password hash
+        limited = rate_limited('login', username, 'auth/login.html')
+        if limited:
+            return limited
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password):
@@ -62,6 +85,8 @@ def login():
                 # Redirect to home/profile instead of immediately starting test
                 return redirect(url_for('home'))
             
+        # Only failures count against the account's own limit, so its owner never uses it up
+        record_failure('login', username=_username_key(username))
         flash('Invalid username or password')
         
     return render_template('auth/login.html')
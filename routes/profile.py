@@ -1,20 +1,22 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from extensions import db
-from models.test_session import TestSession
-from models.response import Response
 from models.question import Question
 from models.user import User
-from sqlalchemy import func
+from utils import queries
+from utils.db_routing import read_replica
+from utils.response_store import get_session_responses, offline_response_stats, merge_success_stats
+from utils.user_cache import invalidate_user
 import json
 
 profile_bp = Blueprint('profile', __name__, url_prefix='/profile')
 
 @profile_bp.route('/')
 @login_required
+@read_replica
 def index():
     # Get user's test history
-    test_history = TestSession.query.filter_by(user_id=current_user.id).order_by(TestSession.start_time.desc()).all()
+    test_history = queries.test_history(current_user.id).all()
     
     # Get overall statistics
     total_tests = len(test_history)
@@ -30,58 +32,45 @@ def index():
     else:
         avg_score = best_score = total_questions_attempted = 0
 
+    # Responses of packed or archived sessions are no longer rows; aggregate them separately
+    offline_stats = offline_response_stats(user_id=current_user.id)
+
     # Get category-wise performance
-    category_stats = db.session.query(
-        Question.category,
-        func.count(Response.id).label('attempts'),
-        func.avg(Response.is_correct).label('success_rate')
-    ).join(Response, Response.question_id == Question.id)\
-     .join(TestSession, TestSession.id == Response.test_session_id)\
-     .filter(TestSession.user_id == current_user.id)\
-     .group_by(Question.category).all()
+    category_stats = queries.success_stats(Question.category, current_user.id).all()
 
     # Convert to list with percentage values
     category_stats_list = [
-        {
-            'category': stat.category,
-            'attempts': stat.attempts,
-            'success_rate': float(stat.success_rate or 0) * 100
-        }
-        for stat in category_stats
+        dict(stat, success_rate=stat['success_rate'] * 100)
+        for stat in merge_success_stats(category_stats, offline_stats['category'], 'category')
     ]
 
     # Get difficulty-wise performance
-    difficulty_stats = db.session.query(
-        Question.difficulty,
-        func.count(Response.id).label('attempts'),
-        func.avg(Response.is_correct).label('success_rate')
-    ).join(Response, Response.question_id == Question.id)\
-     .join(TestSession, TestSession.id == Response.test_session_id)\
-     .filter(TestSession.user_id == current_user.id)\
-     .group_by(Question.difficulty).all()
+    difficulty_stats = queries.success_stats(Question.difficulty, current_user.id).all()
 
     # Convert to list with percentage values
     difficulty_stats_list = [
-        {
-            'difficulty': stat.difficulty,
-            'attempts': stat.attempts,
-            'success_rate': float(stat.success_rate or 0) * 100
-        }
-        for stat in difficulty_stats
+        dict(stat, success_rate=stat['success_rate'] * 100)
+        for stat in merge_success_stats(difficulty_stats, offline_stats['difficulty'], 'difficulty')
     ]
 
     # Get response time statistics
-    avg_response_time = db.session.query(
-        func.avg(Response.response_time)
-    ).join(TestSession, TestSession.id == Response.test_session_id)\
-     .filter(TestSession.user_id == current_user.id).scalar() or 0
+    time_sum, time_count = queries.response_time_totals(current_user.id).one()
+    packed_time_sum, packed_time_count = offline_stats['response_time']
+    time_count = (time_count or 0) + packed_time_count
+    avg_response_time = ((time_sum or 0) + packed_time_sum) / time_count if time_count else 0
+
+    # Get per-domain index scores for every test in one query
+    domain_trend = {}
+    for test_session_id, domain, score in queries.domain_trend(current_user.id).all():
+        domain_trend.setdefault(test_session_id, {})[domain] = score
 
     # Get improvement trend (scores over time)
     scores_trend = [
         {
             'date': test.start_time.strftime('%Y-%m-%d'),
             'score': test.score or 0,
-            'total': test.total_questions or 0
+            'total': test.total_questions or 0,
+            'domains': domain_trend.get(test.id, {})
         }
         for test in test_history
     ]
@@ -89,7 +78,7 @@ def index():
     # Get recent test details
     recent_tests = []
     for test in test_history[:5]:  # Last 5 tests
-        responses = Response.query.filter_by(test_session_id=test.id).all()
+        responses = get_session_responses(test)
         correct_responses = sum(1 for r in responses if r.is_correct)
         response_times = [r.response_time for r in responses if r.response_time is not None]
         avg_time = sum(response_times) / len(response_times) if response_times else 0
@@ -147,5 +136,6 @@ def update():
     current_user.age = age
     
     db.session.commit()
+    invalidate_user(current_user.id)
     flash('Profile updated successfully!', 'success')
     return redirect(url_for('profile.index'))
@@ -1,16 +1,45 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, Response as FlaskResponse, make_response, render_template, request, jsonify
 from flask_login import login_required, current_user
 from extensions import db
 from models.question import Question
 from models.test_session import TestSession
 from models.response import Response
-from sqlalchemy import func
-import json
+from utils.question_manifest import (CLIENT_GRADED_TYPES, client_options, client_question, current_manifest,
+                                     manifest_version, question_reference, shuffle_permutation)
+from utils import queries
+from utils.images import responsive_image
+from utils.question_pack import current_pack
+from utils.response_store import get_session_responses
+from utils.tracing import span
 import random
 from datetime import datetime
 
 test_bp = Blueprint('test', __name__, url_prefix='/test')
 
+def pick_question(category, difficulty, exclude=()):
+    """Random question of a category/difficulty not in ``exclude``, from the compiled pack when there is one"""
+    pack = current_pack()
+    if pack is None:
+        return queries.random_question(category, difficulty, exclude).first()
+
+    group = pack.group(category, difficulty)
+    if not group:
+        return None
+    exclude = set(exclude)
+    # Rejection sampling: the history is short, so a random record is almost always usable
+    for _ in range(8):
+        number = random.choice(group)
+        if pack.question_id(number) not in exclude:
+            return pack.question(number)
+    candidates = [number for number in group if pack.question_id(number) not in exclude]
+    return pack.question(random.choice(candidates)) if candidates else None
+
+def get_question_or_404(question_id):
+    pack = current_pack()
+    question = pack.get(question_id) if pack is not None else None
+    # A pack compiled before the latest ingestion may not have it yet
+    return question if question is not None else Question.query.get_or_404(question_id)
+
 @test_bp.route('/get_questions')
 def get_questions():
     # Get adaptive questions organized by category and difficulty
@@ -20,16 +49,21 @@ def get_questions():
     random.shuffle(categories)
     
     questions_data = []
+    # Clients holding the current manifest get ids and permutations only
+    version = manifest_version()
+    compact = request.args.get('manifest_version') == version
     
     for category in categories:
         # Start with easy questions from each category - add randomization
-        easy_questions = Question.query.filter_by(category=category, difficulty='easy').order_by(func.random()).limit(1).all()
-        for question in easy_questions:
-            questions_data.append(format_question(question))
+        question = pick_question(category, 'easy')
+        if question:
+            questions_data.append(question_reference(question, 'easy', version) if compact
+                                  else format_question(question))
     
     return jsonify({
         'questions': questions_data,
-        'category_order': categories  # Return the randomized category order
+        'category_order': categories,  # Return the randomized category order
+        'manifest_version': version
     })
 
 @test_bp.route('/image_test')
@@ -94,23 +128,13 @@ def get_adaptive_question():
             next_difficulty = 'easy'  # Stay at easy
     
     # Get next question from the category and difficulty, excluding already answered
-    question = Question.query.filter_by(
-        category=category, 
-        difficulty=next_difficulty
-    ).filter(
-        ~Question.id.in_(question_history)
-    ).order_by(func.random()).first()
+    question = pick_question(category, next_difficulty, question_history)
     
     if not question:
         # If no questions available at this difficulty, try other difficulties
         for alt_difficulty in ['medium', 'easy', 'hard']:
             if alt_difficulty != next_difficulty:
-                question = Question.query.filter_by(
-                    category=category, 
-                    difficulty=alt_difficulty
-                ).filter(
-                    ~Question.id.in_(question_history)
-                ).order_by(func.random()).first()
+                question = pick_question(category, alt_difficulty, question_history)
                 if question:
                     next_difficulty = alt_difficulty
                     break
@@ -118,87 +142,64 @@ def get_adaptive_question():
                     break
     
     if question:
-        return jsonify({
-            'question': format_question(question),
-            'difficulty': next_difficulty
-        })
+        return jsonify(question_payload(question, next_difficulty, data.get('manifest_version')))
     else:
         return jsonify({'question': None, 'difficulty': None})
 
+def grade_answer(question, answer):
+    """Check an answer given as the option text (what the test page sends) or the stored option index"""
+    if question.correct_answer is None:
+        return False
+    try:
+        correct_idx = int(question.correct_answer)
+    except (ValueError, TypeError):
+        return str(answer) == str(question.correct_answer)
+    options = client_options(question)
+    if answer in options:
+        return 0 <= correct_idx < len(options) and options[correct_idx] == answer
+    if isinstance(answer, str) and answer.isascii() and answer.isdigit():
+        return int(answer) == correct_idx
+    return answer == correct_idx
+
 def format_question(question):
-    """Format a question object for JSON response"""
-    # For interactive question types (Working Memory), don't include options
-    interactive_types = [
-        'digit-span', 'digit-span-reverse', 'letter-span', 'letter-span-reorder',
-        'visual-span', 'visual-span-reverse', 'n-back', 'visual-n-back',
-        'operation-span', 'task-switching-span', 'n-back-dual'
-    ]
-    
-    # Parse options - handle both string and already parsed JSON
-    if question.question_type in interactive_types:
-        options = []  # Interactive questions don't use multiple choice
-    elif isinstance(question.options, str):
-        try:
-            options = json.loads(question.options)
-        except json.JSONDecodeError:
-            print(f"Warning: Could not parse options for question {question.id}")
-            options = []
-    else:
-        options = question.options or []
-    
-    # Store the original correct answer before shuffling
-    original_correct_answer = question.correct_answer
-    
-    # Randomize options order and track correct answer
-    if options and len(options) > 1 and original_correct_answer is not None:
-        try:
-            # Get the correct answer text before shuffling
-            correct_idx = int(original_correct_answer)
-            if 0 <= correct_idx < len(options):
-                correct_answer_text = options[correct_idx]
-                
-                # Shuffle the options
-                random.shuffle(options)
-                
-                # Find the new index of the correct answer
-                new_correct_idx = options.index(correct_answer_text)
-                updated_correct_answer = new_correct_idx
-            else:
-                updated_correct_answer = original_correct_answer
-        except (ValueError, TypeError, IndexError):
-            # If there's any error, don't shuffle and keep original
-            updated_correct_answer = original_correct_answer
-    else:
-        updated_correct_answer = original_correct_answer
-        
-    # Create question dict in the same format as the JSON file
-    question_dict = {
-        "id": question.id,
-        "question": question.question_text,
-        "options": options,
-        "category": question.category,
-        "difficulty": question.difficulty
+    """Format a question object for JSON response, with its options shuffled"""
+    options = client_options(question)
+    return client_question(question, options, shuffle_permutation(question, options))
+
+def question_payload(question, difficulty, client_version):
+    """
+    Adaptive response: just the id and option permutation when the client
+    holds the current manifest, the full question otherwise
+    """
+    version = manifest_version()
+    if client_version and client_version == version:
+        return question_reference(question, difficulty, version)
+    return {
+        'question': format_question(question),
+        'difficulty': difficulty,
+        'manifest_version': version
     }
-    
-    # Add optional fields if they exist
-    if updated_correct_answer is not None:
-        question_dict["correct"] = int(updated_correct_answer) if str(updated_correct_answer).isdigit() else updated_correct_answer
-    if question.question_type:
-        question_dict["type"] = question.question_type
-    if question.points:
-        question_dict["points"] = question.points
-    if question.display_time:
-        question_dict["displayTime"] = question.display_time
-        
-    # Add fields from the original JSON structure that might be stored in the database
-    if hasattr(question, 'length') and question.length:
-        question_dict["length"] = question.length
-    if hasattr(question, 'input_type') and question.input_type:
-        question_dict["inputType"] = question.input_type
-    if hasattr(question, 'time_limit') and question.time_limit:
-        question_dict["timeLimit"] = question.time_limit
-        
-    return question_dict
+
+@test_bp.route('/manifest')
+@login_required
+def manifest():
+    version, body = current_manifest()
+    response = FlaskResponse(body, mimetype='application/json')
+    response.set_etag(version)
+    # Revalidate every time; an unchanged bank costs a 304 with no body
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@test_bp.route('/manifest/<version>')
+@login_required
+def versioned_manifest(version):
+    current_version, body = current_manifest()
+    if version != current_version:
+        return jsonify({'error': 'Unknown manifest version', 'manifest_version': current_version}), 404
+    response = FlaskResponse(body, mimetype='application/json')
+    response.set_etag(current_version)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response.make_conditional(request)
 
 @test_bp.route('/start')
 @login_required
@@ -211,18 +212,21 @@ def start():
     db.session.add(session)
     db.session.commit()
     
-    # Prepare category image URLs using url_for to handle spaces correctly
-    from flask import url_for
+    # Resized derivatives (src/srcset in the browser's best format) or the original PNGs
     category_images = {
-        'Verbal Comprehension': url_for('static', filename='images/verbal_comprehension.png'),
-        'Perceptual Reasoning': url_for('static', filename='images/perceptual_reasoning.png'),
-        'Working Memory': url_for('static', filename='images/working_memory.png'),
-        'Processing Speed': url_for('static', filename='images/processing_speed.png'),
-        'Fluid Reasoning': url_for('static', filename='images/fluid_reasoning.png'),
-        'TestMyIQ Logo': url_for('static', filename='images/testmyiq_logo.png')
+        'Verbal Comprehension': responsive_image('images/verbal_comprehension.png'),
+        'Perceptual Reasoning': responsive_image('images/perceptual_reasoning.png'),
+        'Working Memory': responsive_image('images/working_memory.png'),
+        'Processing Speed': responsive_image('images/processing_speed.png'),
+        'Fluid Reasoning': responsive_image('images/fluid_reasoning.png'),
+        'TestMyIQ Logo': responsive_image('images/testmyiq_logo.png')
     }
     
-    return render_template('test/start.html', session_id=session.id, category_images=category_images)
+    response = make_response(render_template('test/start.html', session_id=session.id,
+                                             category_images=category_images))
+    # The image format depends on the Accept header
+    response.vary.add('Accept')
+    return response
 
 @test_bp.route('/submit_answer', methods=['POST'])
 @login_required
@@ -234,24 +238,15 @@ def submit_answer():
     response_time = data.get('response_time')
     is_correct_provided = data.get('is_correct')  # For digit-span questions
     
-    question = Question.query.get_or_404(question_id)
+    question = get_question_or_404(question_id)
     
     # Determine if answer is correct
-    if is_correct_provided is not None:
+    if is_correct_provided is not None and question.question_type in CLIENT_GRADED_TYPES:
         # For digit-span questions, correctness is determined client-side
-        is_correct = is_correct_provided
+        is_correct = bool(is_correct_provided)
     else:
-        # For multiple choice questions, check against stored correct answer
-        if question.correct_answer is not None:
-            # Handle both string and integer correct answers
-            try:
-                correct_idx = int(question.correct_answer)
-                user_idx = int(answer) if isinstance(answer, str) and answer.isdigit() else answer
-                is_correct = user_idx == correct_idx
-            except (ValueError, TypeError):
-                is_correct = str(answer) == str(question.correct_answer)
-        else:
-            is_correct = False
+        # Everything else is checked against the stored answer, which the client never sees
+        is_correct = grade_answer(question, answer)
     
     response = Response(
         test_session_id=session_id,
@@ -271,15 +266,22 @@ def finish(session_id):
     session = TestSession.query.get_or_404(session_id)
     if session.user_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
-        
-    session.end_time = datetime.utcnow()
-    
-    # Calculate IQ score with user's age (default to 18 if not available)
-    user_age = getattr(current_user, 'age', 18)
-    session.calculate_score(user_age)
-    db.session.commit()
+
+    # Packed and archived sessions have no Response rows; read the answers once for scoring and review
+    responses = get_session_responses(session, with_questions=True)
+
+    # Reopening the results page shows the stored score instead of grading again
+    if session.end_time is None or session.score is None:
+        session.end_time = datetime.utcnow()
+
+        # Calculate IQ score with user's age (default to 18 if not available)
+        user_age = getattr(current_user, 'age', 18)
+        with span('calculate_score'):
+            session.calculate_score(user_age, responses)
+        with span('db.commit'):
+            db.session.commit()
     
-    return render_template('test/results.html', session=session)
+    return render_template('test/results.html', session=session, responses=responses)
 
 @test_bp.route('/save_results', methods=['POST'])
 @login_required
@@ -292,8 +294,8 @@ def save_results():
         session.fsiq = data.get('fsiq')
         session.percentile = data.get('percentile')
         session.classification = data.get('classification')
-        session.domain_scores = json.dumps(data.get('domain_scores'))
-        session.confidence_interval = json.dumps(data.get('confidence_interval'))
+        session.set_domain_scores(data.get('domain_scores'))
+        session.confidence_interval = data.get('confidence_interval')
         db.session.commit()
     
     return jsonify({'status': 'success'})
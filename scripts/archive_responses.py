@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Move the answers of old test sessions out of the database into monthly
+cold-storage segments (see utils/response_archive.py).
+
+Sessions that started before the first day of the month --older-than-months
+ago are archived, whether their answers are Response rows or a packed blob.
+The segment is written and fsynced before the database is updated, so an
+interrupted run leaves at worst unreferenced data in a segment that the next
+run skips over.
+
+    python scripts/archive_responses.py --older-than-months 3
+    python scripts/archive_responses.py --dry-run
+    python scripts/archive_responses.py --restore     # move archived sessions back into packed blobs
+    python scripts/archive_responses.py --stats
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from collections import defaultdict
+from datetime import datetime
+
+from app import create_app
+from extensions import db
+from models.response import Response
+from models.test_session import TestSession
+from utils.response_archive import ArchiveError, append_sessions, archive_stats, month_of, read_archived_blob
+from utils.response_packing import PackingError, pack_responses
+from utils.response_store import record_offline_responses
+
+
+def month_cutoff(months):
+    """First day of the month ``months`` months before the current one"""
+    now = datetime.utcnow()
+    index = now.year * 12 + now.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def session_blob(session):
+    if session.packed_responses:
+        return session.packed_responses
+    rows = Response.query.filter_by(test_session_id=session.id).order_by(Response.id).all()
+    if not rows:
+        return None
+    blob = pack_responses(rows)
+    # Packed sessions are already counted; rows leave the table with this batch
+    record_offline_responses(session.user_id, rows)
+    return blob
+
+
+def archive(args):
+    cutoff = month_cutoff(args.older_than_months)
+    query = TestSession.query.filter(
+        TestSession.end_time.isnot(None),
+        TestSession.start_time < cutoff,
+        TestSession.archived_segment.is_(None)
+    )
+
+    by_month = defaultdict(list)
+    for session_id, start_time in query.with_entities(TestSession.id, TestSession.start_time).order_by(TestSession.id):
+        by_month[month_of(start_time)].append(session_id)
+
+    total = sum(len(ids) for ids in by_month.values())
+    print(f"🗄️  Archiving {total} sessions started before {cutoff:%Y-%m-%d} into {len(by_month)} segments...")
+
+    sessions_done = blob_bytes = errors = 0
+    for month in sorted(by_month):
+        session_ids = by_month[month]
+        for start in range(0, len(session_ids), args.batch_size):
+            batch = TestSession.query.filter(TestSession.id.in_(session_ids[start:start + args.batch_size])).all()
+            blobs = {}
+            for session in batch:
+                try:
+                    blob = session_blob(session)
+                except PackingError as e:
+                    errors += 1
+                    print(f"   Skipped session {session.id}: {e}")
+                    continue
+                if blob:
+                    blobs[session.id] = blob
+
+            blob_bytes += sum(len(blob) for blob in blobs.values())
+            if args.dry_run:
+                sessions_done += len(blobs)
+                db.session.rollback()
+                continue
+
+            append_sessions(month, blobs)
+            for session in batch:
+                if session.id in blobs:
+                    session.archived_segment = month
+                    session.packed_responses = None
+            Response.query.filter(Response.test_session_id.in_(list(blobs))).delete(synchronize_session=False)
+            db.session.commit()
+            sessions_done += len(blobs)
+        print(f"   {month}: {len(session_ids)} sessions")
+
+    verb = 'would be archived' if args.dry_run else 'archived'
+    print(f"✅ {sessions_done} sessions {verb} ({blob_bytes} bytes before compression), {errors} skipped")
+
+
+def restore(args):
+    session_ids = [session_id for (session_id,) in db.session.query(TestSession.id)
+                   .filter(TestSession.archived_segment.isnot(None)).order_by(TestSession.id)]
+    print(f"🗄️  Restoring {len(session_ids)} archived sessions into packed blobs...")
+
+    restored = errors = 0
+    for start in range(0, len(session_ids), args.batch_size):
+        batch = TestSession.query.filter(TestSession.id.in_(session_ids[start:start + args.batch_size])).all()
+        for session in batch:
+            try:
+                session.packed_responses = read_archived_blob(session.id, session.archived_segment)
+            except ArchiveError as e:
+                errors += 1
+                print(f"   Skipped session {session.id}: {e}")
+                continue
+            session.archived_segment = None
+            restored += 1
+        if not args.dry_run:
+            db.session.commit()
+
+    # Segment files are append-only; restored sessions stay in them until the
+    # archive directory is cleaned up by hand
+    print(f"✅ {restored} sessions restored, {errors} skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move old sessions to cold storage segments')
+    parser.add_argument('--older-than-months', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=500, help='Sessions per segment write and commit')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be archived without writing')
+    parser.add_argument('--restore', action='store_true', help='Move archived sessions back into packed blobs')
+    parser.add_argument('--stats', action='store_true', help='Print the size of each archive segment')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.stats:
+            for segment in archive_stats():
+                print(f"{segment['month']}: {segment['sessions']} sessions, "
+                      f"{segment['segment_bytes']} bytes (+{segment['index_bytes']} index)")
+        elif args.restore:
+            restore(args)
+        else:
+            archive(args)
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
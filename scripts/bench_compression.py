@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Measure response compression against the uncompressed baseline: body size,
+server time per request and the time to transfer the body over a few link
+speeds, for the question manifest, the test and profile pages and the JSON
+question endpoint.
+
+Uses a throwaway SQLite database filled from static/questions_combined.json
+with one user who has --tests finished sessions (so the profile page carries
+a realistic ``scores_trend``), and drives the app through the Flask test
+client. Identity responses are the baseline; "cold" clears the compressed
+body cache before every request, "cached" does not (only responses with an
+ETag, such as the manifest, are cached).
+
+    python scripts/bench_compression.py --requests 50
+"""
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Link speeds in Mbit/s for the transfer estimate
+LINKS = (('3G', 1.6), ('4G', 10.0), ('broadband', 50.0))
+
+
+def time_requests(client, path, requests, headers, before=None):
+    """(body bytes, mean seconds per request)"""
+    size, elapsed = 0, 0.0
+    for _ in range(requests):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        elapsed += time.perf_counter() - started
+        assert response.status_code == 200, (path, response.status_code)
+        size = len(response.data)
+    return size, elapsed / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark gzip/brotli response compression')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint and mode')
+    parser.add_argument('--tests', type=int, default=200, help='Finished test sessions for the profile page')
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+        os.environ['METRICS_DIR'] = os.path.join(tmpdir, 'metrics')
+        os.environ['QUESTION_PACK'] = os.path.join(tmpdir, 'bank.iqb')
+        os.environ['SQL_INSTRUMENTATION'] = '0'
+        from app import create_app
+        from extensions import db
+        from models.question import Question
+        from models.test_session import TestSession
+        from models.user import User
+        from utils.compression import available_encodings, clear_cache
+        from utils.question_bank import iter_source
+        from utils.question_ingest import database_rows, item_rows
+        from utils.question_pack import compile_pack
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            rows, _ = item_rows(iter_source('static/questions_combined.json'))
+            db.session.execute(db.insert(Question), list(rows.values()))
+            compile_pack(database_rows(), app.config['QUESTION_PACK'])
+
+            user = User(username='bench', email='bench@example.com', age=30)
+            user.set_password('bench')
+            db.session.add(user)
+            db.session.flush()
+            # Every other day, so the home page's streak count stays short
+            started = datetime.utcnow() - timedelta(days=2 * args.tests + 1)
+            for day in range(0, 2 * args.tests, 2):
+                score = random.randint(85, 135)
+                db.session.add(TestSession(
+                    user_id=user.id, start_time=started + timedelta(days=day),
+                    end_time=started + timedelta(days=day, minutes=30), score=score, fsiq=score,
+                    total_questions=40, percentile=50.0, classification='Average'))
+            db.session.commit()
+            category = next(iter(rows.values()))['category']
+
+        client = app.test_client()
+        response = client.post('/auth/login', data={'username': 'bench', 'password': 'bench'})
+        assert response.status_code == 302, response.status_code
+
+        paths = ['/test/manifest', '/test/start', '/profile/', '/',
+                 f'/test/get_questions?category={category}&difficulty=easy']
+        modes = [('identity', {}, None)]
+        for encoding in available_encodings():
+            modes.append((f'{encoding} cold', {'Accept-Encoding': encoding}, clear_cache))
+            modes.append((f'{encoding} cached', {'Accept-Encoding': encoding}, None))
+
+        print(f"{'endpoint':<40} {'mode':<12} {'bytes':>9} {'ratio':>6} {'server':>9}  "
+              + '  '.join(f'{name:>9}' for name, _ in LINKS))
+        for path in paths:
+            baseline = None
+            for mode, headers, before in modes:
+                size, seconds = time_requests(client, path, args.requests, headers, before)
+                baseline = baseline or size
+                transfer = '  '.join(f'{size * 8 / (mbps * 1e6) * 1000:7.1f}ms' for _, mbps in LINKS)
+                print(f"{path[:40]:<40} {mode:<12} {size:9d} {baseline / size:5.1f}x "
+                      f"{seconds * 1000:7.2f}ms  {transfer}")
+            print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent /test/submit_answer throughput under each database
+engine profile (see utils/db_engine.py).
+
+Every profile gets a fresh SQLite file; --workers processes (like gunicorn
+workers) each run --threads client threads that post answers as fast as
+they can. To include the server profile pass a PostgreSQL/MySQL URL with
+--server-url (its tables are created and left in place).
+
+    python scripts/bench_db_profiles.py --workers 4 --threads 4 --answers 200
+"""
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import argparse
+import multiprocessing
+import statistics
+import tempfile
+import time
+
+PASSWORD = 'bench-password'
+
+
+def _create_app(database_url, profile):
+    # Config reads the environment at import time, so set it before importing the app
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['DATABASE_PROFILE'] = profile
+    os.chdir(ROOT)
+    from app import create_app
+    return create_app()
+
+
+def setup_database(database_url, profile, users):
+    """Create the schema, a handful of questions and one user + session per client"""
+    app = _create_app(database_url, profile)
+    from extensions import db
+    from models.user import User
+    from models.question import Question
+    from models.test_session import TestSession
+
+    with app.app_context():
+        db.create_all()
+        for i in range(20):
+            if not db.session.get(Question, f'bench_{i}'):
+                db.session.add(Question(
+                    id=f'bench_{i}', question_text=f'Benchmark question {i}',
+                    options=['a', 'b', 'c', 'd'], correct_answer='1',
+                    category='Fluid Reasoning', difficulty='easy'
+                ))
+
+        session_ids = []
+        for i in range(users):
+            username = f'bench_user_{i}'
+            user = User.query.filter_by(username=username).first()
+            if not user:
+                user = User(username=username, email=f'{username}@example.com', age=30)
+                user.set_password(PASSWORD)
+                db.session.add(user)
+                db.session.flush()
+            session = TestSession(user_id=user.id, total_questions=15)
+            db.session.add(session)
+            db.session.flush()
+            session_ids.append((username, session.id))
+
+        db.session.commit()
+        return session_ids
+
+
+def run_worker(database_url, profile, clients, answers, queue):
+    """One worker process: a thread per client, each posting ``answers`` answers"""
+    import threading
+
+    app = _create_app(database_url, profile)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(clients))
+
+    def client_loop(username, session_id):
+        client = app.test_client()
+        client.post('/auth/login', data={'username': username, 'password': PASSWORD})
+        local = []
+        local_errors = 0
+        barrier.wait()
+        for i in range(answers):
+            started = time.perf_counter()
+            response = client.post('/test/submit_answer', json={
+                'question_id': f'bench_{i % 20}',
+                'answer': str(i % 4),
+                'session_id': session_id,
+                'response_time': 3.5
+            })
+            local.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=client_loop, args=client) for client in clients]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put({'elapsed': time.perf_counter() - started, 'latencies': latencies, 'errors': sum(errors)})
+
+
+def bench_profile(ctx, database_url, profile, workers, threads, answers):
+    with ctx.Pool(1) as pool:
+        session_ids = pool.apply(setup_database, (database_url, profile, workers * threads))
+
+    queue = ctx.Queue()
+    processes = []
+    for w in range(workers):
+        clients = session_ids[w * threads:(w + 1) * threads]
+        process = ctx.Process(target=run_worker, args=(database_url, profile, clients, answers, queue))
+        processes.append(process)
+
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+
+    latencies = sorted(l for result in results for l in result['latencies'])
+    total = len(latencies)
+    return {
+        'profile': profile,
+        'answers': total,
+        'errors': sum(result['errors'] for result in results),
+        # Worker start-up (imports, logins) is excluded from throughput
+        'throughput': total / max(result['elapsed'] for result in results),
+        'wall': wall,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(total * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark submit_answer throughput per engine profile')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--answers', type=int, default=100, help='Answers posted per client thread')
+    parser.add_argument('--profiles', default='default,sqlite', help='Comma-separated SQLite profiles to run')
+    parser.add_argument('--server-url', help='Also benchmark the server profile against this database URL')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    runs = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for profile in args.profiles.split(','):
+            database_url = f"sqlite:///{os.path.join(tmpdir, f'bench_{profile}.db')}"
+            runs.append((database_url, profile))
+        if args.server_url:
+            runs.append((args.server_url, 'server'))
+
+        print(f"🏁 {args.workers} workers × {args.threads} threads × {args.answers} answers per profile")
+        print(f"{'Profile':<10} {'Answers':>8} {'Errors':>7} {'Answers/s':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for database_url, profile in runs:
+            result = bench_profile(ctx, database_url, profile, args.workers, args.threads, args.answers)
+            print(f"{result['profile']:<10} {result['answers']:>8} {result['errors']:>7} "
+                  f"{result['throughput']:>10.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
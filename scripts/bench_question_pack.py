@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compare ways for a worker to get at the question bank: loading it through
+the ORM, parsing the combined JSON file, or opening the compiled pack. Then
+time picking one adaptive question with each method.
+
+Uses a throwaway SQLite database filled from static/questions_combined.json,
+replicated with fresh ids up to --questions.
+
+    python scripts/bench_question_pack.py --questions 20000
+"""
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import argparse
+import json
+import random
+import tempfile
+import time
+
+
+def timed(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark question bank loading: ORM vs JSON vs compiled pack')
+    parser.add_argument('--questions', type=int, default=0, help='Replicate the bank up to this many questions')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--picks', type=int, default=500)
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+        os.environ['METRICS_DIR'] = os.path.join(tmpdir, 'metrics')
+        os.environ['QUESTION_PACK'] = os.path.join(tmpdir, 'bank.iqb')
+        from app import create_app
+        from extensions import db
+        from models.question import Question
+        from routes.test import format_question, pick_question
+        from utils.question_bank import iter_source, write_bank
+        from utils.question_ingest import database_rows, item_rows
+        from utils.question_pack import QuestionPack, compile_pack
+
+        items = list(iter_source('static/questions_combined.json'))
+        base = len(items)
+        while len(items) < args.questions:
+            category, difficulty, question = items[len(items) % base]
+            items.append((category, difficulty, dict(question, id=f'b{len(items):08d}')))
+        items.sort(key=lambda item: (item[0], ['easy', 'medium', 'hard'].index(item[1])))
+        bank_json = os.path.join(tmpdir, 'bank.json')
+        write_bank(iter(items), bank_json)
+        rows, _ = item_rows(items)
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Question), list(rows.values()))
+            db.session.commit()
+            count, size = compile_pack(database_rows(), app.config['QUESTION_PACK'])
+            print(f"{count} questions; JSON {os.path.getsize(bank_json) / 1024:.0f} KB, pack {size / 1024:.0f} KB\n")
+
+            def orm_load():
+                db.session.expunge_all()
+                groups = {}
+                for question in Question.query.all():
+                    groups.setdefault((question.category, question.difficulty), []).append(question)
+
+            def json_load():
+                with open(bank_json, encoding='utf-8') as f:
+                    data = json.load(f)
+                {(category, difficulty): questions for category, difficulties in data.items()
+                 for difficulty, questions in difficulties.items()}
+
+            def pack_open():
+                QuestionPack(app.config['QUESTION_PACK']).groups()
+
+            print("worker warm-up (best of %d)" % args.repeat)
+            for label, function in (('ORM load + group', orm_load), ('JSON parse + group', json_load),
+                                    ('pack mmap + group index', pack_open)):
+                print(f"  {label:<26} {timed(function, args.repeat) * 1000:9.2f} ms")
+
+            categories = sorted({item[0] for item in items})
+            history = [question_id for question_id in list(rows)[:10]]
+
+            def picks():
+                for _ in range(args.picks):
+                    format_question(pick_question(random.choice(categories), random.choice(['easy', 'medium', 'hard']),
+                                                  history))
+
+            print(f"\nadaptive pick + format (per question, {args.picks} picks)")
+            with app.test_request_context():
+                app.config['QUESTION_PACK_ENABLED'] = False
+                orm = timed(picks, 1) / args.picks
+                app.config['QUESTION_PACK_ENABLED'] = True
+                packed = timed(picks, 1) / args.picks
+            print(f"  {'ORM (ORDER BY random())':<26} {orm * 1e6:9.1f} µs")
+            print(f"  {'pack':<26} {packed * 1e6:9.1f} µs")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Compare the row-per-answer response layout with packed session blobs.
+
+Builds two throwaway SQLite databases holding the same synthetic sessions
+(15 answers each): one with Response rows, one with packed_responses blobs.
+Reports file size after VACUUM, a full per-category accuracy scan and
+single-session reads for each layout.
+
+    python scripts/bench_response_packing.py --sessions 20000
+"""
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+CATEGORIES = ['Verbal Comprehension', 'Perceptual Reasoning', 'Working Memory', 'Processing Speed', 'Fluid Reasoning']
+PREFIXES = ['vc', 'pr', 'wm', 'ps', 'fr']
+DIFFICULTIES = ['easy', 'medium', 'hard']
+
+
+def synthetic_answers(rng, session_id):
+    answers = []
+    for i in range(15):
+        c = i % 5
+        difficulty = DIFFICULTIES[rng.randrange(3)]
+        question_id = f"{PREFIXES[c]}_{difficulty[0]}{rng.randrange(1, 30)}"
+        if CATEGORIES[c] == 'Working Memory':
+            answer = ''.join(str(rng.randrange(10)) for _ in range(rng.randrange(4, 9)))
+        else:
+            answer = str(rng.randrange(4)) if rng.random() < 0.7 else rng.choice(['Cat', 'Square', 'All of the above'])
+        answers.append({
+            'test_session_id': session_id,
+            'question_id': question_id,
+            'user_answer': answer,
+            'is_correct': rng.random() < 0.55,
+            'response_time': round(rng.uniform(1.5, 60.0), 3),
+            'created_at': datetime(2025, 8, 1) + timedelta(seconds=session_id * 60 + i * 10),
+        })
+    return answers
+
+
+def build(db_path, sessions, packed):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    from app import create_app
+    from extensions import db
+    from models.question import Question
+    from models.response import Response
+    from models.test_session import TestSession
+    from models.user import User
+    from utils.response_packing import pack_responses, PackedResponse
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [{'id': 1, 'username': 'bench', 'email': 'bench@example.com'}])
+        db.session.execute(db.insert(Question), [
+            {'id': f"{PREFIXES[c]}_{d[0]}{n}", 'question_text': 'q', 'category': CATEGORIES[c], 'difficulty': d}
+            for c in range(5) for d in DIFFICULTIES for n in range(1, 30)
+        ])
+
+        rng = random.Random(42)
+        for start in range(1, sessions + 1, 2000):
+            session_rows, response_rows = [], []
+            for session_id in range(start, min(start + 2000, sessions + 1)):
+                answers = synthetic_answers(rng, session_id)
+                row = {'id': session_id, 'user_id': 1, 'total_questions': 15,
+                       'start_time': answers[0]['created_at'], 'end_time': answers[-1]['created_at']}
+                if packed:
+                    row['packed_responses'] = pack_responses([
+                        PackedResponse(session_id, a['question_id'], a['user_answer'], a['is_correct'], a['response_time'])
+                        for a in answers
+                    ])
+                else:
+                    response_rows.extend(answers)
+                session_rows.append(row)
+            db.session.execute(db.insert(TestSession), session_rows)
+            if response_rows:
+                db.session.execute(db.insert(Response), response_rows)
+        if packed:
+            from utils.response_store import rebuild_offline_stats
+            rebuild_offline_stats()
+        db.session.commit()
+
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('VACUUM')
+            # WAL engine profiles leave the vacuumed pages in the -wal file until a checkpoint
+            conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+    return app
+
+
+def scan(app, packed):
+    from extensions import db
+    from models.question import Question
+    from models.response import Response
+    from models.test_session import TestSession
+    from utils.response_store import offline_response_stats, get_session_responses
+
+    with app.app_context():
+        started = time.perf_counter()
+        if packed:
+            stats = offline_response_stats()
+            categories = {name: tuple(counts) for name, counts in stats['category'].items()}
+        else:
+            categories = {
+                name: (attempts, correct) for name, attempts, correct in db.session.query(
+                    Question.category, db.func.count(Response.id), db.func.sum(db.cast(Response.is_correct, db.Integer))
+                ).join(Response, Response.question_id == Question.id).group_by(Question.category)
+            }
+        scan_time = time.perf_counter() - started
+
+        session_ids = random.Random(7).sample(range(1, TestSession.query.count() + 1), 200)
+        started = time.perf_counter()
+        for session_id in session_ids:
+            session = db.session.get(TestSession, session_id)
+            get_session_responses(session)
+        read_time = (time.perf_counter() - started) / len(session_ids)
+        db.session.remove()
+    return scan_time, read_time, categories
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark packed vs row-per-answer responses')
+    parser.add_argument('--sessions', type=int, default=20000)
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = {}
+        for layout, packed in (('rows', False), ('packed', True)):
+            # Each layout needs a fresh app bound to its own file
+            for module in [m for m in sys.modules if m in ('app', 'config')]:
+                del sys.modules[module]
+            db_path = os.path.join(tmpdir, f'{layout}.db')
+            started = time.perf_counter()
+            app = build(db_path, args.sessions, packed)
+            build_time = time.perf_counter() - started
+            scan_time, read_time, categories = scan(app, packed)
+            results[layout] = categories
+            size = os.path.getsize(db_path)
+            print(f"{layout:<7} size {size / 1024 / 1024:8.2f} MiB ({size / (args.sessions * 15):6.1f} B/answer)  "
+                  f"build {build_time:6.2f}s  full scan {scan_time * 1000:8.1f} ms  "
+                  f"session read {read_time * 1e6:7.1f} µs")
+
+        print("\nPer-category totals match:", results['rows'] == results['packed'])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Build the fingerprinted CSS/JS bundles served from /dist/ (see
+utils/assets.py): concatenate and minify each bundle, write it under a
+content-hashed name with .gz (and, with the optional brotli package, .br)
+siblings, then update manifest.json. Run it on every deploy; running workers
+pick up the new manifest within a few seconds.
+
+    python scripts/build_assets.py
+    python scripts/build_assets.py --output /srv/iq/dist --no-minify
+"""
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import argparse
+import time
+
+from config import Config
+from utils.assets import brotli, build_assets
+from utils.minify import MinifyError
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build fingerprinted, precompressed CSS/JS bundles')
+    parser.add_argument('--output', help='Output directory (default: ASSET_DIR or static/dist)')
+    parser.add_argument('--no-minify', action='store_true', help='Concatenate only')
+    args = parser.parse_args()
+
+    static_dir = os.path.join(ROOT, 'static')
+    output = args.output or Config.ASSET_DIR or os.path.join(static_dir, 'dist')
+
+    started = time.perf_counter()
+    try:
+        results = build_assets(static_dir, output, minify=not args.no_minify)
+    except MinifyError as e:
+        print(f"❌ Could not minify: {e}")
+        return 1
+
+    for result in results:
+        sizes = (f"{result['source'] / 1024:.1f} KB source -> {result['minified'] / 1024:.1f} KB, "
+                 f"gzip {result['gzip'] / 1024:.1f} KB")
+        if result['br'] is not None:
+            sizes += f", brotli {result['br'] / 1024:.1f} KB"
+        print(f"📦 {result['bundle']:<14} {result['file']:<32} {sizes}")
+    if brotli is None:
+        print("ℹ️  brotli is not installed; only .gz siblings were written")
+    print(f"✅ {len(results)} bundles written to {output} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
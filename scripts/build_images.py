@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Build the resized AVIF/WebP/PNG derivatives of static/images served from
+/dist/ (see utils/images.py), then estimate what the test page downloads
+with them compared with the original PNGs. Needs the optional Pillow
+package; run it whenever the artwork changes.
+
+    python scripts/build_images.py
+    python scripts/build_images.py --widths 64 128 256 --formats webp png
+"""
+import sys
+import os
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import argparse
+import time
+
+from config import Config
+from utils.images import FORMATS, WIDTHS, ImageBuildError, build_images
+
+# What /test/start shows at 2x pixel density: every category image as the
+# 48px indicator (128w) and the 120px transition (256w), the logo as the
+# 48px fallback (128w)
+CATEGORY_IMAGES = ('images/verbal_comprehension.png', 'images/perceptual_reasoning.png',
+                   'images/working_memory.png', 'images/processing_speed.png', 'images/fluid_reasoning.png')
+START_PAGE = [(name, 128) for name in CATEGORY_IMAGES + ('images/testmyiq_logo.png',)]
+START_PAGE += [(name, 256) for name in CATEGORY_IMAGES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build responsive image derivatives')
+    parser.add_argument('images', nargs='*', help='Paths under static/ (default: every PNG in static/images)')
+    parser.add_argument('--output', help='Output directory (default: ASSET_DIR or static/dist)')
+    parser.add_argument('--widths', nargs='+', type=int, default=list(WIDTHS))
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    args = parser.parse_args()
+
+    static_dir = os.path.join(ROOT, 'static')
+    output = args.output or Config.ASSET_DIR or os.path.join(static_dir, 'dist')
+
+    started = time.perf_counter()
+    try:
+        results = build_images(static_dir, output, names=args.images or None, widths=args.widths,
+                               formats=args.formats)
+    except ImageBuildError as e:
+        print(f"❌ {e}")
+        return 1
+
+    by_name = {}
+    for result in results:
+        by_name[result['image']] = result
+        print(f"🖼️  {result['image']} ({result['source'] / 1024:.0f} KB)")
+        for fmt, sizes in result['formats'].items():
+            print(f"   {fmt:<5} " + '  '.join(f"{width}w {size / 1024:.1f} KB" for width, size in sizes.items()))
+
+    shown = [(name, width) for name, width in START_PAGE if name in by_name]
+    if shown:
+        original = sum(by_name[name]['source'] for name in {name for name, _ in shown})
+        print(f"\n📊 /test/start images: originals {original / 1024:.0f} KB")
+        for fmt in next(iter(by_name.values()))['formats']:
+            total = 0
+            for name, width in shown:
+                sizes = by_name[name]['formats'][fmt]
+                total += sizes[min((size for size in sizes if size >= width), default=max(sizes))]
+            print(f"   {fmt:<5} {total / 1024:.0f} KB ({total / original:.1%})")
+    print(f"✅ {len(results)} images written to {output} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Run EXPLAIN QUERY PLAN over the registry in utils/query_plans.py and fail
+if any hot query does a full table scan.
+
+    python scripts/check_query_plans.py            # against the configured database
+    python scripts/check_query_plans.py --memory   # against a fresh schema from the models
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check hot query plans for full table scans')
+    parser.add_argument('--memory', action='store_true',
+                        help='Build the schema in an in-memory SQLite database instead of using DATABASE_URL')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every plan, not just failures')
+    args = parser.parse_args()
+
+    if args.memory:
+        os.environ['DATABASE_URL'] = 'sqlite://'
+
+    from app import create_app
+    from extensions import db
+    from utils.query_plans import check_query_plans
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            print(f"EXPLAIN QUERY PLAN checks only run on SQLite (got {db.engine.dialect.name}); skipping.")
+            return 0
+
+        if args.memory:
+            db.create_all()
+
+        failures = 0
+        for result in check_query_plans():
+            status = '❌' if result['full_scans'] else '✅'
+            print(f"{status} {result['name']}")
+            if result['full_scans'] or args.verbose:
+                for line in result['plan']:
+                    print(f"      {line}")
+            if result['full_scans']:
+                failures += 1
+                print(f"      full scan of: {', '.join(result['full_scans'])}")
+
+        if failures:
+            print(f"\n{failures} hot queries fall back to a full table scan")
+            return 1
+
+        print("\nAll hot queries use indexes")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
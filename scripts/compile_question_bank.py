@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compile the question bank into the memory-mapped pack read by the workers
+(see utils/question_pack.py).
+
+By default the pack is built from the question table, which is what the app
+serves; --source builds it straight from bank files instead. The ingestion
+scripts (upload_questions.py, scripts/update_questions.py) recompile it after
+every change, and running workers pick up the new file within a few seconds.
+
+    python scripts/compile_question_bank.py
+    python scripts/compile_question_bank.py --source static/questions.json static/questions2.json --output /tmp/bank.iqb
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+from utils.question_pack import QuestionPack, compile_pack, pack_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the question bank into a binary pack')
+    parser.add_argument('--source', nargs='+', help='Bank files, lowest precedence first (default: the database)')
+    parser.add_argument('--output', help='Pack path (default: QUESTION_PACK or <instance>/question_bank.iqb)')
+    args = parser.parse_args()
+
+    from app import create_app
+    from utils.question_ingest import database_rows, item_rows
+
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        if args.source:
+            from utils.question_bank import BuildReport, merge_sources, print_build_report
+            report = BuildReport(args.source)
+            rows, errors = item_rows(merge_sources(args.source, report))
+            print_build_report(report)
+            rows = list(rows.values())
+        else:
+            rows = database_rows()
+        if not rows:
+            print("❌ No questions to compile")
+            return 1
+
+        output = args.output or pack_path(app)
+        count, size = compile_pack(rows, output)
+        pack = QuestionPack(output)
+        print(f"✅ {count} questions compiled to {output} ({size / 1024:.1f} KB, "
+              f"{pack.string_count} distinct strings, {pack.group_count} groups, version {pack.version}) "
+              f"in {time.perf_counter() - started:.2f}s")
+        pack.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Stream responses (joined to question and test_session) or sessions to CSV,
+newline-delimited JSON or Parquet for offline analysis.
+
+Examples:
+    python scripts/export_responses.py --format ndjson --start 2025-08-01 -o responses.ndjson
+    python scripts/export_responses.py --dataset sessions --username aourti
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+from app import create_app
+from utils.response_export import stream_export, ExportError, EXPORT_FORMATS, DATASETS, DEFAULT_CHUNK_SIZE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dataset', choices=sorted(DATASETS), default='responses')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--start', help='Only sessions started on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Only sessions started before this date (YYYY-MM-DD)')
+    parser.add_argument('--category', help='Question category, e.g. "Working Memory"')
+    parser.add_argument('--user-id', type=int, help='Only sessions of this user id')
+    parser.add_argument('--username', help='Only sessions of this username')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+    return args
+
+
+def export_responses():
+    args = parse_args()
+    app = create_app()
+
+    with app.app_context():
+        try:
+            blocks = stream_export(
+                fmt=args.format,
+                dataset=args.dataset,
+                chunk_size=args.chunk_size,
+                start=args.start,
+                end=args.end,
+                category=args.category,
+                user_id=args.user_id,
+                username=args.username
+            )
+        except ExportError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+
+        binary = args.format == 'parquet'
+        if args.output and binary:
+            out = open(args.output, 'wb')
+        elif args.output:
+            out = open(args.output, 'w', encoding='utf-8', newline='')
+        else:
+            out = sys.stdout.buffer if binary else sys.stdout
+
+        started = time.perf_counter()
+        written = 0
+        try:
+            for block in blocks:
+                out.write(block)
+                written += len(block)
+        finally:
+            if args.output:
+                out.close()
+
+        elapsed = time.perf_counter() - started
+        print(f"Exported {args.dataset} as {args.format}: {written} bytes in {elapsed:.2f}s", file=sys.stderr)
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(export_responses())
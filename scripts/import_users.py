@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Bulk-create users from a CSV or JSONL file.
+
+Each record needs username, email and password; age and is_admin are
+optional. Records are processed in chunks. Each chunk gets one query that
+finds usernames/emails already taken, its passwords are hashed in a process
+pool, and the survivors are written with one bulk INSERT. A chunk whose
+insert fails (e.g. a concurrent registration took a name) is retried row by
+row, so one bad record never sinks its neighbours. Rejected records can be
+written to --errors with the reason.
+
+    python scripts/import_users.py cohort.csv
+    python scripts/import_users.py cohort.jsonl --chunk-size 2000 --workers 8 --errors rejected.jsonl
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+FIELDS = ('username', 'email', 'password', 'age', 'is_admin')
+
+
+def hash_password(password):
+    # Top-level so the process pool can pickle it
+    return generate_password_hash(password)
+
+
+def read_records(path, fmt):
+    """Yield (line number, record dict) from a CSV or JSONL file"""
+    with open(path, newline='' if fmt == 'csv' else None, encoding='utf-8') as f:
+        if fmt == 'csv':
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_no, {'_error': f'invalid JSON: {e}'}
+                    continue
+                yield line_no, record if isinstance(record, dict) else {'_error': 'not a JSON object'}
+
+
+def normalize(record):
+    """Validated user fields, or raise ValueError with the reason"""
+    if '_error' in record:
+        raise ValueError(record['_error'])
+
+    username = (record.get('username') or '').strip()
+    email = (record.get('email') or '').strip()
+    password = record.get('password') or ''
+    if not username or not email or not password:
+        raise ValueError('username, email and password are required')
+    if len(username) > 80 or len(email) > 120:
+        raise ValueError('username or email too long')
+    if '@' not in email:
+        raise ValueError('invalid email')
+
+    age = record.get('age')
+    if age in (None, ''):
+        age = 18
+    else:
+        try:
+            age = int(age)
+        except (TypeError, ValueError):
+            raise ValueError('invalid age')
+        if age < 13 or age > 120:
+            raise ValueError('age must be between 13 and 120')
+
+    is_admin = record.get('is_admin')
+    if isinstance(is_admin, str):
+        is_admin = is_admin.strip().lower() in ('1', 'true', 'yes')
+
+    return {'username': username, 'email': email, 'password': password, 'age': age, 'is_admin': bool(is_admin)}
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Report:
+    def __init__(self, errors_path=None):
+        self.created = 0
+        self.rejected = 0
+        self.reasons = {}
+        self.hash_time = 0.0
+        self.db_time = 0.0
+        self.errors_file = open(errors_path, 'w', encoding='utf-8') if errors_path else None
+
+    def reject(self, line_no, record, reason):
+        self.rejected += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        if self.errors_file:
+            safe = {key: value for key, value in record.items() if key in FIELDS and key != 'password'}
+            self.errors_file.write(json.dumps({'line': line_no, 'reason': reason, 'record': safe}) + '\n')
+
+    def close(self):
+        if self.errors_file:
+            self.errors_file.close()
+
+
+def taken_names(db, User, users):
+    """Usernames and emails of the chunk that already exist, in one query"""
+    usernames = [user['username'] for user in users]
+    emails = [user['email'] for user in users]
+    rows = db.session.query(User.username, User.email).filter(
+        db.or_(User.username.in_(usernames), User.email.in_(emails))
+    ).all()
+    return {row.username for row in rows}, {row.email for row in rows}
+
+
+def insert_chunk(db, User, pending, report, dry_run):
+    """Bulk insert [(line_no, user)]; on a conflict fall back to one row at a time"""
+    rows = [user for _, user in pending]
+    if dry_run:
+        report.created += len(rows)
+        return
+    try:
+        db.session.execute(db.insert(User), rows)
+        db.session.commit()
+        report.created += len(rows)
+        return
+    except IntegrityError:
+        db.session.rollback()
+
+    for line_no, user in pending:
+        try:
+            db.session.execute(db.insert(User), [user])
+            db.session.commit()
+            report.created += 1
+        except IntegrityError:
+            db.session.rollback()
+            report.reject(line_no, user, 'username or email already exists')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-create users from CSV or JSONL')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help='Defaults to the file extension')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Password hashing processes')
+    parser.add_argument('--errors', help='Write rejected records (without passwords) to this JSONL file')
+    parser.add_argument('--dry-run', action='store_true', help='Validate and hash but do not insert')
+    args = parser.parse_args()
+
+    fmt = args.format or ('csv' if args.path.lower().endswith('.csv') else 'jsonl')
+
+    from app import create_app
+    from extensions import db
+    from models.user import User
+
+    app = create_app()
+    report = Report(args.errors)
+    seen_usernames, seen_emails = set(), set()
+    started = time.perf_counter()
+
+    with app.app_context(), ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for chunk in chunked(read_records(args.path, fmt), args.chunk_size):
+            valid = []
+            for line_no, record in chunk:
+                try:
+                    user = normalize(record)
+                except ValueError as e:
+                    report.reject(line_no, record, str(e))
+                    continue
+                if user['username'] in seen_usernames or user['email'] in seen_emails:
+                    report.reject(line_no, user, 'duplicate within the file')
+                    continue
+                seen_usernames.add(user['username'])
+                seen_emails.add(user['email'])
+                valid.append((line_no, user))
+            if not valid:
+                continue
+
+            db_started = time.perf_counter()
+            taken_usernames, taken_emails = taken_names(db, User, [user for _, user in valid])
+            report.db_time += time.perf_counter() - db_started
+
+            pending = []
+            for line_no, user in valid:
+                if user['username'] in taken_usernames or user['email'] in taken_emails:
+                    report.reject(line_no, user, 'username or email already exists')
+                else:
+                    pending.append((line_no, user))
+            if not pending:
+                continue
+
+            hash_started = time.perf_counter()
+            passwords = [user.pop('password') for _, user in pending]
+            hashes = pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (args.workers * 4)))
+            for (_, user), password_hash in zip(pending, hashes):
+                user['password_hash'] = password_hash
+            report.hash_time += time.perf_counter() - hash_started
+
+            db_started = time.perf_counter()
+            insert_chunk(db, User, pending, report, args.dry_run)
+            report.db_time += time.perf_counter() - db_started
+
+            elapsed = time.perf_counter() - started
+            print(f"   {report.created} created, {report.rejected} rejected "
+                  f"({report.created / elapsed:.0f} users/s)")
+
+    report.close()
+    elapsed = time.perf_counter() - started
+    verb = 'would be created' if args.dry_run else 'created'
+    print(f"✅ {report.created} users {verb}, {report.rejected} rejected in {elapsed:.2f}s "
+          f"({report.created / elapsed if elapsed else 0:.0f} users/s; "
+          f"hashing {report.hash_time:.2f}s on {args.workers} workers, database {report.db_time:.2f}s)")
+    for reason, count in sorted(report.reasons.items(), key=lambda item: -item[1]):
+        print(f"   {count:>7}  {reason}")
+    return 1 if report.rejected and not report.created else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
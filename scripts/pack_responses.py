@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Pack the Response rows of finished test sessions into one compact blob per
+session (TestSession.packed_responses) and delete the rows.
+
+Profile and admin views read packed sessions through utils/response_store.py.
+Only sessions that ended more than --older-than-days ago are packed, so the
+home page's 7-day window keeps working from live rows. Packing adds the
+answers to the OfflineResponseStat totals and unpacking removes them.
+
+    python scripts/pack_responses.py --older-than-days 30
+    python scripts/pack_responses.py --unpack          # restore rows for every packed session
+    python scripts/pack_responses.py --rebuild-stats   # recount the totals the analytics views read
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from datetime import datetime, timedelta
+
+from app import create_app
+from extensions import db
+from models.test_session import TestSession
+from utils.response_packing import PackingError
+from utils.response_store import pack_session, rebuild_offline_stats, unpack_session
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack finished sessions into compact blobs')
+    parser.add_argument('--older-than-days', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=200, help='Sessions per commit')
+    parser.add_argument('--unpack', action='store_true', help='Restore rows from blobs instead of packing')
+    parser.add_argument('--rebuild-stats', action='store_true',
+                        help='Recompute the totals of packed and archived answers from the blobs')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.rebuild_stats:
+            rows, skipped = rebuild_offline_stats()
+            db.session.commit()
+            for session_id in skipped:
+                print(f"   Skipped unreadable session {session_id}")
+            print(f"✅ Rebuilt {rows} (user, question) totals, {len(skipped)} sessions skipped")
+            return 0
+
+        if args.unpack:
+            query = TestSession.query.filter(TestSession.packed_responses.isnot(None))
+        else:
+            cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+            query = TestSession.query.filter(
+                TestSession.end_time.isnot(None),
+                TestSession.end_time < cutoff,
+                TestSession.packed_responses.is_(None)
+            )
+
+        session_ids = [session_id for (session_id,) in query.with_entities(TestSession.id).order_by(TestSession.id)]
+        print(f"{'📦 Unpacking' if args.unpack else '📦 Packing'} {len(session_ids)} sessions...")
+
+        sessions_done = responses_done = blob_bytes = errors = 0
+        for start in range(0, len(session_ids), args.batch_size):
+            batch = TestSession.query.filter(TestSession.id.in_(session_ids[start:start + args.batch_size])).all()
+            for session in batch:
+                try:
+                    if args.unpack:
+                        count = unpack_session(session)
+                    else:
+                        count = pack_session(session)
+                        if count:
+                            blob_bytes += len(session.packed_responses)
+                except PackingError as e:
+                    errors += 1
+                    print(f"   Skipped session {session.id}: {e}")
+                    continue
+                if count:
+                    sessions_done += 1
+                    responses_done += count
+            db.session.commit()
+
+        print(f"✅ {sessions_done} sessions, {responses_done} responses processed, {errors} skipped")
+        if blob_bytes:
+            print(f"   Packed size: {blob_bytes} bytes ({blob_bytes / max(responses_done, 1):.1f} bytes/response)")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Copy the primary SQLite database onto the local replica file configured in
+REPLICA_DATABASE_URL, using SQLite's online backup API (safe while the app
+is running). Run it from cron to emulate replication lag locally.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import time
+
+from app import create_app
+from extensions import db
+from utils.db_routing import REPLICA_BIND
+
+
+def sync_replica():
+    app = create_app()
+    with app.app_context():
+        primary = db.engines[None]
+        replica = db.engines.get(REPLICA_BIND)
+
+        if replica is None:
+            print("❌ REPLICA_DATABASE_URL is not set")
+            return 1
+        if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            print("❌ sync_replica only copies between SQLite files; use the database's own replication otherwise")
+            return 1
+
+        primary_path = primary.url.database
+        replica_path = replica.url.database
+        if replica_path.startswith('file:'):
+            # URI form such as file:/path/replica.db?mode=ro
+            replica_path = replica_path[len('file:'):].split('?', 1)[0]
+
+        started = time.perf_counter()
+        source = sqlite3.connect(primary_path)
+        target = sqlite3.connect(replica_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        print(f"✅ Copied {primary_path} -> {replica_path} in {time.perf_counter() - started:.2f}s")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(sync_replica())
@@ -1,45 +1,60 @@
+#!/usr/bin/env python3
+"""
+Sync the question table with static/questions.json.
+
+Only added and changed questions are written (compared by content hash).
+Questions missing from the file are left alone unless --prune is given, and
+even then questions that have responses are kept so past sessions still
+resolve.
+
+    python scripts/update_questions.py --dry-run --verbose
+    python scripts/update_questions.py --prune
+"""
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import argparse
+
 from app import create_app, db
-from models.question import Question
-import json
+from utils.question_bank import BuildReport, merge_sources, print_build_report
+from utils.question_ingest import database_rows, item_rows, print_sync_result, sync_questions
+from utils.question_pack import compile_pack, pack_path
 
-app = create_app()
 
-def update_questions():
+def update_questions(path='static/questions.json', prune=False, dry_run=False, verbose=False):
+    app = create_app()
     with app.app_context():
-        # Delete all existing questions
-        print("Deleting old questions...")
-        db.session.query(Question).delete()
-        
-        # Load questions from JSON
-        print("Loading new questions from static/questions.json...")
-        with open('static/questions.json', 'r', encoding='utf-8') as f:
-            questions_data = json.load(f)
-            
-        # Insert questions into database
-        print("Inserting new questions into the database...")
-        for category, difficulties in questions_data.items():
-            for difficulty, questions in difficulties.items():
-                for question in questions:
-                    db_question = Question(
-                        id=question['id'],
-                        question_text=question['question'],
-                        options=json.dumps(question.get('options', [])) if question.get('options') else None,
-                        correct_answer=str(question.get('correct', '')) if 'correct' in question else None,
-                        category=category,
-                        difficulty=difficulty,
-                        question_type=question.get('type', 'multiple-choice'),
-                        points=question.get('points', 1),
-                        display_time=question.get('displayTime')
-                    )
-                    db.session.add(db_question)
-        
-        # Commit the changes
-        db.session.commit()
-        print("Database questions updated successfully!")
+        print(f"Loading questions from {path}...")
+        report = BuildReport([path])
+        rows, errors = item_rows(merge_sources([path], report))
+        print_build_report(report)
+        for question_id, message in errors:
+            print(f"Skipping {question_id}: {message}")
+
+        result = sync_questions(rows, prune=prune, dry_run=dry_run)
+        if dry_run:
+            db.session.rollback()
+            print("Dry run: nothing written.")
+        else:
+            db.session.commit()
+            # Workers serve questions from the compiled pack; rebuild it from what was just committed
+            count, _ = compile_pack(database_rows(), pack_path(app))
+            print(f"📦 Question pack recompiled ({count} questions)")
+            print(f"Database questions updated ({result.writes} rows written).")
+        print_sync_result(result, prune=prune, verbose=verbose)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync questions from a JSON bank file')
+    parser.add_argument('--file', default='static/questions.json')
+    parser.add_argument('--prune', action='store_true', help='Delete questions missing from the file (unless answered)')
+    parser.add_argument('--dry-run', action='store_true', help='Report the diff without writing')
+    parser.add_argument('--verbose', action='store_true', help='List the ids added, changed and removed')
+    args = parser.parse_args()
+    return update_questions(args.file, prune=args.prune, dry_run=args.dry_run, verbose=args.verbose)
+
 
 if __name__ == "__main__":
-    update_questions()
+    sys.exit(main())
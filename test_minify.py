@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the CSS and JavaScript minifiers used by scripts/build_assets.py
+"""
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from utils.minify import MinifyError, minify_css, minify_js
+
+CSS_CASES = [
+    ('a :hover { color : red ; }', 'a :hover{color :red}\n', 'space before : kept, last ; dropped'),
+    ('@media screen and (max-width: 10px) { p { x: 1 } }',
+     '@media screen and (max-width:10px){p{x:1}}\n', 'space before ( kept'),
+    ('p > a , b { margin: 0 auto }', 'p>a,b{margin:0 auto}\n', 'combinators tightened'),
+    ('/* header */ a { content: "a  /* b */  ;" }', 'a{content:"a  /* b */  ;"}\n', 'strings untouched'),
+]
+
+JS_CASES = [
+    ('var a = b  - -c;', 'var a=b- -c;\n', 'operators not glued'),
+    ('i ++ + + j', 'i++ + +j\n', 'increment not glued'),
+    ('return\n  1;', 'return\n1;\n', 'line break kept for semicolon insertion'),
+    ('x = a // note\n+ b', 'x=a\n+b\n', 'line comment dropped'),
+    ('s.replace(/ +\\/ /g, " ")', 's.replace(/ +\\/ /g," ")\n', 'regex untouched'),
+    ('a = b / 2 / c', 'a=b/2/c\n', 'division is not a regex'),
+    ('const t = `a ${ 1 + 2 }  b`;', 'const t=`a ${1+2}  b`;\n', 'template literal untouched'),
+    ("x = 'it''s'", "x='it''s'\n", 'adjacent strings'),
+]
+
+BAD_INPUTS = [
+    (minify_css, 'a { color: red } /* open'),
+    (minify_css, 'a { content: "open }'),
+    (minify_js, 'var s = "open\n";'),
+    (minify_js, 'var t = `open ${1}'),
+]
+
+
+def run_cases(minify, cases):
+    ok = True
+    for source, expected, reason in cases:
+        result = minify(source)
+        if result == expected:
+            print(f"✅ {reason}")
+        else:
+            print(f"❌ {reason}: expected {expected!r}, got {result!r}")
+            ok = False
+    return ok
+
+
+def test_css():
+    """Test CSS minification of known inputs"""
+    return run_cases(minify_css, CSS_CASES)
+
+
+def test_js():
+    """Test JavaScript minification of known inputs"""
+    return run_cases(minify_js, JS_CASES)
+
+
+def test_errors():
+    """Test that unterminated comments, strings and templates raise MinifyError"""
+    ok = True
+    for minify, source in BAD_INPUTS:
+        try:
+            minify(source)
+            print(f"❌ {minify.__name__} accepted {source!r}")
+            ok = False
+        except MinifyError:
+            print(f"✅ {minify.__name__} rejected {source!r}")
+    return ok
+
+
+def test_static_assets():
+    """Test the app's own assets: minifying twice changes nothing, and minified JS still parses"""
+    ok = True
+    node = shutil.which('node')
+    for pattern, minify in (('static/css/*.css', minify_css), ('static/js/*.js', minify_js)):
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+            once = minify(source)
+            if minify(once) != once:
+                print(f"❌ {path}: second pass changed the output")
+                ok = False
+                continue
+            if node and path.endswith('.js'):
+                with tempfile.NamedTemporaryFile('w', suffix='.js', delete=False) as out:
+                    out.write(once)
+                check = subprocess.run([node, '--check', out.name], capture_output=True, text=True)
+                os.unlink(out.name)
+                if check.returncode:
+                    print(f"❌ {path}: minified output does not parse\n{check.stderr[:500]}")
+                    ok = False
+                    continue
+            print(f"✅ {path}: {len(source)} -> {len(once)} bytes")
+    if not node:
+        print("node not found - minified JavaScript was not syntax-checked")
+    return ok
+
+
+if __name__ == "__main__":
+    print("Testing asset minifiers...")
+    print("=" * 50)
+
+    print("\n1. Testing CSS...")
+    results = [test_css()]
+
+    print("\n2. Testing JavaScript...")
+    results.append(test_js())
+
+    print("\n3. Testing malformed input...")
+    results.append(test_errors())
+
+    print("\n4. Testing static assets...")
+    results.append(test_static_assets())
+
+    print("\n" + "=" * 50)
+    print("Tests completed!")
+    sys.exit(0 if all(results) else 1)
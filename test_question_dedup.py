@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script to verify MinHash/LSH near-duplicate detection in the question bank
+"""
+import os
+import random
+import sys
+import tempfile
+
+from utils.question_bank import iter_source, write_bank
+from utils.question_dedup import drop_questions, find_duplicates, merged_ids, minhash, shingles, similarity
+
+PROMPT = ('Which word is most nearly the same in meaning as the word written in capitals: '
+          'the committee gave a CANDID account of the failures of the previous year')
+OPTIONS = ['frank', 'hidden', 'rehearsed', 'brief']
+
+
+def make_bank():
+    """Bank items as (category, difficulty, question) with the expected outcome in the ids"""
+    random.seed(3)
+    words = [f'w{random.randint(0, 10 ** 6)}' for _ in range(120)]
+    chain_b = list(words)
+    for k in range(0, 120, 14):
+        chain_b[k] = 'x' + chain_b[k]
+    chain_c = list(chain_b)
+    for k in range(7, 120, 14):
+        chain_c[k] = 'y' + chain_c[k]
+
+    verbal = [
+        {'id': 'syn_keep', 'question': PROMPT, 'options': OPTIONS, 'correct': 0},
+        # Same item with one distractor reworded: merged
+        {'id': 'syn_dup', 'question': PROMPT + '.', 'options': ['frank', 'concealed', 'rehearsed', 'brief'],
+         'correct': 0},
+        # Same prompt, different correct answer: reported only
+        {'id': 'syn_other_answer', 'question': PROMPT, 'options': OPTIONS, 'correct': 1},
+        # Same prompt, different task parameters: never compared
+        {'id': 'syn_timed', 'question': PROMPT, 'options': OPTIONS, 'correct': 0, 'timeLimit': 20},
+        {'id': 'unrelated', 'question': 'What is the capital city of the country shaped like a boot?',
+         'options': ['Rome', 'Madrid', 'Lisbon', 'Athens'], 'correct': 0},
+        # A~B and B~C above the threshold, A~C below it
+        {'id': 'chain_a', 'question': ' '.join(words), 'options': ['yes', 'no'], 'correct': 0},
+        {'id': 'chain_b', 'question': ' '.join(chain_b), 'options': ['yes', 'no'], 'correct': 0},
+        {'id': 'chain_c', 'question': ' '.join(chain_c), 'options': ['yes', 'no'], 'correct': 0},
+    ]
+    # Generated at test time, so there is no fixed answer to compare: reported only
+    spans = [
+        {'id': 'span_1', 'question': 'Remember the digits and type them back in order', 'length': 5},
+        {'id': 'span_2', 'question': 'Remember the digits and type them back in order', 'length': 5},
+    ]
+    return ([('Verbal Comprehension', 'easy', q) for q in verbal]
+            + [('Working Memory', 'medium', q) for q in spans])
+
+
+def clustered(report):
+    """{kept id: {duplicate id: merge}}"""
+    return {cluster['keep']: {d['id']: d['merge'] for d in cluster['duplicates']}
+            for cluster in report['clusters']}
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def test_similarity_estimate():
+    """Test that the MinHash estimate follows the Jaccard similarity of the shingle sets"""
+    bank = {q['id']: q for _, _, q in make_bank()}
+    ok = True
+    for first, second in (('syn_keep', 'syn_dup'), ('chain_a', 'chain_b'), ('syn_keep', 'unrelated')):
+        a, b = shingles(bank[first]), shingles(bank[second])
+        jaccard = len(a & b) / len(a | b)
+        estimate = similarity(minhash(a), minhash(b))
+        ok &= check(abs(estimate - jaccard) < 0.1,
+                    f"{first} ~ {second}: estimate {estimate:.3f}, Jaccard {jaccard:.3f}")
+    return ok
+
+
+def test_clusters(path):
+    """Test which items are clustered and which the same-answer policy merges"""
+    report = find_duplicates(path, threshold=0.86, policy='same-answer')
+    clusters = clustered(report)
+    ok = check(clusters.get('syn_keep', {}).get('syn_dup') is True, "reworded duplicate merged")
+    ok &= check(clusters.get('syn_keep', {}).get('syn_other_answer') is False,
+                "same prompt with another answer reported, not merged")
+    ok &= check(all('syn_timed' not in dups and keep != 'syn_timed' for keep, dups in clusters.items()),
+                "item with other parameters not compared")
+    ok &= check(all('unrelated' not in dups and keep != 'unrelated' for keep, dups in clusters.items()),
+                "unrelated item not clustered")
+    ok &= check(clusters.get('chain_a', {}).get('chain_b') is True, "chain: B merged into A")
+    ok &= check(clusters.get('chain_a', {}).get('chain_c') is False,
+                "chain: C in A's cluster but below the threshold against A, not merged")
+    ok &= check(clusters.get('span_1', {}).get('span_2') is False, "generated span items never merged")
+
+    off = find_duplicates(path, threshold=0.86, policy='off')
+    ok &= check(clustered(off).keys() == clusters.keys() and not merged_ids(off),
+                "policy 'off' reports the same clusters and merges nothing")
+    return ok, report
+
+
+def test_drop(path, report):
+    """Test that dropping the merged ids rewrites the bank without them"""
+    ids = merged_ids(report)
+    dropped = drop_questions(path, ids)
+    remaining = [question['id'] for _, _, question in iter_source(path)]
+    return check(dropped == len(ids) == 2 and not ids & set(remaining) and len(remaining) == 8,
+                 f"dropped {sorted(ids)}, {len(remaining)} questions left")
+
+
+if __name__ == "__main__":
+    print("Testing question deduplication...")
+    print("=" * 50)
+
+    bank_path = os.path.join(tempfile.mkdtemp(), 'bank.json')
+    write_bank(make_bank(), bank_path)
+
+    print("\n1. Testing MinHash similarity estimates...")
+    results = [test_similarity_estimate()]
+
+    print("\n2. Testing LSH clusters and the merge policy...")
+    passed, dedup_report = test_clusters(bank_path)
+    results.append(passed)
+
+    print("\n3. Testing dropping merged questions...")
+    results.append(test_drop(bank_path, dedup_report))
+
+    print("\n" + "=" * 50)
+    print("Tests completed!")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script to verify packed responses decode to the answers that were stored
+and score the same as the Response rows they replace
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from utils.response_packing import PackingError, unpack_responses, pack_responses
+
+
+class Answer:
+    """Response-like object for pack_responses"""
+
+    def __init__(self, question_id, user_answer, is_correct, response_time):
+        self.question_id = question_id
+        self.user_answer = user_answer
+        self.is_correct = is_correct
+        self.response_time = response_time
+
+
+def test_round_trip():
+    """Test that every kind of answer survives pack -> unpack"""
+
+    answers = [
+        Answer('vc_e1', '2', True, 4.3),             # option index
+        Answer('wm_m1', '0417', False, 12.0),        # digits with a leading zero are text
+        Answer('wm_m2', '31', True, None),           # unknown response time
+        Answer('vc_m3', 'café', False, 0.1),         # non-ASCII text
+        Answer('vc_m4', '٣', False, 2.5),            # Unicode digit is text, not an option
+        Answer('ps_e1', '', False, 7.7),             # empty answer
+        Answer('vc_e1', '2', True, 99999.0),         # repeated question, clamped time
+    ]
+
+    decoded = unpack_responses(pack_responses(answers), test_session_id=7)
+    failures = 0
+    if len(decoded) != len(answers):
+        print(f"❌ Expected {len(answers)} responses, got {len(decoded)}")
+        return False
+
+    for original, response in zip(answers, decoded):
+        expected_time = original.response_time
+        if expected_time is not None:
+            expected_time = min(expected_time, (0xFFFF - 1) / 10)
+        got = (response.test_session_id, response.question_id, response.user_answer,
+               response.is_correct, response.response_time)
+        expected = (7, original.question_id, original.user_answer, original.is_correct, expected_time)
+        if got != expected:
+            print(f"❌ {original.question_id}: expected {expected}, got {got}")
+            failures += 1
+
+    if failures:
+        return False
+    print(f"✅ {len(answers)} responses round-trip unchanged")
+    return True
+
+
+def test_rejects_bad_blob():
+    """Test that a blob with the wrong magic is refused"""
+
+    try:
+        unpack_responses(b'XX' + pack_responses([])[2:])
+    except PackingError:
+        print("✅ Unknown blob rejected")
+        return True
+    print("❌ Unknown blob was decoded")
+    return False
+
+
+def test_packed_session_score():
+    """Test that pack_session -> get_session_responses -> calculate_score matches the row-based score"""
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'packing.db')
+    from app import create_app
+    from models import db, Question, Response, TestSession, User
+    from utils.response_store import get_session_responses, pack_session
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='packing', email='packing@example.com', age=30)
+        user.set_password('testpassword123')
+        db.session.add(user)
+
+        categories = ['Verbal Comprehension', 'Perceptual Reasoning', 'Working Memory',
+                      'Processing Speed', 'Fluid Reasoning']
+        for i, category in enumerate(categories):
+            for j, difficulty in enumerate(('easy', 'medium', 'hard')):
+                db.session.add(Question(id=f'q{i}{j}', question_text=f'{category} {difficulty}',
+                                        options=['a', 'b', 'c', 'd'], correct_answer='1',
+                                        category=category, difficulty=difficulty,
+                                        question_type='multiple-choice'))
+        db.session.flush()
+
+        session = TestSession(user_id=user.id, total_questions=15, end_time=datetime.utcnow())
+        db.session.add(session)
+        db.session.flush()
+        for n, question in enumerate(Question.query.order_by(Question.id)):
+            db.session.add(Response(test_session_id=session.id, question_id=question.id,
+                                    user_answer=str(n % 4), is_correct=n % 4 == 1,
+                                    response_time=round(3 + n * 1.7, 1)))
+        db.session.commit()
+
+        def answers(responses):
+            return [(r.question_id, r.user_answer, r.is_correct, r.response_time) for r in responses]
+
+        before = answers(get_session_responses(session, with_questions=True))
+        row_score = session.calculate_score(user.age)
+        row_domains = session.get_domain_scores_dict()
+
+        packed = pack_session(session)
+        db.session.commit()
+        db.session.expire_all()
+
+        session = db.session.get(TestSession, session.id)
+        after = get_session_responses(session, with_questions=True)
+        if Response.query.filter_by(test_session_id=session.id).count():
+            print("❌ Response rows were left behind after packing")
+            return False
+        if answers(after) != before:
+            print("❌ Packed responses differ from the rows")
+            return False
+        if any(r.question is None for r in after):
+            print("❌ Packed responses are missing their questions")
+            return False
+
+        packed_score = session.calculate_score(user.age)
+        if packed_score != row_score or session.get_domain_scores_dict() != row_domains:
+            print(f"❌ Score changed after packing: {row_score} -> {packed_score}")
+            return False
+
+    print(f"✅ {packed} packed responses score {packed_score}, same as the rows")
+    return True
+
+
+if __name__ == "__main__":
+    print("Testing packed responses...")
+    print("=" * 50)
+
+    print("\n1. Testing encode/decode round trip...")
+    results = [test_round_trip()]
+
+    print("\n2. Testing a corrupt blob...")
+    results.append(test_rejects_bad_blob())
+
+    print("\n3. Testing scores of a packed session...")
+    results.append(test_packed_session_score())
+
+    print("\n" + "=" * 50)
+    print("Tests completed!")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,220 @@
+"""
+Fingerprinted, precompressed CSS and JavaScript bundles.
+
+``scripts/build_assets.py`` concatenates the files of each bundle in
+``BUNDLES``, minifies them (see utils/minify.py), and writes them to
+``ASSET_DIR`` (default ``static/dist``) under names that carry a hash of
+their content, e.g. ``js/site.3f9c2a1b07de.js``, next to ``.gz`` and, when
+the optional ``brotli`` package is installed, ``.br`` siblings.
+``manifest.json`` maps each bundle name to its current file.
+
+Templates call ``asset_urls(bundle)`` and emit one tag per URL. With a
+manifest that is the hashed file under ``/dist/``. That URL never changes
+content, so it is served with a one-year ``immutable`` Cache-Control, and
+browsers skip revalidation entirely until a build changes the hash. The
+precompressed sibling is sent when the client accepts it, so nothing is
+compressed per request. Without a manifest (a checkout that was never built)
+the helper returns the bundle's source files from ``static/`` instead.
+
+Image derivatives (utils/images.py) are written to the same directory and
+served the same way.
+
+The CSS is split into two bundles so that the cascade order around the
+third-party stylesheets in base.html stays the same.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+
+from flask import abort, current_app, request, send_from_directory, url_for
+
+from utils.compression import negotiate
+from utils.minify import minify_css, minify_js
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLES = {
+    'css/base.css': ['css/styles.css', 'css/profile.css', 'css/auth.css', 'css/results-enhanced.css'],
+    'css/theme.css': ['css/enhanced.css', 'css/visibility-fixes.css', 'css/mobile-responsive.css'],
+    'js/site.js': ['js/enhanced.js', 'js/scientific-iq-calculator.js', 'js/app.js', 'js/engine.js'],
+}
+
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# How often asset_urls() re-checks the manifest's mtime
+RELOAD_CHECK_SECONDS = 5.0
+
+_MINIFIERS = {'.css': minify_css, '.js': minify_js}
+# Precompressed siblings in order of preference
+_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+_MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript', '.png': 'image/png', '.webp': 'image/webp',
+              '.avif': 'image/avif'}
+
+_manifests = {}
+_lock = threading.Lock()
+
+
+def asset_dir(app=None):
+    app = app or current_app
+    return app.config.get('ASSET_DIR') or os.path.join(app.static_folder, 'dist')
+
+
+def fingerprinted(name, data):
+    """'css/site.css' -> 'css/site.<hash>.css'"""
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def bundle_source(static_dir, files, minify=True):
+    """Concatenated (and minified) bundle contents as UTF-8 bytes"""
+    parts = []
+    for name in files:
+        with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+            source = f.read()
+        ext = os.path.splitext(name)[1]
+        if minify and ext in _MINIFIERS:
+            source = _MINIFIERS[ext](source)
+        parts.append(source)
+    # Each script ends its last statement, so ASI never joins it with the next file
+    separator = ';\n' if files and files[0].endswith('.js') else '\n'
+    return separator.join(part.rstrip() for part in parts).encode('utf-8') + b'\n'
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.partial'
+    with open(partial, 'wb') as f:
+        f.write(data)
+    os.replace(partial, path)
+
+
+def read_manifest(output_dir, filename=MANIFEST):
+    try:
+        with open(os.path.join(output_dir, filename), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def build_assets(static_dir, output_dir, bundles=None, minify=True, gzip_level=9, brotli_quality=11):
+    """
+    Write every bundle and its compressed siblings, then the manifest.
+    Files of the previous build are kept (pages rendered before a deploy
+    still reference them); older ones are removed. Returns one dict per
+    bundle with the file name and the source/minified/gzip/brotli sizes.
+    """
+    previous = read_manifest(output_dir)
+    manifest, results = {}, []
+    for name, files in (bundles or BUNDLES).items():
+        data = bundle_source(static_dir, files, minify)
+        filename = fingerprinted(name, data)
+        path = os.path.join(output_dir, filename)
+        _write(path, data)
+        result = {'bundle': name, 'file': filename,
+                  'source': sum(os.path.getsize(os.path.join(static_dir, source)) for source in files),
+                  'minified': len(data), 'gzip': None, 'br': None}
+
+        compressed = gzip.compress(data, compresslevel=gzip_level, mtime=0)
+        _write(path + '.gz', compressed)
+        result['gzip'] = len(compressed)
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=brotli_quality)
+            _write(path + '.br', compressed)
+            result['br'] = len(compressed)
+
+        manifest[name] = filename
+        results.append(result)
+
+    _write(os.path.join(output_dir, MANIFEST),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8') + b'\n')
+
+    prune_builds(output_dir, [os.path.splitext(name)[0] for name in manifest],
+                 set(manifest.values()) | set(previous.values()))
+    return results
+
+
+def prune_builds(output_dir, stems, keep):
+    """
+    Remove fingerprinted files of ``stems`` (e.g. 'css/base' for
+    css/base.<hash>.css) that are not in ``keep``, with their siblings.
+    Other files in the directory are left alone.
+    """
+    keep = set(keep) | {f'{filename}{suffix}' for filename in keep for _, suffix in _ENCODINGS}
+    prefixes = tuple(f'{stem}.' for stem in stems)
+    for root, _, names in os.walk(output_dir):
+        for entry in names:
+            relative = os.path.relpath(os.path.join(root, entry), output_dir).replace(os.sep, '/')
+            if relative.startswith(prefixes) and relative not in keep:
+                os.remove(os.path.join(root, entry))
+
+
+def load_manifest(filename=MANIFEST):
+    """A JSON manifest in the app's ASSET_DIR, reloaded when the file changes; {} if never built"""
+    path = os.path.join(asset_dir(), filename)
+    now = time.monotonic()
+    with _lock:
+        entry = _manifests.get(path)
+        if entry is not None and entry[2] > now:
+            return entry[0]
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            _manifests.pop(path, None)
+            return {}
+        if entry is None or entry[1] != mtime:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                current_app.logger.warning('Ignoring asset manifest %s: %s', path, e)
+                manifest = {}
+        else:
+            manifest = entry[0]
+        _manifests[path] = (manifest, mtime, now + RELOAD_CHECK_SECONDS)
+        return manifest
+
+
+def asset_urls(bundle):
+    """URLs to include for ``bundle``: the built file, or its sources when there is no build"""
+    filename = load_manifest().get(bundle) if current_app.config.get('ASSETS_ENABLED', True) else None
+    if filename:
+        return [url_for('assets', filename=filename)]
+    if bundle not in BUNDLES:
+        raise KeyError(f'Unknown asset bundle {bundle!r}')
+    return [url_for('static', filename=name) for name in BUNDLES[bundle]]
+
+
+def install_assets(app):
+    """Serve built files at /dist/ and expose asset_urls() to templates"""
+
+    def serve_asset(filename):
+        # Files of this and the previous build; siblings are only sent through negotiation
+        if filename.endswith(('.json', '.gz', '.br', '.partial')):
+            abort(404)
+        directory = asset_dir()
+        available = [encoding for encoding, suffix in _ENCODINGS
+                     if os.path.exists(os.path.join(directory, filename + suffix))]
+        encoding = negotiate(request.accept_encodings, available) if available else None
+        suffix = dict(_ENCODINGS).get(encoding, '')
+        mimetype = _MIMETYPES.get(os.path.splitext(filename)[1]) or mimetypes.guess_type(filename)[0]
+        response = send_from_directory(directory, filename + suffix, mimetype=mimetype,
+                                       max_age=IMMUTABLE_MAX_AGE, etag=False)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.add_url_rule('/dist/<path:filename>', 'assets', serve_asset)
+    app.add_template_global(asset_urls)
@@ -0,0 +1,152 @@
+"""
+Response compression for JSON and HTML.
+
+An ``after_request`` hook compresses a response body when the client sends a
+matching ``Accept-Encoding``, the mimetype is in ``COMPRESSION_MIMETYPES``
+and the body is at least ``COMPRESSION_MIN_SIZE`` bytes (small bodies lose
+more to the gzip header than they save). Brotli is preferred when the
+optional ``brotli`` package is installed; otherwise gzip from the standard
+library is used.
+
+Skipped: streamed and file responses (exports, static files), bodies that
+already have a ``Content-Encoding``, ``Cache-Control: no-transform``, and
+status codes without a full body (1xx, 204, 206, 304). Every response of an
+allowlisted type gets ``Vary: Accept-Encoding`` so shared caches keep the
+encodings apart. A strong ``ETag`` becomes weak on compressed responses: the
+bytes differ from the identity encoding, while conditional requests still
+match it (``If-None-Match`` uses the weak comparison).
+
+Responses with an ``ETag`` are versioned documents that are the same for
+every user (the question manifest); their compressed bodies are kept in a
+small per-worker LRU keyed by a hash of the uncompressed body, the encoding
+and the level, so they are compressed once per worker instead of on every
+request. Per-user pages have no ETag and are compressed directly.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+from utils.memory_profiling import register_cache
+from utils.metrics import record_cache_lookup, registry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml',
+)
+
+# Status codes whose body is absent or partial
+_NO_BODY = (204, 206, 304)
+
+COMPRESSION_BYTES = registry.counter(
+    'http_compression_bytes_total', 'Response body bytes before and after compression',
+    ('encoding', 'stage'))
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_settings = {'size': 64, 'max_body': 1024 * 1024}
+
+register_cache('compression', lambda: _cache)
+
+
+def available_encodings():
+    """Encodings this worker can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encodings, encodings=None):
+    """Best encoding the client accepts (highest q, ties go to the preferred one), or None"""
+    best, best_quality = None, 0
+    for encoding in encodings or available_encodings():
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def cached_compress(data, encoding, level):
+    """compress() through the per-worker LRU; bodies over the size cap are not kept"""
+    if _settings['size'] <= 0 or len(data) > _settings['max_body']:
+        return compress(data, encoding, level)
+
+    key = (encoding, level, hashlib.blake2b(data, digest_size=16).digest())
+    with _lock:
+        compressed = _cache.get(key)
+        if compressed is not None:
+            _cache.move_to_end(key)
+    record_cache_lookup('compression', compressed is not None)
+    if compressed is not None:
+        return compressed
+
+    compressed = compress(data, encoding, level)
+    with _lock:
+        _cache[key] = compressed
+        while len(_cache) > _settings['size']:
+            _cache.popitem(last=False)
+    return compressed
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def install_compression(app):
+    """Compress eligible responses; install before the other after_request hooks so this one runs last"""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 500)
+    levels = {'gzip': app.config.get('COMPRESSION_GZIP_LEVEL', 6),
+              'br': app.config.get('COMPRESSION_BROTLI_LEVEL', 4)}
+    mimetypes = frozenset(app.config.get('COMPRESSION_MIMETYPES') or DEFAULT_MIMETYPES)
+    _settings.update(size=app.config.get('COMPRESSION_CACHE_SIZE', 64),
+                     max_body=app.config.get('COMPRESSION_CACHE_MAX_BODY', 1024 * 1024))
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in mimetypes:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in _NO_BODY
+                or 'Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        etag, weak = response.get_etag()
+        level = levels[encoding]
+        compressed = cached_compress(data, encoding, level) if etag else compress(data, encoding, level)
+        if len(compressed) >= len(data):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        COMPRESSION_BYTES.inc(len(data), encoding=encoding, stage='original')
+        COMPRESSION_BYTES.inc(len(compressed), encoding=encoding, stage='sent')
+        return response
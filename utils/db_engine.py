@@ -0,0 +1,87 @@
+"""
+Database engine profiles.
+
+``sqlite``  - WAL journaling, synchronous=NORMAL, busy_timeout, mmap and a
+              larger page cache, applied as PRAGMAs on every new connection.
+``server``  - connection pool sizing, overflow, pre-ping and recycle for
+              PostgreSQL/MySQL.
+``default`` - SQLAlchemy's defaults, i.e. the behaviour before profiles existed.
+``auto``    - ``sqlite`` or ``server`` depending on the database URL.
+"""
+
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILES = ('auto', 'sqlite', 'server', 'default')
+
+
+def resolve_profile(app, url=None):
+    """Return the concrete profile name for a database URL"""
+    profile = app.config.get('DATABASE_PROFILE', 'auto')
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE {profile!r}; expected one of {', '.join(PROFILES)}")
+
+    if profile != 'auto':
+        return profile
+
+    url = make_url(url or app.config['SQLALCHEMY_DATABASE_URI'])
+    return 'sqlite' if url.get_backend_name() == 'sqlite' else 'server'
+
+
+def configure_engine_options(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS for the profile; call before db.init_app()"""
+    profile = resolve_profile(app)
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+
+    if profile == 'server':
+        options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', app.config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_recycle', app.config['DB_POOL_RECYCLE'])
+        options.setdefault('pool_pre_ping', app.config['DB_POOL_PRE_PING'])
+    elif profile == 'sqlite':
+        # pysqlite's own lock wait, in seconds; matches PRAGMA busy_timeout below
+        connect_args = options.setdefault('connect_args', {})
+        connect_args.setdefault('timeout', app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+
+    return profile
+
+
+def sqlite_pragmas(app):
+    """PRAGMA statements the sqlite profile runs on each new connection"""
+    return [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT_MS']}",
+        f"PRAGMA mmap_size={app.config['SQLITE_MMAP_SIZE']}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_SIZE_KB']}",
+    ]
+
+
+def install_engine_profile(app, db):
+    """Attach per-connection PRAGMAs to every SQLite engine; call after db.init_app()"""
+    if resolve_profile(app) != 'sqlite':
+        return
+
+    pragmas = sqlite_pragmas(app)
+
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                try:
+                    cursor.execute(pragma)
+                except sqlite3.OperationalError:
+                    # Read-only connections (e.g. a replica opened with mode=ro)
+                    # cannot change the journal mode; keep the file's own setting
+                    if 'journal_mode' not in pragma:
+                        raise
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', set_sqlite_pragmas)
@@ -0,0 +1,74 @@
+"""
+Read-replica routing.
+
+When ``REPLICA_DATABASE_URL`` is configured it is registered as the
+``replica`` bind. Views decorated with ``@read_replica`` (or code inside
+``with using_replica():``) send their SELECTs to that engine; flushes,
+writes and everything else stay on the primary. Without a replica the
+decorator is a no-op, so marked views simply read from the primary.
+
+Reads that must see the latest committed state, such as resolving the
+logged-in user (see utils/user_cache.py), run inside ``using_primary()``:
+a user who has just registered would otherwise look logged out while the
+replica lags.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+
+
+def configure_replica_bind(app):
+    """Register the replica URL as a bind; call before db.init_app()"""
+    replica_url = app.config.get('REPLICA_DATABASE_URL')
+    if replica_url:
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(REPLICA_BIND, replica_url)
+
+
+def _replica_requested():
+    return has_app_context() and g.get('_db_use_replica', False)
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that routes replica-marked reads to the replica bind"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _replica_requested():
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def _routing(use_replica):
+    previous = g.get('_db_use_replica', False)
+    g._db_use_replica = use_replica
+    try:
+        yield
+    finally:
+        g._db_use_replica = previous
+
+
+def using_replica():
+    """Route reads inside the block to the replica"""
+    return _routing(True)
+
+
+def using_primary():
+    """Read from the primary inside the block, even within a replica-marked view"""
+    return _routing(False)
+
+
+def read_replica(f):
+    """Mark a read-only view so its queries may be served by the replica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with using_replica():
+            return f(*args, **kwargs)
+    return decorated_function
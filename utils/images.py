@@ -0,0 +1,158 @@
+"""
+Responsive derivatives of the artwork in ``static/images``.
+
+``scripts/build_images.py`` resizes every source PNG to each width in
+``WIDTHS`` that is no larger than the original, and encodes each size as
+AVIF, WebP and PNG. The files go to ``ASSET_DIR/images`` under
+content-hashed names, e.g. ``images/working_memory-128w.3f9c2a1b07de.webp``,
+and are served from ``/dist/`` with the immutable headers of
+utils/assets.py. ``images.json`` records each source's size and its
+derivatives.
+
+Encoding needs the optional Pillow package, and AVIF needs a Pillow build
+with AVIF support; formats Pillow cannot write are skipped. Serving does not
+need Pillow.
+
+``responsive_image(name)`` returns ``src``/``srcset`` for a template or for
+page data handed to JavaScript. The format is chosen from the request's
+``Accept`` header and its q-values: browsers list ``image/avif`` and
+``image/webp`` there when they decode them. Pages that use it should send ``Vary: Accept``. The
+browser then picks the width from ``srcset`` and the ``sizes`` the page
+gives. Without a build the original file is returned.
+"""
+
+import hashlib
+import io
+import json
+import os
+
+from flask import current_app, request, url_for
+
+from utils.assets import _write, load_manifest, prune_builds, read_manifest
+
+IMAGE_MANIFEST = 'images.json'
+SOURCE_DIR = 'images'
+
+WIDTHS = (64, 128, 256, 512)
+# Most compact first; PNG is the fallback every browser decodes
+FORMATS = ('avif', 'webp', 'png')
+# Width used for ``src`` when the browser ignores srcset
+DEFAULT_WIDTH = 256
+
+_SAVE_OPTIONS = {
+    'avif': {'format': 'AVIF', 'quality': 60, 'speed': 4},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'png': {'format': 'PNG', 'optimize': True},
+}
+
+
+class ImageBuildError(RuntimeError):
+    """Raised when derivatives cannot be built, e.g. without Pillow"""
+
+
+def _pillow():
+    try:
+        from PIL import Image, features
+    except ImportError:
+        raise ImageBuildError("Building image derivatives requires the optional 'Pillow' package")
+    return Image, features
+
+
+def supported_formats(formats=FORMATS):
+    """The formats in ``formats`` the installed Pillow can encode"""
+    _, features = _pillow()
+    return [fmt for fmt in formats if fmt == 'png' or features.check(fmt)]
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, **_SAVE_OPTIONS[fmt])
+    return buffer.getvalue()
+
+
+def build_images(static_dir, output_dir, names=None, widths=WIDTHS, formats=FORMATS):
+    """
+    Write the derivatives of ``names`` (paths under static/, default every PNG
+    in static/images) and update images.json; entries for other images are
+    kept. Returns one dict per image with the source size and the bytes of
+    every derivative as {format: {width: bytes}}.
+    """
+    Image, _ = _pillow()
+    formats = supported_formats(formats)
+    if names is None:
+        names = sorted(f'{SOURCE_DIR}/{entry}' for entry in os.listdir(os.path.join(static_dir, SOURCE_DIR))
+                       if entry.lower().endswith('.png'))
+
+    previous = read_manifest(output_dir, IMAGE_MANIFEST)
+    manifest, results = dict(previous), []
+    for name in names:
+        path = os.path.join(static_dir, name)
+        with Image.open(path) as source:
+            source.load()
+            mode = 'RGBA' if 'A' in source.getbands() or 'transparency' in source.info else 'RGB'
+            source = source.convert(mode)
+        width, height = source.size
+        stem = os.path.splitext(name)[0]
+        sizes = [size for size in widths if size < width] + [min(max(widths), width)]
+
+        entry = {'width': width, 'height': height, 'formats': {fmt: [] for fmt in formats}}
+        result = {'image': name, 'source': os.path.getsize(path), 'formats': {fmt: {} for fmt in formats}}
+        for size in sorted(set(sizes)):
+            resized = source if size == width else source.resize(
+                (size, max(1, round(height * size / width))), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                data = _encode(resized, fmt)
+                filename = f'{stem}-{size}w.{hashlib.sha256(data).hexdigest()[:12]}.{fmt}'
+                _write(os.path.join(output_dir, filename), data)
+                entry['formats'][fmt].append([size, filename])
+                result['formats'][fmt][size] = len(data)
+        manifest[name] = entry
+        results.append(result)
+
+    _write(os.path.join(output_dir, IMAGE_MANIFEST),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8') + b'\n')
+
+    keep, stems = set(), set()
+    for entries in (manifest, previous):
+        for entry in entries.values():
+            for variants in entry['formats'].values():
+                for _, filename in variants:
+                    keep.add(filename)
+                    stems.add(filename.rsplit('.', 2)[0])
+    prune_builds(output_dir, stems, keep)
+    return results
+
+
+def preferred_format(formats):
+    """
+    The built format in ``formats`` the browser ranks highest in its Accept
+    header, the most compact one on a tie. AVIF and WebP count only when
+    listed by name (``*/*`` does not mean the browser decodes them), PNG
+    through any matching entry. When nothing matches, e.g. Safari's
+    navigation header, the most widely decoded built format is used.
+    """
+    accept = request.accept_mimetypes
+    listed = {value: quality for value, quality in accept}
+    ranked = []
+    for rank, fmt in enumerate(FORMATS):
+        if fmt in formats:
+            quality = accept.quality('image/png') if fmt == 'png' else listed.get(f'image/{fmt}', 0)
+            if quality > 0:
+                ranked.append((-quality, rank, fmt))
+    if ranked:
+        return min(ranked)[2]
+    return next(fmt for fmt in reversed(FORMATS) if fmt in formats)
+
+
+def responsive_image(name):
+    """{'src', 'srcset'} for ``name`` (a path under static/); srcset is '' without a build"""
+    entry = load_manifest(IMAGE_MANIFEST).get(name) if current_app.config.get('ASSETS_ENABLED', True) else None
+    if not entry or not entry['formats']:
+        return {'src': url_for('static', filename=name), 'srcset': ''}
+    variants = entry['formats'][preferred_format(entry['formats'])]
+    src = next((filename for size, filename in variants if size >= DEFAULT_WIDTH), variants[-1][1])
+    return {
+        'src': url_for('assets', filename=src),
+        'srcset': ', '.join(f"{url_for('assets', filename=filename)} {size}w" for size, filename in variants),
+    }
+
@@ -7,6 +7,17 @@ import math
 import json
 from typing import Dict, List, Any, Tuple
 from collections import defaultdict
+from contextlib import contextmanager
+
+from utils.metrics import SCORING_SECONDS
+from utils.tracing import span
+
+
+@contextmanager
+def _scoring_step(step):
+    """Time a calculate_fsiq step for /metrics and the request trace"""
+    with SCORING_SECONDS.time(step=step), span(f'scoring.{step}'):
+        yield
 
 
 class ScientificIQCalculator:
@@ -57,31 +68,40 @@ class ScientificIQCalculator:
         """
         
         # Step 1: Calculate raw scores for each domain
-        raw_scores = self._calculate_raw_scores(responses)
+        with _scoring_step('raw_scores'):
+            raw_scores = self._calculate_raw_scores(responses)
         
         # Step 2: Convert to scaled scores (mean=10, SD=3)
-        scaled_scores = self._convert_to_scaled_scores(raw_scores)
+        with _scoring_step('scaled_scores'):
+            scaled_scores = self._convert_to_scaled_scores(raw_scores)
         
         # Step 3: Calculate composite scores for each index
-        composite_scores = self._calculate_composite_scores(scaled_scores)
+        with _scoring_step('composite_scores'):
+            composite_scores = self._calculate_composite_scores(scaled_scores)
         
         # Step 4: Apply age norms
-        age_adjusted_scores = self._apply_age_norms(composite_scores, user_age)
+        with _scoring_step('age_norms'):
+            age_adjusted_scores = self._apply_age_norms(composite_scores, user_age)
         
         # Step 5: Calculate FSIQ
-        fsiq = self._compute_fsiq(age_adjusted_scores)
+        with _scoring_step('fsiq'):
+            fsiq = self._compute_fsiq(age_adjusted_scores)
         
         # Step 6: Calculate confidence intervals
-        confidence_intervals = self._calculate_confidence_intervals(fsiq)
+        with _scoring_step('confidence_intervals'):
+            confidence_intervals = self._calculate_confidence_intervals(fsiq)
         
         # Step 7: Generate percentile ranks
-        percentile_rank = self._calculate_percentile_rank(fsiq)
+        with _scoring_step('percentile_rank'):
+            percentile_rank = self._calculate_percentile_rank(fsiq)
         
         # Step 8: Get classification
-        classification = self._get_classification(fsiq)
+        with _scoring_step('classification'):
+            classification = self._get_classification(fsiq)
         
         # Step 9: Calculate reliability
-        reliability = self._calculate_reliability(responses)
+        with _scoring_step('reliability'):
+            reliability = self._calculate_reliability(responses)
         
         return {
             'fsiq': round(fsiq),
@@ -0,0 +1,172 @@
+"""
+Worker memory inspection: tracemalloc snapshots and a registry of in-process caches.
+
+Modules that keep data in memory register it with ``register_cache(name,
+getter)``, where ``getter`` returns the container to measure. The admin
+memory endpoints report the entry count and approximate deep size of every
+registered cache, so eviction limits can be set from data.
+
+Snapshots are taken with tracemalloc, which must be started first (from
+/admin/memory/start or with PYTHONTRACEMALLOC). Everything here is per
+process: each worker answers for itself and reports its pid.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import OrderedDict
+
+KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+_caches = OrderedDict()
+_snapshots = OrderedDict()
+_next_snapshot_id = 1
+_lock = threading.Lock()
+
+# Allocations made by the profiler itself would otherwise top every report
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+class MemoryProfilingError(ValueError):
+    """Raised for unknown snapshots or when tracemalloc is not running"""
+
+
+def register_cache(name, getter):
+    """Register an in-process cache; ``getter()`` returns the container to measure"""
+    _caches[name] = getter
+
+
+def deep_sizeof(obj, limit=200000):
+    """Approximate size in bytes of an object and everything it references, visiting at most ``limit`` objects"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < limit:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, type):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current, 0)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif isinstance(current, (types.ModuleType, types.FunctionType, types.MethodType)):
+            # Shared code objects are not owned by the cache
+            continue
+        else:
+            if hasattr(current, '__dict__'):
+                stack.append(current.__dict__)
+            for klass in type(current).__mro__:
+                for slot in klass.__dict__.get('__slots__', ()):
+                    if hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+    return total
+
+
+def cache_sizes():
+    """Entry count and approximate deep size of every registered cache"""
+    sizes = []
+    for name, getter in _caches.items():
+        container = getter()
+        try:
+            entries = len(container)
+        except TypeError:
+            entries = None
+        sizes.append({'name': name, 'entries': entries, 'bytes': deep_sizeof(container)})
+    return sizes
+
+
+def tracing_status():
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        'pid': os.getpid(),
+        'tracing': tracemalloc.is_tracing(),
+        'frames': tracemalloc.get_traceback_limit(),
+        'traced_bytes': current,
+        'peak_traced_bytes': peak,
+        'snapshots': [
+            {'id': snapshot_id, 'taken_at': taken_at, 'traced_bytes': traced}
+            for snapshot_id, (taken_at, traced, _) in _snapshots.items()
+        ],
+    }
+
+
+def start_tracing(frames=1):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    """Stop tracing and drop the snapshots, which cannot be compared with a later session"""
+    tracemalloc.stop()
+    with _lock:
+        _snapshots.clear()
+
+
+def take_snapshot(keep=10):
+    """Take a filtered snapshot, keep the latest ``keep`` and return its id"""
+    global _next_snapshot_id
+    if not tracemalloc.is_tracing():
+        raise MemoryProfilingError("tracemalloc is not running; start tracing first")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    traced, _ = tracemalloc.get_traced_memory()
+    with _lock:
+        snapshot_id = _next_snapshot_id
+        _next_snapshot_id += 1
+        _snapshots[snapshot_id] = (time.time(), traced, snapshot)
+        while len(_snapshots) > keep:
+            _snapshots.popitem(last=False)
+    return snapshot_id
+
+
+def _get_snapshot(snapshot_id):
+    try:
+        return _snapshots[snapshot_id][2]
+    except KeyError:
+        raise MemoryProfilingError(f"Unknown snapshot {snapshot_id}")
+
+
+def _check_key_type(key_type):
+    if key_type not in KEY_TYPES:
+        raise MemoryProfilingError(f"key_type must be one of {', '.join(KEY_TYPES)}")
+
+
+def _location(traceback):
+    return [f'{frame.filename}:{frame.lineno}' for frame in traceback]
+
+
+def top_allocations(snapshot_id, key_type='lineno', limit=20):
+    """Largest allocation sites of a snapshot"""
+    _check_key_type(key_type)
+    stats = _get_snapshot(snapshot_id).statistics(key_type)
+    return [
+        {'site': _location(stat.traceback), 'bytes': stat.size, 'count': stat.count}
+        for stat in stats[:limit]
+    ]
+
+
+def diff_snapshots(old_id, new_id, key_type='lineno', limit=20):
+    """Allocation sites that grew or shrank the most between two snapshots"""
+    _check_key_type(key_type)
+    stats = _get_snapshot(new_id).compare_to(_get_snapshot(old_id), key_type)
+    return [
+        {
+            'site': _location(stat.traceback),
+            'bytes': stat.size,
+            'bytes_diff': stat.size_diff,
+            'count': stat.count,
+            'count_diff': stat.count_diff,
+        }
+        for stat in stats[:limit]
+    ]
@@ -0,0 +1,397 @@
+"""
+Prometheus-style metrics without a client library.
+
+Each process records counters and histograms in memory. Serving workers
+(``wsgi.py`` calls ``registry.enable_flush()``) also write them periodically
+to their own JSON file under ``METRICS_DIR``; scripts and shells that import
+the app keep theirs in memory. ``/metrics`` merges every file in that
+directory, so the numbers are correct whichever worker serves the scrape.
+The files of workers that have exited are folded into one
+``metrics-exited.json`` at scrape time (their counts still happened), so the
+directory holds one file per live worker plus the aggregate.
+
+``/metrics`` answers 403 unless ``METRICS_TOKEN`` is set and the request
+sends it as a bearer token.
+
+Recorded out of the box:
+
+    http_requests_total{endpoint,method,status}
+    http_request_duration_seconds{endpoint,method}   histogram
+    http_request_db_seconds{endpoint}                histogram, needs SQL_INSTRUMENTATION
+    http_request_db_queries_total{endpoint}          needs SQL_INSTRUMENTATION
+    iq_scoring_duration_seconds{step}                histogram, ScientificIQCalculator steps
+    cache_lookups_total{cache,result}                plus a derived cache_hit_ratio{cache}
+"""
+
+import atexit
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import Response as HTTPResponse, abort, g, request
+
+from utils.memory_profiling import register_cache
+from utils.sql_instrumentation import current_sql_stats
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0, 7.5, 10.0)
+FAST_BUCKETS = (.00005, .0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Counts of exited workers, and the lock held while folding files into it
+EXITED_FILE = 'metrics-exited.json'
+_COMPACT_LOCK = '.compact.lock'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self):
+        return {'type': self.kind, 'help': self.documentation, 'labelnames': list(self.labelnames),
+                'samples': [[list(key), value] for key, value in self.values.items()]}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Per-bucket (non-cumulative) counts, one extra for +Inf, then sum
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def dump(self):
+        data = super().dump()
+        data['buckets'] = list(self.buckets)
+        return data
+
+
+class MetricsRegistry:
+    """Metrics of this process and the file they are shared through"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.directory = None
+        self.flush_interval = 1.0
+        self._last_flush = 0.0
+        self._path = None
+        self._pid = None
+        self.flush_enabled = False
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self.metrics[metric.name] = metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return Counter(self, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return Histogram(self, name, documentation, labelnames, buckets)
+
+    def _process_path(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            # Forked workers inherit the parent's numbers; start from zero so nothing is counted twice
+            if self._pid is not None:
+                with self.lock:
+                    for metric in self.metrics.values():
+                        metric.values.clear()
+            self._pid = pid
+            self._path = os.path.join(self.directory, f'metrics-{pid}-{int(time.time() * 1000)}.json')
+        return self._path
+
+    def enable_flush(self):
+        """Share this process's metrics through METRICS_DIR; called by the WSGI entry point"""
+        if not self.flush_enabled:
+            self.flush_enabled = True
+            atexit.register(self.flush_quietly)
+
+    def flush(self, force=False):
+        """Write this process's metrics to its file (at most every flush_interval seconds)"""
+        if self.directory is None or not self.flush_enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+
+        path = self._process_path()
+        data = self._dump()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def flush_quietly(self):
+        """Final flush at interpreter exit; the directory may already be gone"""
+        try:
+            self.flush(force=True)
+        except OSError:
+            pass
+
+    def _dump(self):
+        with self.lock:
+            return {name: metric.dump() for name, metric in self.metrics.items()}
+
+    def compact(self):
+        """
+        Fold the files of processes that no longer exist into EXITED_FILE.
+        The aggregate lists the files it holds, so a run interrupted before
+        the removals does not count them twice.
+        """
+        if fcntl is None:
+            return
+        with open(os.path.join(self.directory, _COMPACT_LOCK), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            exited_path = os.path.join(self.directory, EXITED_FILE)
+            try:
+                with open(exited_path) as f:
+                    exited = json.load(f)
+            except (OSError, ValueError):
+                exited = {'files': [], 'metrics': {}}
+
+            names = os.listdir(self.directory)
+            dead = [name for name in names if _process_file_pid(name) is not None
+                    and not _pid_alive(_process_file_pid(name))]
+            merged = {}
+            _merge(merged, exited['metrics'])
+            # Names whose files were removed after an earlier run are dropped
+            folded = set(exited['files']) & set(names)
+            for name in dead:
+                if name in folded:
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        _merge(merged, json.load(f))
+                except (OSError, ValueError):
+                    continue
+                folded.add(name)
+            if folded != set(exited['files']):
+                tmp_path = exited_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump({'files': sorted(folded), 'metrics': _as_dumps(merged)}, f)
+                os.replace(tmp_path, exited_path)
+            for name in dead:
+                if name in folded:
+                    os.remove(os.path.join(self.directory, name))
+
+    def collect(self):
+        """Merge this process's metrics and the files of every other process into {name: dump}"""
+        self.flush(force=True)
+        self.compact()
+        merged = {}
+        own = os.path.basename(self._path) if self.flush_enabled else None
+        for name in sorted(os.listdir(self.directory)):
+            if name == own or not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                # Removed or half-written by a process that is exiting
+                continue
+            _merge(merged, data['metrics'] if name == EXITED_FILE else data)
+        _merge(merged, self._dump())
+        return merged
+
+
+def _process_file_pid(name):
+    """The pid in a per-process file name (metrics-<pid>-<ms>.json), else None"""
+    parts = name[:-len('.json')].split('-') if name.endswith('.json') else ()
+    if len(parts) == 3 and parts[0] == 'metrics' and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        return True
+    return True
+
+
+def _merge(merged, data):
+    """Add a file's {name: dump} to ``merged``, whose samples are {label tuple: value}"""
+    for metric_name, dump in data.items():
+        target = merged.setdefault(metric_name, dict(dump, samples={}))
+        for labels, value in dump['samples']:
+            key = tuple(labels)
+            if isinstance(value, list):
+                current = target['samples'].get(key)
+                target['samples'][key] = value if current is None else [a + b for a, b in zip(current, value)]
+            else:
+                target['samples'][key] = target['samples'].get(key, 0) + value
+    return merged
+
+
+def _as_dumps(merged):
+    """Inverse of _merge(): samples back to the file format"""
+    return {name: dict(dump, samples=[[list(key), value] for key, value in dump['samples'].items()])
+            for name, dump in merged.items()}
+
+
+registry = MetricsRegistry()
+register_cache('metrics', lambda: {name: metric.values for name, metric in registry.metrics.items()})
+
+REQUESTS = registry.counter(
+    'http_requests_total', 'HTTP requests by endpoint, method and status', ('endpoint', 'method', 'status'))
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'method'))
+REQUEST_DB_SECONDS = registry.histogram(
+    'http_request_db_seconds', 'Time spent in SQL per request', ('endpoint',))
+REQUEST_DB_QUERIES = registry.counter(
+    'http_request_db_queries_total', 'SQL statements executed by endpoint', ('endpoint',))
+SCORING_SECONDS = registry.histogram(
+    'iq_scoring_duration_seconds', 'ScientificIQCalculator time by step', ('step',), buckets=FAST_BUCKETS)
+CACHE_LOOKUPS = registry.counter(
+    'cache_lookups_total', 'In-process cache lookups by cache and result', ('cache', 'result'))
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render_text(merged):
+    """Prometheus text exposition format for collected metrics"""
+    lines = []
+    for name in sorted(merged):
+        dump = merged[name]
+        lines.append(f"# HELP {name} {dump['help']}")
+        lines.append(f"# TYPE {name} {dump['type']}")
+        for key, value in sorted(dump['samples'].items()):
+            labels = list(zip(dump['labelnames'], key))
+            if dump['type'] == 'histogram':
+                cumulative = 0
+                for bound, count in zip(list(dump['buckets']) + [float('inf')], value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    lookups = merged.get(CACHE_LOOKUPS.name)
+    if lookups and lookups['samples']:
+        totals = {}
+        for (cache, result), count in lookups['samples'].items():
+            hits, total = totals.get(cache, (0, 0))
+            totals[cache] = (hits + (count if result == 'hit' else 0), total + count)
+        lines.append('# HELP cache_hit_ratio Share of cache lookups that were hits')
+        lines.append('# TYPE cache_hit_ratio gauge')
+        for cache, (hits, total) in sorted(totals.items()):
+            lines.append(f"cache_hit_ratio{_format_labels([('cache', cache)])} {hits / total if total else 0}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def install_metrics(app):
+    """Record request metrics and serve them at /metrics; call after install_sql_instrumentation()"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    registry.directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+    registry.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 1.0)
+    os.makedirs(registry.directory, exist_ok=True)
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+
+        # Unmatched URLs share one label so 404 scans cannot blow up cardinality
+        endpoint = request.endpoint or 'unmatched'
+        REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, method=request.method)
+
+        stats = current_sql_stats()
+        if stats is not None:
+            REQUEST_DB_SECONDS.observe(stats.duration, endpoint=endpoint)
+            REQUEST_DB_QUERIES.inc(stats.count, endpoint=endpoint)
+
+        registry.flush()
+        return response
+
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(403)
+        return HTTPResponse(render_text(registry.collect()), content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
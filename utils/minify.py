@@ -0,0 +1,205 @@
+"""
+Conservative CSS and JavaScript minifiers for scripts/build_assets.py.
+
+Neither rewrites code. They drop comments and whitespace that cannot change
+the meaning, and copy strings, template literals and regular expression
+literals through untouched.
+
+CSS: comments go; whitespace runs shrink to one space; a space is dropped
+next to ``{ } ; , >`` and after ``:``, and the last ``;`` of a block goes.
+The space before ``:`` or ``(`` is kept, because ``a :hover`` and
+``and (max-width...)`` depend on it.
+
+JavaScript: comments go; runs of whitespace with a line break become one
+newline, so automatic semicolon insertion sees the same lines; other runs
+become one space, or nothing when neither neighbour is an identifier
+character and the result cannot glue two operators together (``a - -b``).
+A ``/`` starts a regular expression when the previous token cannot end an
+expression, as in jsmin.
+"""
+
+_CSS_TIGHT = set('{};,>')
+
+_JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                      'throw', 'yield', 'await', 'instanceof'}
+_JS_OPERATORS = set('+-/')
+
+
+class MinifyError(ValueError):
+    """Raised for input the minifier cannot scan, e.g. an unterminated string"""
+
+
+def _string_end(source, start):
+    """Index just past the string literal opening at ``start``"""
+    quote = source[start]
+    i = start + 1
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        if char == '\n' and quote != '`':
+            break
+        i += 1
+    raise MinifyError(f'Unterminated string at offset {start}')
+
+
+def minify_css(source):
+    out = []
+    i, length = 0, len(source)
+    pending_space = False
+    while i < length:
+        char = source[i]
+        if char == '/' and source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            if end < 0:
+                raise MinifyError(f'Unterminated comment at offset {i}')
+            i = end + 2
+            pending_space = True
+            continue
+        if char.isspace():
+            pending_space = True
+            i += 1
+            continue
+        if pending_space and out and out[-1] not in _CSS_TIGHT and out[-1] != ':' and char not in _CSS_TIGHT:
+            out.append(' ')
+        pending_space = False
+        if char in '"\'':
+            end = _string_end(source, i)
+            out.append(source[i:end])
+            i = end
+            continue
+        if char == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(char)
+        i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def _is_word(char):
+    return char.isalnum() or char in '_$\\' or ord(char) > 127
+
+
+def minify_js(source):
+    out = []
+    i, length = 0, len(source)
+    # One entry per open ${...} inside a template literal: its brace depth
+    templates = []
+    whitespace = None  # None, ' ' or '\n' waiting to be written
+    last_word = ''
+
+    def last_char():
+        return out[-1][-1] if out else ''
+
+    def last_token_char():
+        for piece in reversed(out):
+            if piece.strip():
+                return piece.rstrip()[-1]
+        return ''
+
+    def template_chunk(start):
+        # From inside a template literal to the closing backtick or the next ${
+        j = start
+        while j < length:
+            if source[j] == '\\':
+                j += 2
+            elif source[j] == '`':
+                return j + 1, False
+            elif source.startswith('${', j):
+                return j + 2, True
+            else:
+                j += 1
+        raise MinifyError(f'Unterminated template literal at offset {start}')
+
+    while i < length:
+        char = source[i]
+
+        if char == '/' and source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end < 0 else end
+            continue
+        if char == '/' and source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            if end < 0:
+                raise MinifyError(f'Unterminated comment at offset {i}')
+            whitespace = '\n' if '\n' in source[i:end] or whitespace == '\n' else whitespace or ' '
+            i = end + 2
+            continue
+        if char.isspace():
+            whitespace = '\n' if char == '\n' or whitespace == '\n' else ' '
+            i += 1
+            continue
+
+        if whitespace:
+            previous = last_char()
+            if whitespace == '\n' and out:
+                out.append('\n')
+            elif previous and ((_is_word(previous) and _is_word(char))
+                               or (previous in _JS_OPERATORS and char in _JS_OPERATORS)):
+                out.append(' ')
+            whitespace = None
+
+        if char in '"\'':
+            end = _string_end(source, i)
+            out.append(source[i:end])
+            last_word = ''
+            i = end
+            continue
+
+        if char == '`' or (char == '}' and templates and templates[-1] == 0):
+            if char == '}':
+                templates.pop()
+            end, opened = template_chunk(i + 1)
+            if opened:
+                templates.append(0)
+            out.append(source[i:end])
+            last_word = ''
+            i = end
+            continue
+
+        if char == '/':
+            previous = last_token_char()
+            if not previous or previous in _JS_REGEX_AFTER or last_word in _JS_REGEX_KEYWORDS:
+                j, in_class = i + 1, False
+                while j < length:
+                    if source[j] == '\\':
+                        j += 2
+                        continue
+                    if source[j] == '\n':
+                        raise MinifyError(f'Unterminated regular expression at offset {i}')
+                    if source[j] == '[':
+                        in_class = True
+                    elif source[j] == ']':
+                        in_class = False
+                    elif source[j] == '/' and not in_class:
+                        break
+                    j += 1
+                j += 1
+                while j < length and _is_word(source[j]):
+                    j += 1
+                out.append(source[i:j])
+                last_word = ''
+                i = j
+                continue
+
+        if _is_word(char):
+            j = i
+            while j < length and _is_word(source[j]):
+                j += 1
+            last_word = source[i:j]
+            out.append(last_word)
+            i = j
+            continue
+
+        if templates:
+            if char == '{':
+                templates[-1] += 1
+            elif char == '}':
+                templates[-1] -= 1
+        out.append(char)
+        last_word = ''
+        i += 1
+    return ''.join(out).strip() + '\n'
@@ -0,0 +1,121 @@
+"""
+Statements the views issue on their hot paths.
+
+Each function returns an unexecuted query; the view adds ``.all()`` /
+``.first()``, and ``utils/query_plans.py`` explains the same statement with
+sample parameters. Change a view's query here and the plan check follows.
+"""
+
+from sqlalchemy import Integer, cast, func
+
+from extensions import db
+from models.domain_score import DomainScore
+from models.question import Question
+from models.response import Response
+from models.test_session import TestSession
+from models.user import User
+
+
+def user_tests(user_id):
+    return TestSession.query.filter_by(user_id=user_id)
+
+
+def test_on_day(user_id, day):
+    """Any session the user started on ``day`` (the home page streak)"""
+    return TestSession.query.filter(
+        TestSession.user_id == user_id,
+        func.date(TestSession.start_time) == day
+    ).limit(1)
+
+
+def recent_performance(user_id, since):
+    """(category, total, correct) of the user's answers in sessions started since ``since``"""
+    return db.session.query(
+        Question.category,
+        func.count(Response.id).label('total'),
+        func.sum(Response.is_correct).label('correct')
+    ).join(
+        Response, Response.question_id == Question.id
+    ).join(
+        TestSession, TestSession.id == Response.test_session_id
+    ).filter(
+        TestSession.user_id == user_id,
+        TestSession.start_time >= since
+    ).group_by(Question.category)
+
+
+def leaderboard(since, limit=10):
+    """(username, average score) of finished sessions started since ``since``, best first"""
+    return db.session.query(
+        User.username,
+        func.avg(TestSession.score).label('avg_score')
+    ).join(
+        TestSession, TestSession.user_id == User.id
+    ).filter(
+        TestSession.start_time >= since,
+        TestSession.end_time.isnot(None)
+    ).group_by(User.id).order_by(
+        func.avg(TestSession.score).desc()
+    ).limit(limit)
+
+
+def test_history(user_id):
+    return TestSession.query.filter_by(user_id=user_id).order_by(TestSession.start_time.desc())
+
+
+def success_stats(column, user_id=None):
+    """(value of ``column``, attempts, correct) over Response rows, for every user or one"""
+    query = db.session.query(
+        column,
+        func.count(Response.id).label('attempts'),
+        func.sum(cast(Response.is_correct, Integer)).label('correct')
+    ).join(Response, Response.question_id == Question.id)
+    if user_id is not None:
+        query = query.join(TestSession, TestSession.id == Response.test_session_id)\
+            .filter(TestSession.user_id == user_id)
+    return query.group_by(column)
+
+
+def response_time_totals(user_id):
+    """(sum, count) of the user's recorded response times"""
+    return db.session.query(
+        func.sum(Response.response_time),
+        func.count(Response.response_time)
+    ).join(TestSession, TestSession.id == Response.test_session_id)\
+     .filter(TestSession.user_id == user_id)
+
+
+def domain_trend(user_id):
+    """(session id, domain, score) of every index score of the user"""
+    return db.session.query(
+        DomainScore.test_session_id, DomainScore.domain, DomainScore.score
+    ).join(TestSession, TestSession.id == DomainScore.test_session_id)\
+     .filter(TestSession.user_id == user_id)
+
+
+def session_response_rows(session_id):
+    return Response.query.filter_by(test_session_id=session_id).order_by(Response.id)
+
+
+def random_question(category, difficulty, exclude=()):
+    """Random question of a category/difficulty not in ``exclude`` (without a question pack)"""
+    query = Question.query.filter_by(category=category, difficulty=difficulty)
+    if exclude:
+        # An empty NOT IN renders as a constant subquery SQLite scans
+        query = query.filter(~Question.id.in_(exclude))
+    return query.order_by(func.random())
+
+
+def recent_tests(limit=5):
+    return TestSession.query.order_by(TestSession.start_time.desc()).limit(limit)
+
+
+def domain_stats():
+    """Index score distribution by cognitive domain"""
+    return db.session.query(
+        DomainScore.domain,
+        func.count(DomainScore.id).label('sessions'),
+        func.avg(DomainScore.score).label('avg_score'),
+        func.min(DomainScore.score).label('min_score'),
+        func.max(DomainScore.score).label('max_score')
+    ).group_by(DomainScore.domain).order_by(DomainScore.domain)
@@ -0,0 +1,154 @@
+"""
+Registry of the application's hot queries and an EXPLAIN QUERY PLAN checker.
+
+Each entry calls the function in utils/queries.py that the route itself
+uses, with representative parameters, so ``scripts/check_query_plans.py``
+flags any plan that falls back to a full table scan and cannot drift from
+what the route runs.
+"""
+
+from datetime import datetime, timedelta
+
+from extensions import db
+from models.question import Question
+from utils import queries
+
+HOT_QUERIES = []
+
+SAMPLE_USER_ID = 1
+SAMPLE_SESSION_ID = 1
+
+
+def hot_query(name, allow_scans=()):
+    """
+    Register a function returning a SELECT statement or ORM query.
+    ``allow_scans`` names tables that may legitimately be scanned in full,
+    e.g. admin aggregates over every row.
+    """
+    def decorator(build):
+        HOT_QUERIES.append({'name': name, 'build': build, 'allow_scans': set(allow_scans)})
+        return build
+    return decorator
+
+
+@hot_query('home.user_tests')
+def _home_user_tests():
+    return queries.user_tests(SAMPLE_USER_ID)
+
+
+@hot_query('home.streak_day')
+def _home_streak_day():
+    return queries.test_on_day(SAMPLE_USER_ID, datetime.now().date())
+
+
+@hot_query('home.recent_performance')
+def _home_recent_performance():
+    return queries.recent_performance(SAMPLE_USER_ID, datetime.now() - timedelta(days=7))
+
+
+@hot_query('home.leaderboard')
+def _home_leaderboard():
+    return queries.leaderboard(datetime.now() - timedelta(days=7))
+
+
+@hot_query('profile.history')
+def _profile_history():
+    return queries.test_history(SAMPLE_USER_ID)
+
+
+@hot_query('profile.category_stats')
+def _profile_category_stats():
+    return queries.success_stats(Question.category, SAMPLE_USER_ID)
+
+
+@hot_query('profile.difficulty_stats')
+def _profile_difficulty_stats():
+    return queries.success_stats(Question.difficulty, SAMPLE_USER_ID)
+
+
+@hot_query('profile.response_time')
+def _profile_response_time():
+    return queries.response_time_totals(SAMPLE_USER_ID)
+
+
+@hot_query('profile.session_responses')
+def _profile_session_responses():
+    return queries.session_response_rows(SAMPLE_SESSION_ID)
+
+
+@hot_query('profile.domain_trend')
+def _profile_domain_trend():
+    return queries.domain_trend(SAMPLE_USER_ID)
+
+
+@hot_query('test.first_question')
+def _test_first_question():
+    return queries.random_question('Verbal Comprehension', 'easy').limit(1)
+
+
+@hot_query('test.adaptive_question')
+def _test_adaptive_question():
+    return queries.random_question('Working Memory', 'medium', ['wm_e1', 'wm_m2']).limit(1)
+
+
+@hot_query('test.finish_responses')
+def _test_finish_responses():
+    # get_session_responses() for a session that still has Response rows
+    return queries.session_response_rows(SAMPLE_SESSION_ID)
+
+
+@hot_query('admin.recent_tests')
+def _admin_recent_tests():
+    return queries.recent_tests()
+
+
+@hot_query('admin.category_stats', allow_scans=('response',))
+def _admin_category_stats():
+    return queries.success_stats(Question.category)
+
+
+@hot_query('admin.difficulty_stats', allow_scans=('response',))
+def _admin_difficulty_stats():
+    return queries.success_stats(Question.difficulty)
+
+
+@hot_query('admin.domain_stats')
+def _admin_domain_stats():
+    return queries.domain_stats()
+
+
+def explain_query_plan(stmt, conn):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement or ORM query (SQLite only)"""
+    stmt = getattr(stmt, 'statement', stmt)
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.params
+    if compiled.positiontup:
+        params = tuple(params[name] for name in compiled.positiontup)
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + compiled.string, params).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """Tables read by a plain SCAN (no index) in a query plan"""
+    tables = []
+    for detail in plan:
+        words = detail.split()
+        # "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX ..." walks an index
+        if len(words) >= 2 and words[0] == 'SCAN' and 'USING' not in words:
+            if words[1] not in ('CONSTANT', 'SUBQUERY'):
+                tables.append(words[1])
+    return tables
+
+
+def check_query_plans():
+    """
+    Explain every registered hot query.
+    Returns a list of result dicts with the plan and any disallowed full scans.
+    """
+    results = []
+    with db.engine.connect() as conn:
+        for query in HOT_QUERIES:
+            plan = explain_query_plan(query['build'](), conn)
+            scans = [table for table in full_scans(plan) if table not in query['allow_scans']]
+            results.append({'name': query['name'], 'plan': plan, 'full_scans': scans})
+    return results
@@ -0,0 +1,394 @@
+"""
+Build one question bank out of any number of source files.
+
+Sources are listed in precedence order, lowest first: when the same id shows
+up in several sources the later one wins, which is how questions2.json has
+always overridden questions.json. Each source is parsed as a stream, either
+the nested ``{category: {difficulty: [question, ...]}}`` JSON layout or JSONL
+with one question per line carrying its own ``category`` and ``difficulty``.
+Only one question at a time is decoded, so memory stays bounded.
+
+Questions are validated in a process pool in chunks. An invalid question is
+reported and skipped, and the same id from a lower-precedence source is used
+if that one is valid. The merge reads sources from highest to lowest
+precedence, keeps only the set of ids already taken, and spools accepted
+questions to one temporary JSONL file per (category, difficulty). Those files
+are then concatenated into the output, so building a large bank needs
+memory for the ids and a chunk of questions, not for the whole bank.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import textwrap
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.question_ingest import WORKING_MEMORY_TYPES
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+INPUT_TYPES = ('text', 'multiple-choice')
+
+# Model column limits (models/question.py)
+MAX_ID_LENGTH = 10
+MAX_TEXT_LENGTH = 500
+MAX_CATEGORY_LENGTH = 50
+
+READ_SIZE = 1 << 16
+
+
+class QuestionBankError(Exception):
+    """A source file that cannot be parsed"""
+
+
+def source_format(path):
+    return 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'json'
+
+
+class _JsonStream:
+    """Incremental reader for the nested bank layout, decoding one value at a time"""
+
+    def __init__(self, f, path):
+        self.f = f
+        self.path = path
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        data = self.f.read(READ_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise QuestionBankError(f"{self.path}: expected {char!r}, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise QuestionBankError(f"{self.path}: invalid JSON: {e.msg}")
+            # A number ending exactly at the buffer edge may continue in the next read
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self, close):
+        """Yield the values of an array or the (key, value) pairs of an object"""
+        if self.peek() == close:
+            self.pos += 1
+            return
+        while True:
+            yield
+            separator = self.peek()
+            if separator == ',':
+                self.pos += 1
+            elif separator == close:
+                self.pos += 1
+                return
+            else:
+                raise QuestionBankError(f"{self.path}: expected ',' or {close!r}")
+
+    def key(self):
+        key = self.value()
+        if not isinstance(key, str):
+            raise QuestionBankError(f"{self.path}: expected an object key, found {key!r}")
+        self.expect(':')
+        return key
+
+
+def iter_source(path):
+    """Yield (category, difficulty, question) from one source file as it is read"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if source_format(path) == 'jsonl':
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    question = json.loads(line)
+                except ValueError as e:
+                    raise QuestionBankError(f"{path}:{line_no}: invalid JSON: {e}")
+                if not isinstance(question, dict):
+                    raise QuestionBankError(f"{path}:{line_no}: expected a JSON object")
+                yield question.pop('category', None), question.pop('difficulty', None), question
+            return
+
+        stream = _JsonStream(f, path)
+        stream.expect('{')
+        for _ in stream.items('}'):
+            category = stream.key()
+            stream.expect('{')
+            for _ in stream.items('}'):
+                difficulty = stream.key()
+                stream.expect('[')
+                for _ in stream.items(']'):
+                    yield category, difficulty, stream.value()
+
+
+def _positive_int(question, field):
+    value = question.get(field)
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _working_memory_errors(question_type, question):
+    errors = []
+    if 'n-back' in question_type:
+        if not _positive_int(question, 'n'):
+            errors.append("n-back needs a positive integer 'n'")
+        if not _positive_int(question, 'timeLimit'):
+            errors.append("n-back needs a positive 'timeLimit'")
+        return errors
+
+    if not _positive_int(question, 'displayTime'):
+        errors.append(f"{question_type} needs a positive 'displayTime'")
+    if 'digit-span' in question_type and not (_positive_int(question, 'length') or question.get('digits')):
+        errors.append(f"{question_type} needs 'length' or 'digits'")
+    elif 'letter-span' in question_type and not (_positive_int(question, 'length') or question.get('letters')):
+        errors.append(f"{question_type} needs 'length' or 'letters'")
+    elif 'visual-span' in question_type and not (_positive_int(question, 'gridSize')
+                                                 and _positive_int(question, 'stimuliCount')):
+        errors.append(f"{question_type} needs 'gridSize' and 'stimuliCount'")
+    elif 'operation-span' in question_type and not (question.get('problems') and question.get('words')):
+        errors.append(f"{question_type} needs 'problems' and 'words'")
+    return errors
+
+
+def validate_question(category, difficulty, question):
+    """List of problems with one question (empty when it is valid)"""
+    if not isinstance(question, dict):
+        return ['not a JSON object']
+
+    errors = []
+    question_id = question.get('id')
+    if not isinstance(question_id, str) or not question_id:
+        errors.append("missing 'id'")
+    elif len(question_id) > MAX_ID_LENGTH:
+        errors.append(f"id longer than {MAX_ID_LENGTH} characters")
+    if not isinstance(category, str) or not category:
+        errors.append('missing category')
+    elif len(category) > MAX_CATEGORY_LENGTH:
+        errors.append(f"category longer than {MAX_CATEGORY_LENGTH} characters")
+    if difficulty not in DIFFICULTIES:
+        errors.append(f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+
+    text = question.get('question')
+    if not isinstance(text, str) or not text.strip():
+        errors.append("missing 'question'")
+    elif len(text) > MAX_TEXT_LENGTH:
+        errors.append(f"question longer than {MAX_TEXT_LENGTH} characters")
+
+    points = question.get('points', 1)
+    if not isinstance(points, int) or isinstance(points, bool) or points < 0:
+        errors.append("'points' must be a non-negative integer")
+    if question.get('inputType') not in (None,) + INPUT_TYPES:
+        errors.append(f"'inputType' must be one of {', '.join(INPUT_TYPES)}")
+
+    options = question.get('options')
+    if options is not None:
+        if not isinstance(options, list) or not options:
+            errors.append("'options' must be a non-empty list")
+        else:
+            correct = question.get('correct')
+            if not isinstance(correct, int) or isinstance(correct, bool):
+                errors.append("'correct' must be the index of an option")
+            elif not 0 <= correct < len(options):
+                errors.append(f"'correct' index {correct} outside the {len(options)} options")
+
+    question_type = question.get('type') or ''
+    if any(wm_type in question_type for wm_type in WORKING_MEMORY_TYPES):
+        errors.extend(_working_memory_errors(question_type, question))
+    return errors
+
+
+def validate_chunk(chunk):
+    # Top-level so the process pool can pickle it
+    return [validate_question(category, difficulty, question) for category, difficulty, question in chunk]
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BuildReport:
+    """Per-source counts and the rejected questions"""
+
+    def __init__(self, sources, errors_path=None):
+        self.sources = {path: {'read': 0, 'accepted': 0, 'invalid': 0, 'overridden': 0} for path in sources}
+        self.counts = {}
+        self.invalid = []
+        self.errors_file = open(errors_path, 'w', encoding='utf-8') if errors_path else None
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def reject(self, path, category, difficulty, question, errors):
+        self.sources[path]['invalid'] += 1
+        question_id = question.get('id') if isinstance(question, dict) else None
+        if len(self.invalid) < 1000:
+            self.invalid.append((path, question_id, errors))
+        if self.errors_file:
+            self.errors_file.write(json.dumps({'source': path, 'id': question_id, 'category': category,
+                                               'difficulty': difficulty, 'errors': errors},
+                                              ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self.errors_file:
+            self.errors_file.close()
+
+
+def _drain(pending):
+    chunk, future = pending.popleft()
+    results = future.result() if future is not None else validate_chunk(chunk)
+    for (category, difficulty, question), errors in zip(chunk, results):
+        yield category, difficulty, question, errors
+
+
+def _validated(path, pool, chunk_size, ahead):
+    """(category, difficulty, question, errors) in source order, at most ``ahead`` chunks in flight"""
+    pending = deque()
+    for chunk in _chunked(iter_source(path), chunk_size):
+        pending.append((chunk, pool.submit(validate_chunk, chunk) if pool is not None else None))
+        if len(pending) > ahead:
+            yield from _drain(pending)
+    while pending:
+        yield from _drain(pending)
+
+
+def merge_sources(sources, report, workers=None, chunk_size=500):
+    """
+    Yield the merged bank as (category, difficulty, question), grouped by
+    category (in order of first appearance) and difficulty.
+    """
+    workers = workers or os.cpu_count() or 1
+    spool_dir = tempfile.mkdtemp(prefix='question-bank-')
+    spools, categories, seen = {}, [], set()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # Highest precedence first, so the first valid occurrence of an id wins
+        for path in reversed(sources):
+            counts = report.sources[path]
+            for category, difficulty, question, errors in _validated(path, pool, chunk_size, workers * 2):
+                counts['read'] += 1
+                if errors:
+                    report.reject(path, category, difficulty, question, errors)
+                    continue
+                if question['id'] in seen:
+                    counts['overridden'] += 1
+                    continue
+                seen.add(question['id'])
+                counts['accepted'] += 1
+
+                key = (category, difficulty)
+                spool = spools.get(key)
+                if spool is None:
+                    if category not in categories:
+                        categories.append(category)
+                    spool = spools[key] = open(os.path.join(spool_dir, f'{len(spools)}.jsonl'), 'w+',
+                                               encoding='utf-8')
+                spool.write(json.dumps(question, ensure_ascii=False) + '\n')
+                report.counts[key] = report.counts.get(key, 0) + 1
+        seen.clear()
+
+        for category in categories:
+            for difficulty in DIFFICULTIES:
+                spool = spools.get((category, difficulty))
+                if spool is None:
+                    continue
+                spool.seek(0)
+                for line in spool:
+                    yield category, difficulty, json.loads(line)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        for spool in spools.values():
+            spool.close()
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def write_bank(items, output, fmt=None):
+    """
+    Stream grouped (category, difficulty, question) items to ``output`` in
+    the nested JSON layout (formatted like json.dump(indent=2)) or as JSONL.
+    The file is replaced atomically once complete.
+    """
+    fmt = fmt or source_format(output)
+    partial = f'{output}.partial'
+    with open(partial, 'w', encoding='utf-8') as f:
+        if fmt == 'jsonl':
+            for category, difficulty, question in items:
+                f.write(json.dumps({'category': category, 'difficulty': difficulty, **question},
+                                   ensure_ascii=False) + '\n')
+        else:
+            current_category = current_difficulty = None
+            f.write('{')
+            for category, difficulty, question in items:
+                if category != current_category:
+                    if current_category is not None:
+                        f.write('\n    ]\n  },')
+                    f.write(f'\n  {json.dumps(category, ensure_ascii=False)}: {{')
+                    current_category, current_difficulty = category, None
+                if difficulty != current_difficulty:
+                    if current_difficulty is not None:
+                        f.write('\n    ],')
+                    f.write(f'\n    {json.dumps(difficulty, ensure_ascii=False)}: [')
+                    current_difficulty = difficulty
+                    separator = ''
+                f.write(separator + '\n' + textwrap.indent(json.dumps(question, indent=2, ensure_ascii=False), '      '))
+                separator = ','
+            f.write('\n    ]\n  }\n}' if current_category is not None else '}')
+    os.replace(partial, output)
+
+
+def build_bank(sources, output, workers=None, chunk_size=500, errors_path=None, fmt=None):
+    """Merge ``sources`` (lowest precedence first) into ``output``; returns the BuildReport"""
+    report = BuildReport(sources, errors_path)
+    try:
+        write_bank(merge_sources(sources, report, workers=workers, chunk_size=chunk_size), output, fmt)
+    finally:
+        report.close()
+    return report
+
+
+def print_build_report(report, limit=20):
+    """Summary in the style of the question scripts"""
+    print(f"📁 Sources (lowest precedence first):")
+    for path, counts in report.sources.items():
+        print(f"   - {path}: {counts['read']} read, {counts['accepted']} used, "
+              f"{counts['overridden']} overridden, {counts['invalid']} invalid")
+    if report.invalid:
+        print(f"⚠️  Invalid questions (skipped):")
+        for path, question_id, errors in report.invalid[:limit]:
+            print(f"   {path} {question_id or '?'}: {'; '.join(errors)}")
+        invalid = sum(counts['invalid'] for counts in report.sources.values())
+        if invalid > limit:
+            print(f"   ... and {invalid - limit} more")
+    print(f"📋 Final question count after deduplication: {report.total}")
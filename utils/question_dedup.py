@@ -0,0 +1,257 @@
+"""
+Near-duplicate detection for the question bank with MinHash and LSH.
+
+Exact-id merging lets through the same item under two ids, e.g. an analogy
+whose options were reworded. Each question is turned into a set of shingles:
+character 5-grams of the normalized question text, plus one token per
+normalized option. A MinHash signature of ``num_perm`` values approximates
+that set, and the fraction of equal signature positions estimates the
+Jaccard similarity of two questions.
+
+Locality-sensitive hashing splits each signature into ``bands`` bands of
+``num_perm // bands`` rows, and questions whose band values match land in the
+same bucket. Only questions that share a bucket are compared, so the work
+grows roughly linearly with the bank instead of with the number of pairs.
+Candidates must also have the same question type and the same parameters
+(length, displayTime, ...), because working-memory items reuse one prompt
+for different spans.
+
+Clusters of questions above the similarity threshold make up the review
+report. The first question of a cluster in bank order is kept; within a
+category and difficulty the builder puts higher-precedence sources first.
+The ``same-answer`` auto-merge policy drops the others only when they have
+the same category and the same correct answer text and are above the
+threshold against the kept question itself (a chain A~B~C can put C in A's
+cluster while C and A are less alike); ``off`` only reports.
+Items without a fixed answer, whose stimuli are generated at test time, are
+reported but never merged.
+"""
+
+import hashlib
+import json
+import re
+import struct
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.question_bank import _chunked, iter_source, write_bank
+
+MERGE_POLICIES = ('off', 'same-answer')
+
+NUM_PERM = 128
+BANDS = 16  # 8 rows per band: pairs around 0.7 similarity and up become candidates
+SHINGLE_SIZE = 5
+SEED = 20240917
+VALUES_PER_DIGEST = 16
+MAX_BUCKET = 500  # larger buckets are boilerplate prompts; comparing them all is quadratic
+
+# Fields that describe the prompt itself rather than parameters of the task
+CONTENT_KEYS = ('id', 'question', 'options', 'correct', 'points')
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def _salts(num_perm):
+    """One blake2b salt per 16 hash functions: a 64-byte digest holds 16 32-bit values"""
+    return [SEED.to_bytes(8, 'little') + index.to_bytes(8, 'little') for index in range(num_perm // VALUES_PER_DIGEST)]
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def shingles(question):
+    """Set of string shingles for a question dict"""
+    text = normalize(question.get('question', ''))
+    padded = f' {text} '
+    result = {padded[i:i + SHINGLE_SIZE] for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))}
+    for option in question.get('options') or ():
+        result.add('option:' + normalize(option))
+    return result
+
+
+def minhash(shingle_set, num_perm=NUM_PERM):
+    """
+    Signature of ``num_perm`` minimums. Each shingle is hashed with keyed
+    blake2b into 16 independent 32-bit values per digest, and the per-position
+    minimum is taken with map/zip so the inner loops run in C.
+    """
+    unpack = struct.Struct(f'<{VALUES_PER_DIGEST}I').unpack
+    encoded = [shingle.encode('utf-8') for shingle in shingle_set] or [b'']
+    signature = []
+    for salt in _salts(num_perm):
+        values = [unpack(hashlib.blake2b(data, digest_size=64, salt=salt).digest()) for data in encoded]
+        signature.extend(map(min, zip(*values)))
+    return tuple(signature)
+
+
+def parameters(question):
+    """Everything except the prompt, so only items of the same task shape are compared"""
+    return json.dumps({key: value for key, value in question.items() if key not in CONTENT_KEYS},
+                      sort_keys=True, ensure_ascii=False)
+
+
+def correct_text(question):
+    options = question.get('options')
+    correct = question.get('correct')
+    if options and isinstance(correct, int) and 0 <= correct < len(options):
+        return normalize(options[correct])
+    return None if correct is None else normalize(correct)
+
+
+def signature_chunk(args):
+    # Top-level so the process pool can pickle it
+    chunk, num_perm = args
+    return [minhash(shingles(question), num_perm) for _, _, question in chunk]
+
+
+def _in_order(pool, chunks, num_perm, ahead):
+    """(chunk, signatures) in file order with at most ``ahead`` chunks in flight"""
+    pending = deque()
+    for chunk in chunks:
+        pending.append((chunk, pool.submit(signature_chunk, (chunk, num_perm))))
+        if len(pending) > ahead:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+    while pending:
+        chunk, future = pending.popleft()
+        yield chunk, future.result()
+
+
+def similarity(sig1, sig2):
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Keep the lower index (earlier in bank order) as the root
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def find_duplicates(path, threshold=0.8, num_perm=NUM_PERM, bands=BANDS, policy='off',
+                    workers=None, chunk_size=500):
+    """
+    Scan a bank file and return the review report as a dict: settings, and
+    one cluster per group of near-duplicates with the id kept, the others
+    with their estimated similarity, and whether the policy merges them.
+    """
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy {policy!r}; expected one of {', '.join(MERGE_POLICIES)}")
+    if num_perm % bands or num_perm % VALUES_PER_DIGEST:
+        raise ValueError(f'num_perm must be a multiple of bands and of {VALUES_PER_DIGEST}')
+    rows = num_perm // bands
+
+    questions, signatures = [], []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        chunks = _chunked(iter_source(path), chunk_size)
+        if pool is None:
+            pending = ((chunk, signature_chunk((chunk, num_perm))) for chunk in chunks)
+        else:
+            pending = _in_order(pool, chunks, num_perm, ahead=workers * 2)
+        for chunk, chunk_signatures in pending:
+            for (category, difficulty, question), signature in zip(chunk, chunk_signatures):
+                # Keep only what the report and the merge decision need
+                questions.append((question['id'], category, difficulty, question.get('question', ''),
+                                  parameters(question), correct_text(question)))
+                signatures.append(signature)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    buckets = {}
+    for index, signature in enumerate(signatures):
+        for band in range(bands):
+            key = hash((band, signature[band * rows:(band + 1) * rows]))
+            buckets.setdefault(key, []).append(index)
+
+    compared, oversized = set(), 0
+    clusters = _UnionFind()
+    scores = {}
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        if len(members) > MAX_BUCKET:
+            oversized += 1
+            continue
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                pair = (first, second)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                if questions[first][4] != questions[second][4]:
+                    continue
+                score = similarity(signatures[first], signatures[second])
+                if score >= threshold:
+                    scores[pair] = score
+                    clusters.union(first, second)
+
+    groups = {}
+    for first, second in scores:
+        for index in (first, second):
+            groups.setdefault(clusters.find(index), set()).add(index)
+
+    report_clusters = []
+    for root in sorted(groups):
+        keep = questions[root]
+        duplicates = []
+        for index in sorted(groups[root] - {root}):
+            other = questions[index]
+            score = scores.get((root, index)) or similarity(signatures[root], signatures[index])
+            # Items without a fixed answer (generated digit/letter spans) are never merged.
+            # Clusters are transitive (A~B~C), so C may be far from the kept A:
+            # only items that are near-duplicates of the kept one itself are dropped
+            merge = (policy == 'same-answer' and score >= threshold and keep[5] is not None
+                     and other[1] == keep[1] and other[5] == keep[5])
+            duplicates.append({'id': other[0], 'category': other[1], 'difficulty': other[2],
+                               'question': other[3], 'similarity': round(score, 3), 'merge': merge})
+        report_clusters.append({'keep': keep[0], 'category': keep[1], 'difficulty': keep[2],
+                                'question': keep[3], 'duplicates': duplicates})
+
+    return {
+        'source': path,
+        'questions': len(questions),
+        'threshold': threshold,
+        'num_perm': num_perm,
+        'bands': bands,
+        'policy': policy,
+        'candidate_pairs': len(compared),
+        'oversized_buckets': oversized,
+        'clusters': report_clusters,
+    }
+
+
+def merged_ids(report):
+    """Ids the report's policy drops"""
+    return {duplicate['id'] for cluster in report['clusters'] for duplicate in cluster['duplicates']
+            if duplicate['merge']}
+
+
+def drop_questions(path, ids):
+    """Rewrite a bank file without ``ids``; returns how many were dropped"""
+    dropped = 0
+
+    def kept():
+        nonlocal dropped
+        for category, difficulty, question in iter_source(path):
+            if question.get('id') in ids:
+                dropped += 1
+                continue
+            yield category, difficulty, question
+
+    write_bank(kept(), path)
+    return dropped
@@ -0,0 +1,204 @@
+"""
+Incremental loading of the question bank into the database.
+
+Every row carries ``content_hash`` (see ``models.question.content_hash``), so
+a sync reads only ``(id, content_hash)`` for the existing bank, compares
+hashes in memory and writes just the questions that were added or changed.
+Questions that disappeared from the source are reported as removed; with
+``prune`` they are deleted, except those that still have responses, which are
+kept (and reported as retained) so past test sessions stay intact. Answers of
+packed and archived sessions count through their ``OfflineResponseStat``
+totals, so run ``scripts/pack_responses.py --rebuild-stats`` once on
+databases packed before those totals existed.
+
+Rows written before the hash column existed have no hash. Their stored
+columns are hashed on the fly: if they match the source only the hash is
+filled in, otherwise the row counts as changed.
+"""
+
+from extensions import db
+from models.offline_response_stat import OfflineResponseStat
+from models.question import CONTENT_FIELDS, Question, content_hash
+from models.response import Response
+
+WORKING_MEMORY_TYPES = ('digit-span', 'letter-span', 'visual-span', 'n-back', 'operation-span')
+
+BATCH_SIZE = 5000
+
+
+def question_row(question_data, category_name, difficulty):
+    """Column values (with content_hash) for one question from a bank file"""
+    # Set input type based on question type for Working Memory questions
+    if question_data.get('type') and any(wm_type in question_data['type'] for wm_type in WORKING_MEMORY_TYPES):
+        input_type = question_data.get('inputType', 'text')
+    else:
+        input_type = question_data.get('inputType', 'multiple-choice')
+
+    row = {
+        'id': question_data['id'],
+        'question_text': question_data['question'],
+        'options': question_data.get('options', []),
+        'correct_answer': str(question_data.get('correct', '')),
+        'category': category_name,
+        'difficulty': difficulty,
+        'question_type': question_data.get('type', 'multiple-choice'),
+        'points': question_data.get('points', 1),
+        'display_time': question_data.get('displayTime'),
+        'length': question_data.get('length'),
+        'input_type': input_type,
+        'time_limit': question_data.get('timeLimit')
+    }
+    row['content_hash'] = content_hash(row)
+    return row
+
+
+def item_rows(items):
+    """
+    Rows keyed by id (later entries win) from (category, difficulty, question)
+    items. Returns (rows, errors) where errors is a list of (id, message).
+    """
+    rows, errors = {}, []
+    for category_name, difficulty, question_data in items:
+        try:
+            row = question_row(question_data, category_name, difficulty)
+        except (KeyError, TypeError, AttributeError) as e:
+            question_id = question_data.get('id', 'unknown') if isinstance(question_data, dict) else 'unknown'
+            errors.append((question_id, f'missing {e}'))
+            continue
+        rows[row['id']] = row
+    return rows, errors
+
+
+def bank_rows(questions_data):
+    """item_rows() for an in-memory {category: {difficulty: [question, ...]}} bank"""
+    return item_rows((category_name, difficulty, question_data)
+                     for category_name, difficulties in questions_data.items()
+                     for difficulty, questions in difficulties.items()
+                     for question_data in questions)
+
+
+class SyncResult:
+    """Ids touched by a sync, by outcome"""
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.removed = []
+        self.retained = []  # removed from the source but kept: they have responses
+        self.rehashed = 0   # legacy rows whose hash was filled in without a content change
+        self.deleted = 0
+        self.unchanged = 0
+
+    @property
+    def writes(self):
+        return len(self.added) + len(self.changed) + self.rehashed + self.deleted
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _stored_hashes(ids):
+    """Hash the stored columns of rows that predate content_hash"""
+    columns = [Question.id] + [getattr(Question, field) for field in CONTENT_FIELDS]
+    hashes = {}
+    for chunk in _chunks(ids):
+        for row in db.session.query(*columns).filter(Question.id.in_(chunk)):
+            hashes[row[0]] = content_hash(dict(zip(CONTENT_FIELDS, row[1:])))
+    return hashes
+
+
+def sync_questions(rows, prune=False, dry_run=False):
+    """
+    Bring the question table in line with ``rows`` ({id: row} from
+    ``item_rows`` or ``bank_rows``). Does not commit; returns a SyncResult.
+    """
+    result = SyncResult()
+    existing = dict(db.session.query(Question.id, Question.content_hash))
+    legacy = _stored_hashes([question_id for question_id, stored in existing.items()
+                             if stored is None and question_id in rows])
+
+    rehash = []
+    for question_id, row in rows.items():
+        if question_id not in existing:
+            result.added.append(question_id)
+            continue
+        stored = existing[question_id]
+        if stored is None:
+            if legacy.get(question_id) == row['content_hash']:
+                rehash.append({'id': question_id, 'content_hash': row['content_hash']})
+            else:
+                result.changed.append(question_id)
+        elif stored != row['content_hash']:
+            result.changed.append(question_id)
+        else:
+            result.unchanged += 1
+    result.rehashed = len(rehash)
+
+    result.removed = sorted(set(existing) - set(rows))
+    if result.removed:
+        answered = set()
+        for chunk in _chunks(result.removed):
+            answered.update(question_id for (question_id,) in db.session.query(Response.question_id)
+                            .filter(Response.question_id.in_(chunk)).distinct())
+            # Answers that are no longer rows: packed blobs and archive segments
+            answered.update(question_id for (question_id,) in db.session.query(OfflineResponseStat.question_id)
+                            .filter(OfflineResponseStat.question_id.in_(chunk), OfflineResponseStat.attempts > 0)
+                            .distinct())
+        result.retained = [question_id for question_id in result.removed if question_id in answered]
+
+    if dry_run:
+        return result
+
+    if result.writes or (prune and result.removed):
+        # Bulk statements skip the ORM events that invalidate the cached bank version
+        from utils.question_pack import mark_bank_changed
+        mark_bank_changed(db.session)
+
+    for chunk in _chunks(result.added):
+        db.session.execute(db.insert(Question), [rows[question_id] for question_id in chunk])
+    for chunk in _chunks(result.changed):
+        # ORM bulk UPDATE by primary key: one executemany per batch
+        db.session.execute(db.update(Question), [rows[question_id] for question_id in chunk])
+    for chunk in _chunks(rehash):
+        db.session.execute(db.update(Question), chunk)
+    if prune:
+        retained = set(result.retained)
+        deletable = [question_id for question_id in result.removed if question_id not in retained]
+        for chunk in _chunks(deletable):
+            db.session.execute(db.delete(Question).where(Question.id.in_(chunk)))
+        result.deleted = len(deletable)
+    return result
+
+
+def database_rows():
+    """Every question as a column dict with content_hash, e.g. for compiling the question pack"""
+    columns = [Question.id, Question.content_hash] + [getattr(Question, field) for field in CONTENT_FIELDS]
+    rows = []
+    for values in db.session.query(*columns):
+        row = dict(zip(['id', 'content_hash'] + list(CONTENT_FIELDS), values))
+        if row['content_hash'] is None:
+            row['content_hash'] = content_hash(row)
+        rows.append(row)
+    return rows
+
+
+def print_sync_result(result, prune=False, verbose=False):
+    """Summary in the style of the upload scripts"""
+    print(f"📊 Statistics:")
+    print(f"   - Added: {len(result.added)}")
+    print(f"   - Changed: {len(result.changed)}")
+    print(f"   - Unchanged: {result.unchanged}")
+    if result.rehashed:
+        print(f"   - Hash filled in (content unchanged): {result.rehashed}")
+    if prune:
+        print(f"   - Removed: {len(result.removed) - len(result.retained)}")
+        if result.retained:
+            print(f"   - Kept despite removal (have responses): {len(result.retained)}")
+    else:
+        print(f"   - Missing from source (kept; use --prune to delete): {len(result.removed)}")
+    if verbose:
+        for label, ids in (('+', result.added), ('~', result.changed), ('-', result.removed)):
+            for question_id in ids:
+                print(f"     {label} {question_id}")
@@ -0,0 +1,149 @@
+"""
+Question manifest: the client-facing content of the whole bank in one
+versioned, ETag-cached document.
+
+The test page fetches ``/test/manifest`` once and keeps it in the browser's
+HTTP cache, revalidating with ``If-None-Match``. After that the adaptive
+endpoints only send a question id and the permutation that shuffles its
+options (``manifest_version`` in the request says the client holds the
+current manifest). Repeat takers and retries download the bank's text once
+per bank version instead of on every step.
+
+The manifest has the same fields ``format_question`` sends, with the options
+in their stored order; the client applies the permutation itself. The answer
+key stays on the server: ``submit_answer`` grades every answer except those
+of the digit-span items in ``CLIENT_GRADED_TYPES``, which the page checks
+against the sequence it showed, so ``correct`` is sent only for those.
+Server-only columns (content hash, timestamps) are left out.
+
+The version is the bank digest of the question table (``bank_version()``,
+cached per worker), which is also the digest of an up-to-date question pack.
+The serialized body is cached per version.
+"""
+
+import json
+import random
+import threading
+
+from models.question import Question
+from utils.memory_profiling import register_cache
+from utils.question_pack import bank_version, current_pack
+
+# Interactive (Working Memory) types carry no multiple-choice options
+INTERACTIVE_TYPES = (
+    'digit-span', 'digit-span-reverse', 'letter-span', 'letter-span-reorder',
+    'visual-span', 'visual-span-reverse', 'n-back', 'visual-n-back',
+    'operation-span', 'task-switching-span', 'n-back-dual'
+)
+
+# Items the test page grades itself; the only ones sent with ``correct``
+CLIENT_GRADED_TYPES = ('digit-span', 'digit-span-reverse')
+
+_manifest = {}
+_lock = threading.Lock()
+
+register_cache('question_manifest', lambda: _manifest)
+
+
+def client_options(question):
+    """Options as the client sees them, in stored order"""
+    if question.question_type in INTERACTIVE_TYPES:
+        return []
+    if isinstance(question.options, str):
+        try:
+            return json.loads(question.options)
+        except json.JSONDecodeError:
+            print(f"Warning: Could not parse options for question {question.id}")
+            return []
+    return list(question.options or [])
+
+
+def shuffle_permutation(question, options):
+    """
+    Random order for the options as a list of stored indexes (shuffled[i] is
+    options[permutation[i]]), or None when the question is not shuffled.
+    """
+    if len(options) <= 1 or question.correct_answer is None:
+        return None
+    try:
+        correct_idx = int(question.correct_answer)
+    except (ValueError, TypeError):
+        return None
+    if not 0 <= correct_idx < len(options):
+        return None
+    permutation = list(range(len(options)))
+    random.shuffle(permutation)
+    return permutation
+
+
+def client_question(question, options=None, permutation=None):
+    """Question dict in the same format as the JSON file, optionally with shuffled options"""
+    options = client_options(question) if options is None else options
+    if permutation is not None:
+        options = [options[index] for index in permutation]
+
+    question_dict = {
+        "id": question.id,
+        "question": question.question_text,
+        "options": options,
+        "category": question.category,
+        "difficulty": question.difficulty
+    }
+
+    # Add optional fields if they exist
+    correct_answer = question.correct_answer
+    if question.question_type in CLIENT_GRADED_TYPES and correct_answer is not None:
+        question_dict["correct"] = int(correct_answer) if correct_answer.isascii() and correct_answer.isdigit() else correct_answer
+    if question.question_type:
+        question_dict["type"] = question.question_type
+    if question.points:
+        question_dict["points"] = question.points
+    if question.display_time:
+        question_dict["displayTime"] = question.display_time
+    if question.length:
+        question_dict["length"] = question.length
+    if question.input_type:
+        question_dict["inputType"] = question.input_type
+    if question.time_limit:
+        question_dict["timeLimit"] = question.time_limit
+    return question_dict
+
+
+def manifest_version():
+    """Version of the current bank (equal to the pack's version when the pack is up to date)"""
+    return bank_version()
+
+
+def _questions():
+    pack = current_pack()
+    if pack is not None:
+        return iter(pack)
+    return Question.query.order_by(Question.category, Question.difficulty, Question.id).all()
+
+
+def current_manifest():
+    """(version, serialized JSON body) of the current bank, built once per version"""
+    version = manifest_version()
+    with _lock:
+        if _manifest.get('version') != version:
+            entries = {}
+            for question in _questions():
+                entry = client_question(question)
+                del entry['id']
+                entries[question.id] = entry
+            body = json.dumps({'version': version, 'questions': entries},
+                              ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            _manifest.clear()
+            _manifest.update(version=version, body=body)
+        return _manifest['version'], _manifest['body']
+
+
+def question_reference(question, difficulty, version):
+    """Compact adaptive response for a client holding manifest ``version``"""
+    permutation = shuffle_permutation(question, client_options(question))
+    return {
+        'question_id': question.id,
+        'permutation': permutation,
+        'difficulty': difficulty,
+        'manifest_version': version
+    }
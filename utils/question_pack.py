@@ -0,0 +1,417 @@
+"""
+Compiled, memory-mapped question bank.
+
+``scripts/compile_question_bank.py`` writes the bank to a single binary file
+(``QUESTION_PACK``, default ``<instance>/question_bank.iqb``) laid out as:
+
+    header      magic, version, section counts and offsets, bank digest
+    strings     u32 offsets + UTF-8 data; every distinct string (ids, texts,
+                options, categories, types, answers) is stored once
+    records     fixed-width entries sorted by (category, difficulty, id):
+                string ids for id/text/category/difficulty/type/input type/
+                correct answer, the first option slot and option count,
+                points, display time, length, time limit
+    options     u32 string ids, each record's options contiguous
+    groups      (category, difficulty, first record, record count)
+    by id       u32 record numbers sorted by question id, for binary search
+
+Workers ``mmap`` the file read-only, so there is nothing to parse at
+startup. The pages live in the OS page cache and are shared by every worker
+and by forked children. Records are decoded only when asked for, into
+``PackedQuestion`` objects that carry the same attributes as the ORM
+``Question``, so ``format_question`` and the answer check accept either.
+
+The digest is a sha256 over every (id, content_hash) pair, so it changes
+whenever the bank's content does. ``current_pack()`` reopens the file when
+its mtime changes; the ingestion scripts and the admin question views
+recompile it after they commit. Until a worker sees the new file,
+``current_pack()`` compares the pack's digest with ``bank_version()`` and
+returns None for a pack that no longer matches the table.
+
+``bank_version()`` is the same digest for the question table. Every commit
+that writes Question rows (ORM changes, or bulk writes that call
+``mark_bank_changed()``) hashes the bank and stores the result in the
+single ``QuestionBankVersion`` row in the same transaction. Workers read
+that one row, cache it, drop the cache when they commit such a change
+themselves, and otherwise re-read it every ``RELOAD_CHECK_SECONDS`` to see
+writes made by other processes.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models.question import Question
+from models.question_bank_version import QuestionBankVersion
+from utils.db_routing import using_primary
+from utils.memory_profiling import register_cache
+
+MAGIC = b'IQBANK\x00\x01'
+VERSION = 1
+
+NONE = 0xFFFFFFFF  # string id / integer field for NULL
+_NULL_INT = -1
+
+_HEADER = struct.Struct('<8sIIIIIQQQQQQ32s')
+# id, text, category, difficulty, type, input type, correct answer,
+# first option, option count, points, display time, length, time limit
+_RECORD = struct.Struct('<7IIHHiii')
+_GROUP = struct.Struct('<IIII')
+_U32 = struct.Struct('<I')
+
+# How often current_pack() re-checks the file's mtime
+RELOAD_CHECK_SECONDS = 5.0
+
+_packs = {}
+_lock = threading.Lock()
+# {'version': ..., 'expires': ...} for the question table
+_bank = {}
+
+register_cache('question_pack', lambda: _packs)
+register_cache('question_bank_version', lambda: _bank)
+
+
+class QuestionPackError(RuntimeError):
+    """Raised when a pack file is missing, truncated or of another version"""
+
+
+class PackedQuestion:
+    """Read-only question decoded from a pack, with the ORM Question's attribute names"""
+
+    __slots__ = ('id', 'question_text', 'options', 'correct_answer', 'category', 'difficulty',
+                 'question_type', 'points', 'display_time', 'length', 'input_type', 'time_limit')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def __repr__(self):
+        return f'<PackedQuestion {self.id}>'
+
+
+def bank_digest(pairs):
+    """sha256 over sorted (id, content_hash) pairs"""
+    digest = hashlib.sha256()
+    for question_id, content_hash in sorted(pairs):
+        digest.update(f'{question_id}\x00{content_hash or ""}\n'.encode('utf-8'))
+    return digest.digest()
+
+
+def compute_bank_version(session=None):
+    """The bank digest of the question table, hashed from every row (one full read)"""
+    session = session or db.session
+    pairs = session.query(Question.id, Question.content_hash).all()
+    if any(stored is None for _, stored in pairs):
+        # Rows from before the hash column are hashed the way compile_pack() sees them
+        from utils.question_ingest import database_rows
+        pairs = [(row['id'], row['content_hash']) for row in database_rows()]
+    return bank_digest(pairs).hex()[:16]
+
+
+def _store_bank_version(connection, version):
+    table = QuestionBankVersion.__table__
+    values = {'version': version, 'updated_at': datetime.utcnow()}
+    if not connection.execute(table.update().where(table.c.id == 1).values(**values)).rowcount:
+        connection.execute(table.insert().values(id=1, **values))
+
+
+def bank_version():
+    """Digest version of the question table, cached per worker (see the module docstring)"""
+    now = time.monotonic()
+    with _lock:
+        if _bank and _bank['expires'] > now:
+            return _bank['version']
+    with using_primary():
+        version = db.session.query(QuestionBankVersion.version).filter_by(id=1).scalar()
+    if version is None:
+        # A database created without the migrations: hash the bank once and record it
+        version = compute_bank_version()
+        try:
+            with db.engine.begin() as connection:
+                _store_bank_version(connection, version)
+        except IntegrityError:
+            pass  # another worker recorded it first
+    with _lock:
+        _bank.update(version=version, expires=now + RELOAD_CHECK_SECONDS)
+    return version
+
+
+def mark_bank_changed(session):
+    """Record the new bank_version() when ``session`` commits, e.g. after bulk writes"""
+    session.info['question_bank_changed'] = True
+
+
+def _question_written(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        mark_bank_changed(session)
+
+
+def _before_commit(session):
+    # Flush first: the Question listeners only mark the session while flushing
+    session.flush()
+    if session.info.get('question_bank_changed'):
+        with using_primary():
+            _store_bank_version(session.connection(), compute_bank_version(session))
+
+
+def _after_commit(session):
+    if session.info.pop('question_bank_changed', False):
+        with _lock:
+            _bank.clear()
+
+
+def _after_rollback(session):
+    session.info.pop('question_bank_changed', None)
+
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Question, _event, _question_written)
+event.listen(Session, 'before_commit', _before_commit)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
+
+
+def compile_pack(rows, path):
+    """
+    Write ``rows`` (question column dicts with content_hash, as produced by
+    utils/question_ingest.py) to ``path``. Returns (record count, bytes).
+    """
+    rows = sorted(rows, key=lambda row: (row['category'], row['difficulty'], row['id']))
+    strings, string_ids = [], {}
+
+    def intern(value):
+        if value is None:
+            return NONE
+        value = str(value)
+        index = string_ids.get(value)
+        if index is None:
+            index = string_ids[value] = len(strings)
+            strings.append(value)
+        return index
+
+    def integer(value):
+        return _NULL_INT if value is None else int(value)
+
+    records, options, groups = [], [], []
+    for number, row in enumerate(rows):
+        row_options = row.get('options') or []
+        records.append(_RECORD.pack(
+            intern(row['id']), intern(row['question_text']), intern(row['category']),
+            intern(row['difficulty']), intern(row.get('question_type')), intern(row.get('input_type')),
+            intern(row.get('correct_answer')), len(options), len(row_options),
+            row.get('points') or 0, integer(row.get('display_time')), integer(row.get('length')),
+            integer(row.get('time_limit'))))
+        options.extend(intern(option) for option in row_options)
+
+        key = (row['category'], row['difficulty'])
+        if groups and groups[-1][0] == key:
+            groups[-1][2] += 1
+        else:
+            groups.append([key, number, 1])
+
+    by_id = sorted(range(len(rows)), key=lambda number: rows[number]['id'])
+    encoded = [value.encode('utf-8') for value in strings]
+    string_offsets = [0]
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    sections = [
+        b''.join(_U32.pack(offset) for offset in string_offsets) + b''.join(encoded),
+        b''.join(records),
+        b''.join(_U32.pack(option) for option in options),
+        b''.join(_GROUP.pack(string_ids[category], string_ids[difficulty], start, count)
+                 for (category, difficulty), start, count in groups),
+        b''.join(_U32.pack(number) for number in by_id),
+    ]
+    offsets, position = [], _HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+
+    digest = bank_digest((row['id'], row.get('content_hash')) for row in rows)
+    header = _HEADER.pack(MAGIC, VERSION, len(rows), len(strings), len(options), len(groups), *offsets,
+                          position, digest)
+
+    partial = f'{path}.partial'
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(partial, 'wb') as f:
+        f.write(header)
+        for section in sections:
+            f.write(section)
+    # Readers holding the old mapping keep it; new opens see the new file
+    os.replace(partial, path)
+    return len(rows), position
+
+
+class QuestionPack:
+    """A memory-mapped pack; cheap to open, decodes records on demand"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime_ns
+            try:
+                self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise QuestionPackError(f'{path} is empty')
+        if len(self.buf) < _HEADER.size:
+            raise QuestionPackError(f'{path} is truncated')
+        (magic, version, self.count, self.string_count, self.option_count, self.group_count,
+         self._strings, self._records, self._options, self._groups, self._by_id, size,
+         self.digest) = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise QuestionPackError(f'{path} is not a version {VERSION} question pack')
+        if size != len(self.buf):
+            raise QuestionPackError(f'{path} is truncated')
+        self._string_data = self._strings + (self.string_count + 1) * _U32.size
+        self.version = self.digest.hex()[:16]
+        self.stale = False  # set by current_pack() once it has logged a mismatch
+        self._group_index = None
+
+    def close(self):
+        self.buf.close()
+
+    def __len__(self):
+        return self.count
+
+    def string(self, index):
+        if index == NONE:
+            return None
+        start, end = struct.unpack_from('<II', self.buf, self._strings + index * _U32.size)
+        return self.buf[self._string_data + start:self._string_data + end].decode('utf-8')
+
+    def _int(self, value):
+        return None if value == _NULL_INT else value
+
+    def question_id(self, number):
+        return self.string(_U32.unpack_from(self.buf, self._records + number * _RECORD.size)[0])
+
+    def question(self, number):
+        """Decode record ``number`` into a PackedQuestion"""
+        (question_id, text, category, difficulty, question_type, input_type, correct, first_option,
+         option_count, points, display_time, length, time_limit) = _RECORD.unpack_from(
+            self.buf, self._records + number * _RECORD.size)
+        options = [self.string(option) for option in
+                   struct.unpack_from(f'<{option_count}I', self.buf, self._options + first_option * _U32.size)]
+        return PackedQuestion(
+            id=self.string(question_id), question_text=self.string(text), options=options,
+            correct_answer=self.string(correct), category=self.string(category),
+            difficulty=self.string(difficulty), question_type=self.string(question_type),
+            points=points, display_time=self._int(display_time), length=self._int(length),
+            input_type=self.string(input_type), time_limit=self._int(time_limit))
+
+    def groups(self):
+        """{(category, difficulty): range of record numbers}, built once per pack"""
+        if self._group_index is None:
+            index = {}
+            for number in range(self.group_count):
+                category, difficulty, start, count = _GROUP.unpack_from(self.buf, self._groups + number * _GROUP.size)
+                index[(self.string(category), self.string(difficulty))] = range(start, start + count)
+            self._group_index = index
+        return self._group_index
+
+    def group(self, category, difficulty):
+        return self.groups().get((category, difficulty), range(0))
+
+    def find(self, question_id):
+        """Record number of ``question_id`` by binary search over the id index, or None"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.question_id(self._id_order(middle)) < question_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            number = self._id_order(low)
+            if self.question_id(number) == question_id:
+                return number
+        return None
+
+    def _id_order(self, position):
+        return _U32.unpack_from(self.buf, self._by_id + position * _U32.size)[0]
+
+    def get(self, question_id):
+        number = self.find(question_id)
+        return None if number is None else self.question(number)
+
+    def __iter__(self):
+        for number in range(self.count):
+            yield self.question(number)
+
+
+def pack_path(app=None):
+    app = app or current_app
+    return app.config.get('QUESTION_PACK') or os.path.join(app.instance_path, 'question_bank.iqb')
+
+
+def open_pack(path):
+    """
+    The shared QuestionPack for ``path``, reopened when the file changes;
+    None if there is no file. Raises QuestionPackError for a bad file.
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _packs.get(path)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            _packs.pop(path, None)
+            return None
+        if entry is not None and entry[0].mtime == mtime:
+            _packs[path] = (entry[0], now + RELOAD_CHECK_SECONDS)
+            return entry[0]
+        _packs.pop(path, None)
+        pack = QuestionPack(path)
+        # The previous mapping is left to the garbage collector: requests may still hold it
+        _packs[path] = (pack, now + RELOAD_CHECK_SECONDS)
+        return pack
+
+
+def current_pack():
+    """
+    The app's question pack, or None when disabled, not compiled or older than
+    the question table (callers fall back to the ORM)
+    """
+    if not current_app.config.get('QUESTION_PACK_ENABLED', True):
+        return None
+    try:
+        pack = open_pack(pack_path())
+    except QuestionPackError as e:
+        current_app.logger.warning('Ignoring question pack: %s', e)
+        return None
+    if pack is not None and pack.version != bank_version():
+        # Questions changed since the pack was compiled (an admin edit, or a
+        # sync on another host); grading must see the table, not the pack
+        if not pack.stale:
+            pack.stale = True
+            current_app.logger.warning('Ignoring question pack %s: compiled from bank %s, database is at %s',
+                                       pack.path, pack.version, bank_version())
+        return None
+    return pack
+
+
+def refresh_pack():
+    """
+    Recompile the app's pack from the question table if one is in use, e.g.
+    after an admin edit. Returns (record count, bytes), or None without a pack.
+    The caller commits first.
+    """
+    path = pack_path()
+    if not current_app.config.get('QUESTION_PACK_ENABLED', True) or not os.path.exists(path):
+        return None
+    from utils.question_ingest import database_rows
+    return compile_pack(database_rows(), path)
@@ -0,0 +1,231 @@
+"""
+Full-text search over the question bank.
+
+On SQLite the bank is mirrored into an FTS5 virtual table (``question_fts``)
+that keeps its own copy of the text and options next to the question id (an
+UNINDEXED column), and is kept in sync by triggers on every insert, update
+and delete. Each question's FTS row has a stable integer rowid recorded in
+``question_fts_key``, so the triggers find the row to replace through that
+table's unique index instead of scanning the index for the id. It does not
+depend on ``question``'s rowids, which change whenever a batch migration
+rebuilds that table. A rebuild drops the triggers
+too, so ``ensure_search_index()`` recreates missing triggers and repopulates
+the index from the table when it finds any missing. Other backends (or SQLite
+builds without FTS5) fall back to a plain LIKE scan.
+"""
+
+import re
+
+from sqlalchemy import or_, cast, String, text
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from models.question import Question
+
+FTS_TABLE = 'question_fts'
+# Stable integer rowid of each question's FTS row, so the triggers delete by rowid
+FTS_KEY_TABLE = 'question_fts_key'
+
+# Weights passed to bm25(): question text matters more than option strings
+TEXT_WEIGHT = 2.0
+OPTIONS_WEIGHT = 1.0
+
+FTS_TRIGGERS = ('question_fts_ai', 'question_fts_ad', 'question_fts_au')
+
+_FTS_ROWID = f'(SELECT fts_rowid FROM {FTS_KEY_TABLE} WHERE id = {{}}.id)'
+
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        id UNINDEXED, question_text, options,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {FTS_KEY_TABLE} (
+        fts_rowid INTEGER PRIMARY KEY,
+        id VARCHAR(10) NOT NULL UNIQUE
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS question_fts_ai AFTER INSERT ON question BEGIN
+        INSERT OR IGNORE INTO {FTS_KEY_TABLE}(id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, id, question_text, options)
+        VALUES ({_FTS_ROWID.format('new')}, new.id, new.question_text, new.options);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS question_fts_ad AFTER DELETE ON question BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = {_FTS_ROWID.format('old')};
+        DELETE FROM {FTS_KEY_TABLE} WHERE id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS question_fts_au AFTER UPDATE ON question BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = {_FTS_ROWID.format('old')};
+        DELETE FROM {FTS_KEY_TABLE} WHERE id = old.id;
+        INSERT OR IGNORE INTO {FTS_KEY_TABLE}(id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, id, question_text, options)
+        VALUES ({_FTS_ROWID.format('new')}, new.id, new.question_text, new.options);
+    END
+    """,
+]
+
+FTS_POPULATE = [
+    f'DELETE FROM {FTS_TABLE}',
+    f'DELETE FROM {FTS_KEY_TABLE}',
+    f'INSERT INTO {FTS_KEY_TABLE}(id) SELECT id FROM question',
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, id, question_text, options)
+    SELECT k.fts_rowid, q.id, q.question_text, q.options
+    FROM question q JOIN {FTS_KEY_TABLE} k ON k.id = q.id
+    """,
+]
+
+FTS_DROP = [
+    'DROP TRIGGER IF EXISTS question_fts_au',
+    'DROP TRIGGER IF EXISTS question_fts_ad',
+    'DROP TRIGGER IF EXISTS question_fts_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    f'DROP TABLE IF EXISTS {FTS_KEY_TABLE}',
+]
+
+# Engine URLs for which the index is known to exist (or known to be unavailable)
+_fts_state = {}
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _search_terms(query):
+    """Split a free-text query into plain word terms"""
+    return [term.lower() for term in _TERM_RE.findall(query or '')]
+
+
+def fts_available():
+    """Return True if the current engine can serve FTS5 queries"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    key = str(engine.url)
+    if key not in _fts_state:
+        _fts_state[key] = ensure_search_index()
+    return _fts_state[key]
+
+
+def ensure_search_index(rebuild=False):
+    """
+    Create the FTS5 table and sync triggers if they are missing, replacing an
+    index of the older external-content layout. The index is repopulated from
+    the question table when it was created or any trigger had to be
+    recreated (writes in between were not mirrored).
+    Returns False when the backend cannot host the index.
+    """
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    try:
+        with engine.begin() as conn:
+            objects = dict(conn.execute(text(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE name IN (:table, :keys) OR (type = 'trigger' AND tbl_name = 'question')"
+            ), {'table': FTS_TABLE, 'keys': FTS_KEY_TABLE}).all())
+            table_sql = objects.get(FTS_TABLE)
+            if table_sql is not None and ('UNINDEXED' not in table_sql or FTS_KEY_TABLE not in objects):
+                # An older layout: keyed by question rowid, which batch migrations
+                # do not preserve, or by the unindexed id alone, which every
+                # trigger delete had to scan for
+                for statement in FTS_DROP:
+                    conn.execute(text(statement))
+                table_sql = None
+
+            stale = rebuild or table_sql is None or any(name not in objects for name in FTS_TRIGGERS)
+            for statement in FTS_DDL:
+                conn.execute(text(statement))
+            if stale:
+                for statement in FTS_POPULATE:
+                    conn.execute(text(statement))
+    except OperationalError as e:
+        # SQLite compiled without FTS5
+        print(f"Warning: full-text search index unavailable: {e}")
+        _fts_state[str(engine.url)] = False
+        return False
+
+    _fts_state[str(engine.url)] = True
+    return True
+
+
+def rebuild_search_index():
+    """Repopulate the FTS5 index from the question table"""
+    return ensure_search_index(rebuild=True)
+
+
+def search_questions(query, limit=50):
+    """
+    Search question text and option strings.
+    Returns a list of (Question, rank) tuples, best match first. With FTS5 the
+    rank is the bm25 score (lower is better); the LIKE fallback returns the
+    number of matched terms (higher is better).
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return []
+
+    if fts_available():
+        return _search_fts(terms, limit)
+    return _search_like(terms, limit)
+
+
+def _search_fts(terms, limit):
+    """Ranked FTS5 MATCH; any term may match, more matches rank higher"""
+    match = ' OR '.join(f'"{term}"' for term in terms)
+    rows = db.session.execute(
+        text(f"""
+            SELECT q.id, bm25({FTS_TABLE}, 0.0, :text_weight, :options_weight) AS rank
+            FROM {FTS_TABLE}
+            JOIN question q ON q.id = {FTS_TABLE}.id
+            WHERE {FTS_TABLE} MATCH :match
+            ORDER BY rank
+            LIMIT :limit
+        """),
+        {
+            'match': match,
+            'limit': limit,
+            'text_weight': TEXT_WEIGHT,
+            'options_weight': OPTIONS_WEIGHT,
+        }
+    ).all()
+
+    if not rows:
+        return []
+
+    questions = {
+        q.id: q for q in Question.query.filter(Question.id.in_([row.id for row in rows])).all()
+    }
+    return [(questions[row.id], row.rank) for row in rows if row.id in questions]
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _search_like(terms, limit):
+    """Portable fallback: case-insensitive substring match on any term"""
+    options_text = cast(Question.options, String)
+    clauses = []
+    for term in terms:
+        pattern = f'%{_escape_like(term)}%'
+        clauses.append(Question.question_text.ilike(pattern, escape='\\'))
+        clauses.append(options_text.ilike(pattern, escape='\\'))
+
+    candidates = Question.query.filter(or_(*clauses)).order_by(Question.id).limit(limit * 4).all()
+
+    ranked = []
+    for question in candidates:
+        haystack = f"{question.question_text} {question.options or ''}".lower()
+        hits = sum(1 for term in terms if term in haystack)
+        ranked.append((question, hits))
+
+    ranked.sort(key=lambda item: -item[1])
+    return ranked[:limit]
@@ -0,0 +1,209 @@
+"""
+Token-bucket rate limiting for the authentication endpoints.
+
+Each limit is written "N/S": a bucket holds at most N tokens and refills at
+N per S seconds; every attempt takes one token. ``check_limits`` runs before
+a handler touches the database, so a rejected login never reaches the User
+lookup or the password hash.
+
+Logins are limited three ways. ``ip`` caps an address across all usernames
+and ``username_ip`` caps one address guessing one account; both count every
+attempt. ``username`` caps guessing against one account from any number of
+addresses. It counts only failed logins (``record_failure``) and has a
+higher threshold, so the owner's own logins never use it up and a lockout
+needs a sustained attack. Registration counts every attempt per address and
+per username. Client addresses come from ``request.remote_addr``, which
+reflects X-Forwarded-For only when ``TRUSTED_PROXIES`` is set.
+
+Buckets live in worker memory by default. ``RATE_LIMIT_BACKEND=sqlite``
+keeps them in a small SQLite file (``RATE_LIMIT_STORAGE``) shared by every
+worker on the host, so the limits hold regardless of which worker an
+attacker's requests land on.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from utils.memory_profiling import register_cache
+from utils.metrics import registry
+
+BACKENDS = ('memory', 'sqlite')
+
+DECISIONS = registry.counter(
+    'rate_limit_decisions_total', 'Rate limiter decisions by scope, key type and result',
+    ('scope', 'key_type', 'result'))
+
+
+def parse_limit(spec):
+    """'20/60' -> (capacity 20, refill 20/60 tokens per second)"""
+    try:
+        count, seconds = spec.split('/')
+        capacity, period = float(count), float(seconds)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid rate limit {spec!r}; expected 'N/seconds'")
+    if capacity <= 0 or period <= 0:
+        raise ValueError(f"Invalid rate limit {spec!r}; both parts must be positive")
+    return capacity, capacity / period
+
+
+def _take(tokens, updated, now, capacity, rate, cost=1):
+    """Refill then try to take ``cost`` tokens (0 only checks); returns (allowed, tokens, retry_after)"""
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - cost, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryBackend:
+    """Buckets in this process, evicting the least recently used beyond max_keys"""
+
+    def __init__(self, max_keys=100000):
+        self.buckets = OrderedDict()
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now, cost=1):
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            allowed, tokens, retry_after = _take(tokens, updated, now, capacity, rate, cost)
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def reset(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class SqliteBackend:
+    """Buckets in a SQLite file shared by the workers of one host"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')
+        return conn
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or getattr(self.local, 'pid', None) != os.getpid():
+            conn = self.local.conn = self._connect()
+            self.local.pid = os.getpid()
+        return conn
+
+    def take(self, key, capacity, rate, now, cost=1):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM bucket WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            allowed, tokens, retry_after = _take(tokens, updated, now, capacity, rate, cost)
+            conn.execute('INSERT OR REPLACE INTO bucket (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+    def reset(self):
+        self._conn().execute('DELETE FROM bucket')
+
+
+class RateLimiter:
+    """
+    Named limits ('login.ip', 'login.username', ...) over one backend.
+    Limits named in ``failure_limits`` are only charged by record_failure();
+    check() refuses once they are empty but does not take from them.
+    """
+
+    def __init__(self, backend, limits, enabled=True, failure_limits=()):
+        self.backend = backend
+        self.limits = {name: parse_limit(spec) for name, spec in limits.items()}
+        self.failure_limits = set(failure_limits)
+        self.enabled = enabled
+
+    def _buckets(self, scope, keys):
+        for key_type, value in keys.items():
+            name = f'{scope}.{key_type}'
+            limit = self.limits.get(name)
+            if limit is not None and value:
+                yield key_type, f'{scope}:{key_type}:{value}', limit, name in self.failure_limits
+
+    def check(self, scope, **keys):
+        """
+        Take a token from every bucket of ``scope`` that has a key, e.g.
+        check('login', ip='1.2.3.4', username='bob'). Returns (allowed,
+        retry_after_seconds); a rejection stops at the first empty bucket.
+        """
+        if not self.enabled:
+            return True, 0.0
+        now = time.time()
+        for key_type, key, limit, failures_only in self._buckets(scope, keys):
+            allowed, retry_after = self.backend.take(key, *limit, now, cost=0 if failures_only else 1)
+            if not allowed:
+                DECISIONS.inc(scope=scope, key_type=key_type, result='rejected')
+                return False, retry_after
+        DECISIONS.inc(scope=scope, key_type='all', result='accepted')
+        return True, 0.0
+
+    def record_failure(self, scope, **keys):
+        """Charge the failure-only buckets of ``scope``, e.g. after a wrong password"""
+        if not self.enabled:
+            return
+        now = time.time()
+        for _, key, limit, failures_only in self._buckets(scope, keys):
+            if failures_only:
+                self.backend.take(key, *limit, now)
+
+
+def configure_rate_limits(app):
+    """Build the limiter from config and store it in app.extensions; call once from create_app()"""
+    backend_name = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+    if backend_name not in BACKENDS:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend_name!r}; expected one of {', '.join(BACKENDS)}")
+
+    if backend_name == 'sqlite':
+        path = app.config.get('RATE_LIMIT_STORAGE') or os.path.join(app.instance_path, 'rate_limits.db')
+        backend = SqliteBackend(path)
+    else:
+        backend = MemoryBackend()
+        register_cache('rate_limit_buckets', lambda: backend.buckets)
+
+    limiter = RateLimiter(backend, {
+        'login.ip': app.config['RATE_LIMIT_LOGIN_IP'],
+        'login.username_ip': app.config['RATE_LIMIT_LOGIN_USERNAME_IP'],
+        'login.username': app.config['RATE_LIMIT_LOGIN_USERNAME'],
+        'register.ip': app.config['RATE_LIMIT_REGISTER_IP'],
+        'register.username': app.config['RATE_LIMIT_REGISTER_USERNAME'],
+    }, enabled=app.config.get('RATE_LIMIT_ENABLED', True), failure_limits=('login.username',))
+    app.extensions['rate_limiter'] = limiter
+    return limiter
+
+
+def check_limits(scope, **keys):
+    """Check the current app's limiter; used by the auth views"""
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is None:
+        return True, 0.0
+    return limiter.check(scope, **keys)
+
+
+def record_failure(scope, **keys):
+    """Charge the current app's failure-only limits; used by the login view"""
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is not None:
+        limiter.record_failure(scope, **keys)
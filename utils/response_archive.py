@@ -0,0 +1,202 @@
+"""
+Cold storage for the responses of old test sessions.
+
+``scripts/archive_responses.py`` moves sessions, month by month (of their
+start time), out of the database into append-only segment files under
+``RESPONSE_ARCHIVE_DIR``:
+
+    responses-YYYY-MM.seg   zlib-compressed blocks; each block holds up to
+                            BLOCK_SESSIONS entries of
+                            (session id u32, blob length u32, packed blob)
+    responses-YYYY-MM.idx   sorted fixed-width entries
+                            (session id u32, block offset u64, block length u32)
+
+Each session's answers are stored in the packed format from
+utils/response_packing.py, and ``TestSession.archived_segment`` records the
+month. utils/response_store.py reads archived sessions through
+``read_archived_blob`` as if they were still in the database.
+"""
+
+import bisect
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import current_app
+
+from utils.memory_profiling import register_cache
+from utils.metrics import record_cache_lookup
+
+BLOCK_SESSIONS = 256
+COMPRESSION_LEVEL = 9
+
+_INDEX_ENTRY = struct.Struct('<IQI')
+_BLOCK_ENTRY = struct.Struct('<II')
+
+# Parsed indexes keyed by path, invalidated when the file's mtime changes
+_index_cache = {}
+# Recently decompressed blocks, so reading a user's sessions in one month
+# does not inflate the same block repeatedly
+_block_cache = OrderedDict()
+_BLOCK_CACHE_SIZE = 32
+_lock = threading.Lock()
+
+register_cache('archive_index', lambda: _index_cache)
+register_cache('archive_block', lambda: _block_cache)
+
+
+class ArchiveError(RuntimeError):
+    """Raised when an archived session cannot be read"""
+
+
+def archive_dir():
+    path = current_app.config.get('RESPONSE_ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'archive')
+    return path
+
+
+def segment_paths(month, directory=None):
+    """Segment and index file paths for a 'YYYY-MM' month"""
+    directory = directory or archive_dir()
+    base = os.path.join(directory, f'responses-{month}')
+    return base + '.seg', base + '.idx'
+
+
+def month_of(moment):
+    return moment.strftime('%Y-%m')
+
+
+def _load_index(index_path):
+    """Return (session_ids, entries) for an index file, cached by mtime"""
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        raise ArchiveError(f"Archive index missing: {index_path}")
+
+    with _lock:
+        cached = _index_cache.get(index_path)
+    hit = bool(cached and cached[0] == mtime)
+    record_cache_lookup('archive_index', hit)
+    if hit:
+        return cached[1], cached[2]
+
+    with open(index_path, 'rb') as f:
+        data = f.read()
+    entries = list(_INDEX_ENTRY.iter_unpack(data))
+    session_ids = [entry[0] for entry in entries]
+
+    with _lock:
+        _index_cache[index_path] = (mtime, session_ids, entries)
+    return session_ids, entries
+
+
+def _read_block(segment_path, offset, length):
+    key = (segment_path, offset)
+    with _lock:
+        block = _block_cache.get(key)
+        if block is not None:
+            _block_cache.move_to_end(key)
+    record_cache_lookup('archive_block', block is not None)
+    if block is not None:
+        return block
+
+    with open(segment_path, 'rb') as f:
+        f.seek(offset)
+        compressed = f.read(length)
+    if len(compressed) != length:
+        raise ArchiveError(f"Truncated archive block at {segment_path}:{offset}")
+    block = zlib.decompress(compressed)
+
+    with _lock:
+        _block_cache[key] = block
+        while len(_block_cache) > _BLOCK_CACHE_SIZE:
+            _block_cache.popitem(last=False)
+    return block
+
+
+def _find_in_block(block, session_id):
+    offset = 0
+    while offset < len(block):
+        entry_session_id, length = _BLOCK_ENTRY.unpack_from(block, offset)
+        offset += _BLOCK_ENTRY.size
+        if entry_session_id == session_id:
+            return block[offset:offset + length]
+        offset += length
+    return None
+
+
+def read_archived_blob(session_id, month, directory=None):
+    """Return the packed response blob of an archived session"""
+    segment_path, index_path = segment_paths(month, directory)
+    session_ids, entries = _load_index(index_path)
+
+    position = bisect.bisect_left(session_ids, session_id)
+    if position == len(session_ids) or session_ids[position] != session_id:
+        raise ArchiveError(f"Session {session_id} not found in archive {month}")
+
+    _, block_offset, block_length = entries[position]
+    blob = _find_in_block(_read_block(segment_path, block_offset, block_length), session_id)
+    if blob is None:
+        raise ArchiveError(f"Session {session_id} missing from its archive block in {month}")
+    return blob
+
+
+def append_sessions(month, blobs, directory=None):
+    """
+    Append {session_id: packed blob} to a month's segment and rewrite its index.
+    Blocks are written and fsynced before the index is atomically replaced,
+    so readers never see index entries pointing at unwritten data.
+    """
+    directory = directory or archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    segment_path, index_path = segment_paths(month, directory)
+
+    existing = []
+    if os.path.exists(index_path):
+        with open(index_path, 'rb') as f:
+            existing = list(_INDEX_ENTRY.iter_unpack(f.read()))
+    archived = {entry[0] for entry in existing}
+
+    new_entries = []
+    pending = sorted((sid, blob) for sid, blob in blobs.items() if sid not in archived)
+    with open(segment_path, 'ab') as segment:
+        offset = segment.tell()
+        for start in range(0, len(pending), BLOCK_SESSIONS):
+            chunk = pending[start:start + BLOCK_SESSIONS]
+            raw = b''.join(_BLOCK_ENTRY.pack(sid, len(blob)) + blob for sid, blob in chunk)
+            compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+            segment.write(compressed)
+            new_entries.extend((sid, offset, len(compressed)) for sid, _ in chunk)
+            offset += len(compressed)
+        segment.flush()
+        os.fsync(segment.fileno())
+
+    entries = sorted(existing + new_entries)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(b''.join(_INDEX_ENTRY.pack(*entry) for entry in entries))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, index_path)
+
+    return len(new_entries)
+
+
+def archive_stats(directory=None):
+    """Sizes and session counts of every archive segment"""
+    directory = directory or archive_dir()
+    stats = []
+    if not os.path.isdir(directory):
+        return stats
+    for name in sorted(os.listdir(directory)):
+        if name.startswith('responses-') and name.endswith('.idx'):
+            month = name[len('responses-'):-len('.idx')]
+            segment_path, index_path = segment_paths(month, directory)
+            stats.append({
+                'month': month,
+                'sessions': os.path.getsize(index_path) // _INDEX_ENTRY.size,
+                'segment_bytes': os.path.getsize(segment_path) if os.path.exists(segment_path) else 0,
+                'index_bytes': os.path.getsize(index_path),
+            })
+    return stats
@@ -0,0 +1,374 @@
+"""
+Streaming bulk export of responses and test sessions.
+
+Rows are read through a streaming cursor in fixed-size partitions and encoded
+one partition at a time, so memory use depends on the chunk size and never on
+the size of the export. The same generators back the admin download endpoint
+and ``scripts/export_responses.py``.
+"""
+
+import csv
+import io
+import itertools
+import json
+from datetime import datetime, date
+
+from sqlalchemy import or_, select
+
+from extensions import db
+from models.question import Question
+from models.response import Response
+from models.test_session import TestSession
+from models.user import User
+from utils.response_packing import unpack_responses
+from utils.response_store import session_blob
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+DATASETS = {
+    'responses': [
+        Response.id.label('response_id'),
+        Response.test_session_id,
+        TestSession.user_id,
+        User.username,
+        Response.question_id,
+        Question.category,
+        Question.difficulty,
+        Question.question_type,
+        Response.user_answer,
+        Response.is_correct,
+        Response.response_time,
+        Response.created_at,
+        TestSession.start_time.label('session_start_time'),
+        TestSession.end_time.label('session_end_time'),
+        TestSession.fsiq,
+    ],
+    'sessions': [
+        TestSession.id.label('test_session_id'),
+        TestSession.user_id,
+        User.username,
+        TestSession.start_time,
+        TestSession.end_time,
+        TestSession.score,
+        TestSession.total_questions,
+        TestSession.fsiq,
+        TestSession.percentile,
+        TestSession.classification,
+        TestSession.reliability_coefficient,
+    ],
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class ExportError(ValueError):
+    """Raised for invalid export parameters"""
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD (or full ISO) filter value; empty values mean no bound"""
+    if not value:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"Invalid date: {value!r} (expected YYYY-MM-DD)")
+
+
+def build_export_query(dataset='responses', start=None, end=None, category=None, user_id=None, username=None):
+    """
+    Build the SELECT for an export.
+    ``start``/``end`` bound the session start time (end is exclusive),
+    ``category`` filters on question category and ``user_id``/``username``
+    on the session's user. Only Response rows are covered; packed and
+    archived sessions come from iter_packed_row_chunks() and
+    iter_packed_session_chunks().
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset: {dataset!r}")
+
+    stmt = select(*DATASETS[dataset])
+    if dataset == 'responses':
+        stmt = stmt.select_from(Response)\
+            .join(TestSession, TestSession.id == Response.test_session_id)\
+            .join(Question, Question.id == Response.question_id)\
+            .join(User, User.id == TestSession.user_id)
+        order_by = Response.id
+    else:
+        stmt = stmt.select_from(TestSession)\
+            .join(User, User.id == TestSession.user_id)
+        order_by = TestSession.id
+
+    stmt = _filter_sessions(stmt, start, end, user_id, username)
+
+    if category:
+        if dataset == 'responses':
+            stmt = stmt.where(Question.category == category)
+        else:
+            stmt = stmt.where(TestSession.id.in_(
+                select(Response.test_session_id)
+                .join(Question, Question.id == Response.question_id)
+                .where(Question.category == category)
+            ))
+
+    return stmt.order_by(order_by)
+
+
+def _filter_sessions(stmt, start=None, end=None, user_id=None, username=None):
+    """Apply the session date range and user filters shared by every export query"""
+    start = parse_date(start)
+    end = parse_date(end)
+    if start:
+        stmt = stmt.where(TestSession.start_time >= start)
+    if end:
+        stmt = stmt.where(TestSession.start_time < end)
+
+    if user_id not in (None, ''):
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            raise ExportError(f"Invalid user id: {user_id!r}")
+        stmt = stmt.where(TestSession.user_id == user_id)
+    if username:
+        stmt = stmt.where(User.username == username)
+    return stmt
+
+
+def column_names(dataset='responses'):
+    return [column.key for column in DATASETS[dataset]]
+
+
+def iter_row_chunks(stmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield lists of row dicts, ``chunk_size`` rows at a time.
+    Uses a server-side cursor where the backend supports one (PostgreSQL,
+    MySQL); SQLite cursors already step through the result lazily.
+    """
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        for partition in result.mappings().partitions(chunk_size):
+            yield [dict(row) for row in partition]
+
+
+def _offline_sessions(columns, chunk_size, start, end, user_id, username):
+    """Batches of (row dicts, decoded responses) for packed and archived sessions"""
+    stmt = _filter_sessions(
+        select(*columns, TestSession.id.label('_session_id'), TestSession.packed_responses,
+               TestSession.archived_segment)
+        .select_from(TestSession)
+        .join(User, User.id == TestSession.user_id)
+        .where(or_(TestSession.packed_responses.isnot(None), TestSession.archived_segment.isnot(None))),
+        start, end, user_id, username
+    ).order_by(TestSession.id)
+
+    for rows in iter_row_chunks(stmt, chunk_size=chunk_size):
+        responses = [
+            r for row in rows
+            for session_id in [row.pop('_session_id')]
+            for r in unpack_responses(
+                session_blob(session_id, row.pop('packed_responses'), row.pop('archived_segment')), session_id
+            )
+        ]
+        yield rows, responses
+
+
+def _question_info(question_ids, questions):
+    """Fill ``questions`` ({id: (category, difficulty, type)}) for ids not yet in it"""
+    missing = set(question_ids) - questions.keys()
+    if missing:
+        for question_id, q_category, difficulty, question_type in db.session.execute(
+            select(Question.id, Question.category, Question.difficulty, Question.question_type)
+            .where(Question.id.in_(missing))
+        ):
+            questions[question_id] = (q_category, difficulty, question_type)
+    return questions
+
+
+def iter_packed_row_chunks(chunk_size=DEFAULT_CHUNK_SIZE, start=None, end=None, category=None,
+                           user_id=None, username=None):
+    """
+    Yield response rows of packed and archived sessions (see
+    utils/response_store.py) in the same shape as the SQL export. These
+    answers carry no response id or created_at, so those columns are empty.
+    """
+    columns = (TestSession.id, TestSession.user_id, User.username, TestSession.start_time,
+               TestSession.end_time, TestSession.fsiq)
+    questions = {}
+    chunk = []
+    for session, responses in _offline_sessions(columns, max(1, chunk_size // 15), start, end, user_id, username):
+        sessions = {row['id']: row for row in session}
+        _question_info((r.question_id for r in responses), questions)
+
+        for response in responses:
+            q_category, difficulty, question_type = questions.get(response.question_id, (None, None, None))
+            if category and q_category != category:
+                continue
+            owner = sessions[response.test_session_id]
+            chunk.append({
+                'response_id': None,
+                'test_session_id': response.test_session_id,
+                'user_id': owner['user_id'],
+                'username': owner['username'],
+                'question_id': response.question_id,
+                'category': q_category,
+                'difficulty': difficulty,
+                'question_type': question_type,
+                'user_answer': response.user_answer,
+                'is_correct': response.is_correct,
+                'response_time': response.response_time,
+                'created_at': None,
+                'session_start_time': owner['start_time'],
+                'session_end_time': owner['end_time'],
+                'fsiq': owner['fsiq'],
+            })
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_packed_session_chunks(chunk_size=DEFAULT_CHUNK_SIZE, start=None, end=None, category=None,
+                               user_id=None, username=None):
+    """
+    Yield rows of the sessions dataset for packed and archived sessions that
+    answered a question of ``category``. Only needed with a category filter:
+    without one the SQL export already includes every session.
+    """
+    questions = {}
+    for rows, responses in _offline_sessions(DATASETS['sessions'], chunk_size, start, end, user_id, username):
+        _question_info((r.question_id for r in responses), questions)
+        matching = {r.test_session_id for r in responses
+                    if questions.get(r.question_id, (None,))[0] == category}
+        chunk = [row for row in rows if row['test_session_id'] in matching]
+        if chunk:
+            yield chunk
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_csv(chunks, columns):
+    """Yield CSV text, one block per chunk, header first"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def encode_ndjson(chunks, columns):
+    """Yield newline-delimited JSON, one block per chunk"""
+    for rows in chunks:
+        yield ''.join(json.dumps(row, default=_json_default) + '\n' for row in rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_schema(pa, dataset):
+    """Arrow schema derived from the SQL column types, so all-NULL chunks still type-check"""
+    fields = []
+    for column in DATASETS[dataset]:
+        python_type = column.type.python_type
+        if python_type is bool:
+            arrow_type = pa.bool_()
+        elif python_type is int:
+            arrow_type = pa.int64()
+        elif python_type is float:
+            arrow_type = pa.float64()
+        elif python_type is datetime:
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.key, arrow_type))
+    return pa.schema(fields)
+
+
+def encode_parquet(chunks, columns, dataset='responses'):
+    """Yield a Parquet file, one row group per chunk (requires pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires the optional 'pyarrow' package")
+
+    schema = _arrow_schema(pa, dataset)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+    'parquet': encode_parquet,
+}
+
+
+def stream_export(fmt='csv', dataset='responses', chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Yield the encoded export as a sequence of str (csv/ndjson) or bytes (parquet) blocks"""
+    if fmt not in ENCODERS:
+        raise ExportError(f"Unknown format: {fmt!r}")
+    if chunk_size < 1:
+        # iter_row_chunks() would read nothing and produce a header-only file
+        raise ExportError(f"chunk_size must be at least 1, got {chunk_size}")
+    if fmt == 'parquet':
+        # Fail before any bytes are produced
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("Parquet export requires the optional 'pyarrow' package")
+
+    stmt = build_export_query(dataset, **filters)
+    chunks = iter_row_chunks(stmt, chunk_size)
+    if dataset == 'responses':
+        chunks = itertools.chain(chunks, iter_packed_row_chunks(chunk_size, **filters))
+    elif filters.get('category'):
+        chunks = itertools.chain(chunks, iter_packed_session_chunks(chunk_size, **filters))
+    if fmt == 'parquet':
+        return encode_parquet(chunks, column_names(dataset), dataset)
+    return ENCODERS[fmt](chunks, column_names(dataset))
@@ -0,0 +1,138 @@
+"""
+Compact binary encoding for the answers of a finished test session.
+
+Layout (little-endian), version 1:
+
+    header   magic "RP", version u8, record count u16, question count u16, text count u16
+    questions  u8 length + ASCII question id, once per distinct question
+    texts      u16 length + UTF-8 answer, once per distinct free-text answer
+    records    5 bytes each: question index u8, flags u8,
+               response time u16 (deciseconds, 0xFFFF = unknown), answer code u8
+
+Flag bits: 0 = correct, 1 = answer is an option index (the code is the index
+itself), 2 = answer is a text (the code indexes the text table). An answer
+with neither bit set was stored as an empty string.
+"""
+
+import struct
+
+MAGIC = b'RP'
+VERSION = 1
+
+_HEADER = struct.Struct('<2sBHHH')
+_RECORD = struct.Struct('<BBHB')
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+
+FLAG_CORRECT = 0x01
+FLAG_OPTION = 0x02
+FLAG_TEXT = 0x04
+
+TIME_UNKNOWN = 0xFFFF
+TIME_SCALE = 10  # deciseconds
+MAX_CODE = 0xFF
+
+
+class PackingError(ValueError):
+    """Raised when responses cannot be represented in the packed format"""
+
+
+class PackedResponse:
+    """Read-only stand-in for a Response row decoded from a packed session"""
+
+    __slots__ = ('id', 'test_session_id', 'question_id', 'user_answer', 'is_correct',
+                 'response_time', 'created_at', 'question')
+
+    def __init__(self, test_session_id, question_id, user_answer, is_correct, response_time):
+        self.id = None
+        self.test_session_id = test_session_id
+        self.question_id = question_id
+        self.user_answer = user_answer
+        self.is_correct = is_correct
+        self.response_time = response_time
+        self.created_at = None
+        self.question = None
+
+    def __repr__(self):
+        return f'<PackedResponse session {self.test_session_id} - Question {self.question_id}>'
+
+
+def _quantize_time(response_time):
+    if response_time is None:
+        return TIME_UNKNOWN
+    return max(0, min(TIME_UNKNOWN - 1, int(round(response_time * TIME_SCALE))))
+
+
+def pack_responses(responses):
+    """Encode Response-like objects (in answer order) into a packed blob"""
+    question_index = {}
+    text_index = {}
+    records = []
+
+    for response in responses:
+        qidx = question_index.setdefault(response.question_id, len(question_index))
+        if qidx > MAX_CODE:
+            raise PackingError("Too many distinct questions for one packed session")
+
+        flags = FLAG_CORRECT if response.is_correct else 0
+        answer = response.user_answer or ''
+        if answer.isascii() and answer.isdigit() and str(int(answer)) == answer and int(answer) <= MAX_CODE:
+            flags |= FLAG_OPTION
+            code = int(answer)
+        elif answer:
+            flags |= FLAG_TEXT
+            code = text_index.setdefault(answer, len(text_index))
+            if code > MAX_CODE:
+                raise PackingError("Too many distinct text answers for one packed session")
+        else:
+            code = 0
+
+        records.append(_RECORD.pack(qidx, flags, _quantize_time(response.response_time), code))
+
+    parts = [_HEADER.pack(MAGIC, VERSION, len(records), len(question_index), len(text_index))]
+    for question_id in question_index:
+        encoded = question_id.encode('ascii')
+        if len(encoded) > 0xFF:
+            raise PackingError(f"Question id too long to pack: {question_id!r}")
+        parts.append(_U8.pack(len(encoded)) + encoded)
+    for text in text_index:
+        encoded = text.encode('utf-8')
+        parts.append(_U16.pack(len(encoded)) + encoded)
+    parts.extend(records)
+    return b''.join(parts)
+
+
+def unpack_responses(blob, test_session_id=None):
+    """Decode a packed blob into a list of PackedResponse objects"""
+    magic, version, record_count, question_count, text_count = _HEADER.unpack_from(blob, 0)
+    if magic != MAGIC or version != VERSION:
+        raise PackingError(f"Unsupported packed response blob (magic={magic!r}, version={version})")
+
+    offset = _HEADER.size
+    question_ids = []
+    for _ in range(question_count):
+        (length,) = _U8.unpack_from(blob, offset)
+        offset += _U8.size
+        question_ids.append(blob[offset:offset + length].decode('ascii'))
+        offset += length
+
+    texts = []
+    for _ in range(text_count):
+        (length,) = _U16.unpack_from(blob, offset)
+        offset += _U16.size
+        texts.append(blob[offset:offset + length].decode('utf-8'))
+        offset += length
+
+    responses = []
+    for qidx, flags, quantized_time, code in _RECORD.iter_unpack(blob[offset:offset + record_count * _RECORD.size]):
+        if flags & FLAG_OPTION:
+            answer = str(code)
+        elif flags & FLAG_TEXT:
+            answer = texts[code]
+        else:
+            answer = ''
+        response_time = None if quantized_time == TIME_UNKNOWN else quantized_time / TIME_SCALE
+        responses.append(PackedResponse(
+            test_session_id, question_ids[qidx], answer, bool(flags & FLAG_CORRECT), response_time
+        ))
+    return responses
@@ -0,0 +1,224 @@
+"""
+Read-through access to a session's responses, wherever they are stored.
+
+Live sessions keep one ``Response`` row per answer. Finished sessions may be
+packed into ``TestSession.packed_responses`` (see utils/response_packing.py)
+by ``scripts/pack_responses.py``, after which their rows are deleted, and old
+sessions may be moved to on-disk segments (see utils/response_archive.py) by
+``scripts/archive_responses.py``. Views that need per-answer data go through
+this module so every layout looks the same to them.
+
+Answers that leave the Response table are added to running per-(user,
+question) totals in ``OfflineResponseStat`` at the same time, so the
+analytics views sum a few rows instead of decoding every packed or archived
+session.
+"""
+
+from collections import defaultdict
+
+from extensions import db
+from models.offline_response_stat import OfflineResponseStat
+from models.question import Question
+from models.response import Response
+from models.test_session import TestSession
+from utils import queries
+from utils.response_archive import ArchiveError, read_archived_blob
+from utils.response_packing import PackingError, pack_responses, unpack_responses
+
+
+def attach_questions(responses):
+    """Set ``.question`` on decoded responses with a single Question query"""
+    question_ids = {response.question_id for response in responses}
+    if not question_ids:
+        return responses
+    questions = {q.id: q for q in Question.query.filter(Question.id.in_(question_ids)).all()}
+    for response in responses:
+        response.question = questions.get(response.question_id)
+    return responses
+
+
+def session_blob(session_id, packed_responses, archived_segment):
+    """The packed blob of a session from the database or its archive segment, if any"""
+    if packed_responses:
+        return packed_responses
+    if archived_segment:
+        return read_archived_blob(session_id, archived_segment)
+    return None
+
+
+def get_session_responses(session, with_questions=False):
+    """Return the responses of a session in answer order, from rows, the packed blob or the archive"""
+    if session.archived_segment or session.packed_responses:
+        blob = session_blob(session.id, session.packed_responses, session.archived_segment)
+        responses = unpack_responses(blob, session.id)
+        return attach_questions(responses) if with_questions else responses
+    return queries.session_response_rows(session.id).all()
+
+
+def _totals(responses):
+    totals = defaultdict(lambda: [0, 0, 0.0, 0])
+    for response in responses:
+        counts = totals[response.question_id]
+        counts[0] += 1
+        counts[1] += 1 if response.is_correct else 0
+        if response.response_time is not None:
+            counts[2] += response.response_time
+            counts[3] += 1
+    return totals
+
+
+def record_offline_responses(user_id, responses, sign=1):
+    """
+    Add responses that stop being Response rows to the user's offline totals
+    (sign=-1 removes responses that become rows again). The caller commits.
+    """
+    totals = _totals(responses)
+    if not totals:
+        return
+    existing = {row.question_id: row for row in OfflineResponseStat.query.filter(
+        OfflineResponseStat.user_id == user_id, OfflineResponseStat.question_id.in_(list(totals))
+    ).all()}
+    for question_id, (attempts, correct, time_sum, time_count) in totals.items():
+        row = existing.get(question_id)
+        if row is None:
+            row = OfflineResponseStat(user_id=user_id, question_id=question_id,
+                                      attempts=0, correct=0, time_sum=0.0, time_count=0)
+            db.session.add(row)
+        row.attempts += sign * attempts
+        row.correct += sign * correct
+        row.time_sum += sign * time_sum
+        row.time_count += sign * time_count
+
+
+def rebuild_offline_stats(batch_size=500):
+    """
+    Recompute every OfflineResponseStat row from the packed and archived
+    sessions, e.g. after upgrading a database whose sessions were packed
+    before the totals existed. Sessions whose blob cannot be read are left
+    out. Returns (rows written, ids of skipped sessions). The caller commits.
+    """
+    totals, skipped = defaultdict(lambda: [0, 0, 0.0, 0]), []
+    query = db.session.query(TestSession.id, TestSession.user_id, TestSession.packed_responses,
+                             TestSession.archived_segment)\
+        .filter(db.or_(TestSession.packed_responses.isnot(None), TestSession.archived_segment.isnot(None)))
+    for session_id, user_id, packed, segment in query.order_by(TestSession.id).yield_per(batch_size):
+        try:
+            responses = unpack_responses(session_blob(session_id, packed, segment), session_id)
+        except (ArchiveError, PackingError):
+            skipped.append(session_id)
+            continue
+        for question_id, counts in _totals(responses).items():
+            total = totals[user_id, question_id]
+            for i, value in enumerate(counts):
+                total[i] += value
+
+    db.session.execute(db.delete(OfflineResponseStat))
+    rows = [
+        {'user_id': user_id, 'question_id': question_id, 'attempts': attempts, 'correct': correct,
+         'time_sum': time_sum, 'time_count': time_count}
+        for (user_id, question_id), (attempts, correct, time_sum, time_count) in totals.items()
+    ]
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(db.insert(OfflineResponseStat), rows[start:start + batch_size])
+    return len(rows), skipped
+
+
+def pack_session(session):
+    """
+    Pack a finished session's Response rows into its blob and delete the rows.
+    Returns the number of responses packed (0 if there was nothing to pack).
+    The caller commits.
+    """
+    if session.end_time is None or session.packed_responses or session.archived_segment:
+        return 0
+
+    rows = Response.query.filter_by(test_session_id=session.id).order_by(Response.id).all()
+    if not rows:
+        return 0
+
+    session.packed_responses = pack_responses(rows)
+    record_offline_responses(session.user_id, rows)
+    Response.query.filter_by(test_session_id=session.id).delete(synchronize_session=False)
+    return len(rows)
+
+
+def unpack_session(session):
+    """
+    Restore Response rows from a packed session and clear its blob.
+    Response ids and created_at timestamps are not stored in the blob, so
+    restored rows get new ones. The caller commits.
+    """
+    if not session.packed_responses:
+        return 0
+
+    responses = unpack_responses(session.packed_responses, session.id)
+    for response in responses:
+        db.session.add(Response(
+            test_session_id=session.id,
+            question_id=response.question_id,
+            user_answer=response.user_answer,
+            is_correct=response.is_correct,
+            response_time=response.response_time
+        ))
+    record_offline_responses(session.user_id, responses, sign=-1)
+    session.packed_responses = None
+    return len(responses)
+
+
+def iter_offline_responses(user_id=None, session_ids=None, batch_size=500):
+    """
+    Yield decoded responses of packed and archived sessions, optionally for
+    one user or a set of sessions.
+    """
+    query = db.session.query(TestSession.id, TestSession.packed_responses, TestSession.archived_segment)\
+        .filter(db.or_(TestSession.packed_responses.isnot(None), TestSession.archived_segment.isnot(None)))
+    if user_id is not None:
+        query = query.filter(TestSession.user_id == user_id)
+    if session_ids is not None:
+        query = query.filter(TestSession.id.in_(session_ids))
+
+    for session_id, packed, segment in query.order_by(TestSession.id).yield_per(batch_size):
+        yield from unpack_responses(session_blob(session_id, packed, segment), session_id)
+
+
+def offline_response_stats(user_id=None):
+    """
+    Totals of packed and archived responses from OfflineResponseStat, grouped
+    the way the analytics views group rows. Returns {'category': {name:
+    [attempts, correct]}, 'difficulty': {...}, 'response_time': [sum, count]}.
+    """
+    stats = {}
+    for key, column in (('category', Question.category), ('difficulty', Question.difficulty)):
+        query = db.session.query(
+            column, db.func.sum(OfflineResponseStat.attempts), db.func.sum(OfflineResponseStat.correct)
+        ).join(Question, Question.id == OfflineResponseStat.question_id)
+        if user_id is not None:
+            query = query.filter(OfflineResponseStat.user_id == user_id)
+        stats[key] = {value: [attempts or 0, correct or 0]
+                      for value, attempts, correct in query.group_by(column).all() if attempts}
+
+    query = db.session.query(db.func.sum(OfflineResponseStat.time_sum), db.func.sum(OfflineResponseStat.time_count))
+    if user_id is not None:
+        query = query.filter(OfflineResponseStat.user_id == user_id)
+    time_sum, time_count = query.one()
+    stats['response_time'] = [time_sum or 0.0, time_count or 0]
+    return stats
+
+
+def merge_success_stats(rows, offline, key):
+    """
+    Combine SQL rows of (key, attempts, correct) with offline counts.
+    Returns a list of dicts with key, attempts and success_rate (0-1).
+    """
+    merged = defaultdict(lambda: [0, 0])
+    for value, attempts, correct in rows:
+        merged[value][0] += attempts or 0
+        merged[value][1] += correct or 0
+    for value, (attempts, correct) in offline.items():
+        merged[value][0] += attempts
+        merged[value][1] += correct
+
+    return [
+        {key: value, 'attempts': attempts, 'success_rate': (correct / attempts) if attempts else 0}
+        for value, (attempts, correct) in merged.items()
+    ]
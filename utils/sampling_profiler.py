@@ -0,0 +1,250 @@
+"""
+On-demand statistical profiler for live requests.
+
+An admin starts a capture from /admin/profiler, optionally limited to one
+endpoint, a percentage of requests and a time window. The capture is stored
+in ``PROFILER_DIR/control.json`` so every worker process picks it up within
+a second. While a selected request runs, a background thread samples its
+stack every ``interval_ms`` and counts collapsed stacks
+("endpoint;module:function;... count"), which each process writes to its
+own file. The download merges those files into one collapsed-stack file that
+flamegraph.pl, speedscope or inferno render as a flamegraph.
+
+With no capture running, the only per-request cost is a clock comparison
+and a cached check of the control file at most once per second.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, request
+
+from utils.memory_profiling import register_cache
+
+CONTROL_FILE = 'control.json'
+CONTROL_CHECK_INTERVAL = 1.0
+DEFAULT_INTERVAL_MS = 5
+MAX_STACK_DEPTH = 128
+
+
+class ProfilerError(ValueError):
+    """Raised for invalid capture settings"""
+
+
+class _ProcessState:
+    """Per-process view of the capture and the samples collected for it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.directory = None
+        self.capture = None
+        self.control_mtime = None
+        self.next_check = 0.0
+        # thread id -> endpoint of profiled requests currently running
+        self.targets = {}
+        # capture id -> Counter of collapsed stacks
+        self.stacks = {}
+        self.sampler = None
+        self.last_flush = 0.0
+
+
+_state = _ProcessState()
+register_cache('profiler_stacks', lambda: _state.stacks)
+
+
+def _control_path(directory=None):
+    return os.path.join(directory or _state.directory, CONTROL_FILE)
+
+
+def _stacks_path(capture_id, directory=None):
+    return os.path.join(directory or _state.directory, f'stacks-{capture_id}-{os.getpid()}.txt')
+
+
+def start_capture(directory, endpoint=None, percentage=100.0, duration=60, interval_ms=DEFAULT_INTERVAL_MS):
+    """Start a capture visible to every worker; returns the capture dict"""
+    if not 0 < percentage <= 100:
+        raise ProfilerError("Percentage must be between 0 and 100")
+    if not 0 < duration <= 3600:
+        raise ProfilerError("Duration must be between 1 second and 1 hour")
+    if not 1 <= interval_ms <= 1000:
+        raise ProfilerError("Sampling interval must be between 1 and 1000 ms")
+
+    now = time.time()
+    capture = {
+        'id': f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))}-{uuid.uuid4().hex[:6]}",
+        'endpoint': endpoint or None,
+        'percentage': float(percentage),
+        'interval_ms': int(interval_ms),
+        'started': now,
+        'until': now + duration,
+    }
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = _control_path(directory) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(capture, f)
+    os.replace(tmp_path, _control_path(directory))
+    return capture
+
+
+def stop_capture(directory):
+    """End the running capture early; collected stacks are kept"""
+    capture = read_capture(directory)
+    if capture and capture['until'] > time.time():
+        capture['until'] = time.time()
+        tmp_path = _control_path(directory) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(capture, f)
+        os.replace(tmp_path, _control_path(directory))
+    return capture
+
+
+def read_capture(directory):
+    try:
+        with open(_control_path(directory)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _active_capture():
+    """The capture that applies right now in this process, or None"""
+    now = time.monotonic()
+    if now >= _state.next_check:
+        _state.next_check = now + CONTROL_CHECK_INTERVAL
+        try:
+            mtime = os.path.getmtime(_control_path())
+        except OSError:
+            mtime = None
+        if mtime != _state.control_mtime:
+            _state.control_mtime = mtime
+            _state.capture = read_capture(_state.directory) if mtime else None
+
+    capture = _state.capture
+    if capture is None or time.time() >= capture['until']:
+        return None
+    return capture
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', os.path.basename(code.co_filename))
+    return f'{module}:{code.co_name}'
+
+
+def _collapse(frame, endpoint):
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(endpoint)
+    # Semicolons separate frames in the collapsed format
+    return ';'.join(label.replace(';', ':') for label in reversed(labels))
+
+
+def _flush(capture_id):
+    with _state.lock:
+        stacks = dict(_state.stacks.get(capture_id, ()))
+    if not stacks:
+        return
+    tmp_path = _stacks_path(capture_id) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        for stack, count in stacks.items():
+            f.write(f'{stack} {count}\n')
+    os.replace(tmp_path, _stacks_path(capture_id))
+
+
+def _sample_loop(capture):
+    interval = capture['interval_ms'] / 1000
+    own_id = threading.get_ident()
+    while time.time() < capture['until'] and _state.capture is capture:
+        time.sleep(interval)
+        with _state.lock:
+            targets = dict(_state.targets)
+        if targets:
+            frames = sys._current_frames()
+            samples = [
+                _collapse(frames[thread_id], endpoint)
+                for thread_id, endpoint in targets.items()
+                if thread_id != own_id and thread_id in frames
+            ]
+            with _state.lock:
+                _state.stacks.setdefault(capture['id'], Counter()).update(samples)
+        if time.monotonic() - _state.last_flush >= CONTROL_CHECK_INTERVAL:
+            _state.last_flush = time.monotonic()
+            _flush(capture['id'])
+    _flush(capture['id'])
+    with _state.lock:
+        _state.stacks.pop(capture['id'], None)
+        if _state.sampler is threading.current_thread():
+            _state.sampler = None
+
+
+def _ensure_sampler(capture):
+    with _state.lock:
+        sampler = _state.sampler
+        if sampler is not None and sampler.is_alive() and sampler.capture_id == capture['id']:
+            return
+        thread = threading.Thread(target=_sample_loop, args=(capture,), name='sampling-profiler', daemon=True)
+        thread.capture_id = capture['id']
+        _state.sampler = thread
+    thread.start()
+
+
+def collapsed_stacks(directory, capture_id):
+    """Merged collapsed stacks of every process for a capture, heaviest first"""
+    _flush(capture_id)
+    merged = Counter()
+    prefix = f'stacks-{capture_id}-'
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        if not (name.startswith(prefix) and name.endswith('.txt')):
+            continue
+        with open(os.path.join(directory, name)) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    merged[stack] += int(count)
+    return merged
+
+
+def list_captures(directory):
+    """Capture ids with stack files on disk, newest first"""
+    ids = set()
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        if name.startswith('stacks-') and name.endswith('.txt'):
+            ids.add(name[len('stacks-'):].rsplit('-', 1)[0])
+    return sorted(ids, reverse=True)
+
+
+def profiler_dir(app):
+    return app.config.get('PROFILER_DIR') or os.path.join(app.instance_path, 'profiles')
+
+
+def install_profiler(app):
+    """Register the request hooks that enrol requests in a running capture"""
+    _state.directory = profiler_dir(app)
+
+    @app.before_request
+    def enrol_in_capture():
+        capture = _active_capture()
+        if capture is None:
+            return
+        if capture['endpoint'] and request.endpoint != capture['endpoint']:
+            return
+        if capture['percentage'] < 100 and random.random() * 100 >= capture['percentage']:
+            return
+        with _state.lock:
+            _state.targets[threading.get_ident()] = request.endpoint or 'unmatched'
+        g._profiled = True
+        _ensure_sampler(capture)
+
+    @app.teardown_request
+    def leave_capture(exc=None):
+        if g.pop('_profiled', False):
+            with _state.lock:
+                _state.targets.pop(threading.get_ident(), None)
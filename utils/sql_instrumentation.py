@@ -0,0 +1,128 @@
+"""
+Per-request SQL instrumentation.
+
+Engine events count every statement a request executes and time it. After
+the view returns, the totals go into one log line and the request metrics
+(utils/metrics.py). When a single statement shape (the SQL text with
+parameter lists collapsed) runs more than ``SQL_N_PLUS_ONE_THRESHOLD`` times
+within a request, it is logged as a likely N+1.
+
+The totals are also sent as ``X-SQL-Queries`` / ``X-SQL-Time-Ms`` /
+``X-SQL-N-Plus-One`` response headers, but only in debug mode or to a
+logged-in admin: they reveal how much work a URL costs, which helps anyone
+looking for an expensive request to repeat.
+
+Statements outside a request (CLI scripts, migrations) are not tracked.
+"""
+
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+
+_WHITESPACE = re.compile(r'\s+')
+# "IN (?, ?, ?)" from expanding parameters, so batches of different sizes share a shape
+_PARAM_LIST = re.compile(r'\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+_STATS_KEY = '_sql_stats'
+
+
+class RequestSQLStats:
+    """Statements and DB time of the current request"""
+
+    __slots__ = ('count', 'duration', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def repeated(self, threshold):
+        """Statement shapes executed more than ``threshold`` times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+def statement_shape(statement):
+    """Normalize a SQL statement so repeats with different parameters compare equal"""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _PARAM_LIST.sub('(?)', shape)
+    return _NUMBER.sub('N', shape)
+
+
+def current_sql_stats():
+    """Stats for the active request, or None outside a request or when disabled"""
+    if not has_request_context():
+        return None
+    return g.get(_STATS_KEY)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_sql_stats() is not None:
+        conn.info.setdefault('_sql_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_sql_stats()
+    starts = conn.info.get('_sql_query_start')
+    if stats is None or not starts:
+        return
+    stats.duration += time.perf_counter() - starts.pop()
+    stats.count += 1
+    stats.shapes[statement_shape(statement)] += 1
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    starts = exception_context.connection.info.get('_sql_query_start') if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def _show_headers(app):
+    if app.debug:
+        return True
+    return current_user.is_authenticated and bool(getattr(current_user, 'is_admin', False))
+
+
+def install_sql_instrumentation(app, db):
+    """Listen to every engine and report per-request totals; call after db.init_app()"""
+    if not app.config.get('SQL_INSTRUMENTATION', True):
+        return
+
+    threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_sql_stats():
+        setattr(g, _STATS_KEY, RequestSQLStats())
+
+    @app.after_request
+    def report_sql_stats(response):
+        stats = current_sql_stats()
+        if stats is None:
+            return response
+
+        duration_ms = stats.duration * 1000
+        repeated = stats.repeated(threshold)
+        if _show_headers(app):
+            response.headers['X-SQL-Queries'] = str(stats.count)
+            response.headers['X-SQL-Time-Ms'] = f'{duration_ms:.2f}'
+            if repeated:
+                response.headers['X-SQL-N-Plus-One'] = str(len(repeated))
+
+        if repeated:
+            for shape, count in repeated:
+                app.logger.warning('Likely N+1 on %s %s: %d x %s', request.method, request.path, count, shape)
+
+        app.logger.info('%s %s -> %s: %d queries in %.2f ms', request.method, request.path,
+                        response.status_code, stats.count, duration_ms)
+        return response
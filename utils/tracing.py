@@ -0,0 +1,272 @@
+"""
+Minimal request tracing.
+
+A sampled request (``TRACE_SAMPLE_RATE``) gets a root span; inside it every
+SQL statement and every ``span(...)`` block (ScientificIQCalculator steps,
+commits in hot views) records a nested child span with its offset and
+duration. Finished traces go to an in-memory ring buffer of the worker
+(``TRACE_SINK=memory``) or are appended as one JSON line per trace to
+``TRACE_FILE`` (``TRACE_SINK=jsonl``), which every worker shares. Once the
+file would grow past ``TRACE_FILE_MAX_BYTES`` it is renamed to
+``TRACE_FILE.1`` (replacing the previous one) and a new file is started, so
+the sink holds at most about twice that. /admin/traces shows them as a
+waterfall.
+
+Outside a sampled request ``span()`` costs one context variable lookup.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+
+from utils.memory_profiling import register_cache
+from utils.sql_instrumentation import statement_shape
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SINKS = ('memory', 'jsonl')
+MAX_STATEMENT_LENGTH = 300
+
+_current_span = ContextVar('trace_span', default=None)
+
+_buffer = deque(maxlen=200)
+_file_lock = threading.Lock()
+_settings = {'sink': 'memory', 'file': None, 'max_spans': 1000, 'max_bytes': 0}
+
+register_cache('traces', lambda: _buffer)
+
+
+class Trace:
+    __slots__ = ('id', 'started', 'spans', 'dropped')
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+
+
+class Span:
+    __slots__ = ('trace', 'id', 'parent_id', 'name', 'start', 'end', 'attrs')
+
+    def __init__(self, trace, name, parent_id=None, attrs=None):
+        self.trace = trace
+        self.id = len(trace.spans) + trace.dropped + 1
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.attrs = attrs or {}
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def to_dict(self):
+        origin = self.trace.started
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            'id': self.id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round((end - self.start) * 1000, 3),
+            'attrs': self.attrs,
+        }
+
+
+def _child_span(name, attrs):
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    trace = parent.trace
+    if len(trace.spans) >= _settings['max_spans']:
+        trace.dropped += 1
+        return None
+    child = Span(trace, name, parent.id, attrs)
+    trace.spans.append(child)
+    return child
+
+
+@contextmanager
+def span(name, **attrs):
+    """Record a nested span when the current request is being traced"""
+    child = _child_span(name, attrs)
+    if child is None:
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_span.get() is None:
+        return
+    child = _child_span('sql', {'statement': statement_shape(statement)[:MAX_STATEMENT_LENGTH]})
+    if child is not None:
+        conn.info.setdefault('_trace_spans', []).append(child)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('_trace_spans')
+    if spans and _current_span.get() is not None:
+        spans.pop().finish()
+
+
+def _handle_error(exception_context):
+    spans = exception_context.connection.info.get('_trace_spans') if exception_context.connection else None
+    if spans:
+        failed = spans.pop()
+        failed.attrs['error'] = type(exception_context.original_exception).__name__
+        failed.finish()
+
+
+def _append_line(path, line, max_bytes):
+    """Append to the shared file, first rotating it to ``path.1`` if it would exceed max_bytes"""
+    with _file_lock, open(f'{path}.lock', 'a') as lock:
+        # Other workers append and rotate too; only one may rename at a time
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if max_bytes:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            if size and size + len(line) > max_bytes:
+                os.replace(path, f'{path}.1')
+        with open(path, 'a') as f:
+            f.write(line)
+
+
+def _emit(trace_dict):
+    if _settings['sink'] == 'jsonl':
+        line = json.dumps(trace_dict, separators=(',', ':')) + '\n'
+        _append_line(_settings['file'], line, _settings['max_bytes'])
+    else:
+        _buffer.append(trace_dict)
+
+
+def _tail_lines(path, count, block_size=65536):
+    """Last ``count`` lines of a file without reading all of it"""
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return []
+    with f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            read = min(block_size, position)
+            position -= read
+            f.seek(position)
+            data = f.read(read) + data
+    return [line for line in data.decode('utf-8', 'replace').splitlines() if line][-count:]
+
+
+def recent_traces(limit=100):
+    """Finished traces, newest first"""
+    if _settings['sink'] == 'jsonl':
+        traces = []
+        lines = _tail_lines(_settings['file'], limit)
+        if len(lines) < limit:
+            # The rest from before the last rotation
+            lines = _tail_lines(f"{_settings['file']}.1", limit - len(lines)) + lines
+        for line in lines:
+            try:
+                traces.append(json.loads(line))
+            except ValueError:
+                # A line still being appended by another worker
+                continue
+        return traces[::-1]
+    return list(_buffer)[::-1][:limit]
+
+
+def get_trace(trace_id, search=1000):
+    for trace in recent_traces(search):
+        if trace['id'] == trace_id:
+            return trace
+    return None
+
+
+def install_tracing(app, db):
+    """Sample requests into traces and hook SQL statements; call after db.init_app()"""
+    global _buffer
+    rate = app.config.get('TRACE_SAMPLE_RATE', 0.0)
+    sink = app.config.get('TRACE_SINK', 'memory')
+    if sink not in SINKS:
+        raise ValueError(f"Unknown TRACE_SINK {sink!r}; expected one of {', '.join(SINKS)}")
+
+    _settings['sink'] = sink
+    _settings['file'] = app.config.get('TRACE_FILE') or os.path.join(app.instance_path, 'traces.jsonl')
+    _settings['max_spans'] = app.config.get('TRACE_MAX_SPANS', 1000)
+    _settings['max_bytes'] = app.config.get('TRACE_FILE_MAX_BYTES', 0)
+    _buffer = deque(maxlen=app.config.get('TRACE_BUFFER_SIZE', 200))
+    if sink == 'jsonl':
+        os.makedirs(os.path.dirname(_settings['file']), exist_ok=True)
+
+    if rate <= 0:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_trace():
+        if rate < 1 and random.random() >= rate:
+            return
+        trace = Trace()
+        rule = request.url_rule.rule if request.url_rule else request.path
+        root = Span(trace, f'{request.method} {rule}', attrs={'path': request.path, 'endpoint': request.endpoint})
+        trace.spans.append(root)
+        g._trace_root = root
+        g._trace_token = _current_span.set(root)
+        g._trace_started_at = time.time()
+
+    @app.after_request
+    def tag_trace(response):
+        root = g.get('_trace_root')
+        if root is not None:
+            root.attrs['status'] = response.status_code
+            response.headers['X-Trace-Id'] = root.trace.id
+        return response
+
+    @app.teardown_request
+    def finish_trace(exc=None):
+        token = g.pop('_trace_token', None)
+        if token is None:
+            return
+        root = g.pop('_trace_root')
+        _current_span.reset(token)
+        root.finish()
+        if exc is not None:
+            root.attrs['error'] = type(exc).__name__
+
+        trace = root.trace
+        _emit({
+            'id': trace.id,
+            'name': root.name,
+            'started_at': g.pop('_trace_started_at', time.time()),
+            'duration_ms': round((root.end - root.start) * 1000, 3),
+            'pid': os.getpid(),
+            'dropped_spans': trace.dropped,
+            'spans': [s.to_dict() for s in trace.spans],
+        })
@@ -0,0 +1,146 @@
+"""
+Identity cache for Flask-Login's user_loader.
+
+Every authenticated request used to SELECT the full ``User`` row. The loader
+now returns a ``CachedUser`` built from a small per-worker TTL/LRU cache of
+the fields request handling reads (id, username, email, is_admin, age). Any
+other attribute loads the ORM ``User`` on first access, once per request, and
+attribute assignments are forwarded to it so existing handlers keep working.
+
+Entries are dropped whenever a User row is updated or deleted through the ORM
+in this process (profile update, admin changes). Other workers pick up such
+changes within ``USER_CACHE_TTL`` seconds. Misses always read the primary,
+also inside ``@read_replica`` views, so a lagging replica cannot log out a
+user who has just registered.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from extensions import db
+from models.user import User
+from utils.db_routing import using_primary
+from utils.memory_profiling import register_cache
+from utils.metrics import record_cache_lookup
+
+CACHED_FIELDS = ('id', 'username', 'email', 'is_admin', 'age')
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_settings = {'ttl': 30.0, 'size': 10000}
+
+register_cache('user', lambda: _cache)
+
+
+class CachedUser(UserMixin):
+    """current_user stand-in backed by cached fields, with the ORM User loaded lazily"""
+
+    def __init__(self, fields):
+        object.__setattr__(self, '_fields', fields)
+        object.__setattr__(self, '_user', None)
+
+    def get_user(self):
+        """The full ORM User, loaded on first use"""
+        user = self._user
+        if user is None:
+            with using_primary():
+                user = db.session.get(User, self._fields['id'])
+            object.__setattr__(self, '_user', user)
+        return user
+
+    def get_id(self):
+        return str(self._fields['id'])
+
+    def __getattr__(self, name):
+        # Only called for names not found normally: cached fields first, then the ORM row
+        fields = object.__getattribute__(self, '_fields')
+        if name in fields:
+            return fields[name]
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.get_user(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get_user(), name, value)
+        if name in self._fields:
+            self._fields[name] = value
+
+    def __repr__(self):
+        return f"<CachedUser {self._fields['username']}>"
+
+
+def _snapshot(user):
+    return {field: getattr(user, field) for field in CACHED_FIELDS}
+
+
+def load_user(user_id):
+    """Flask-Login user_loader: cached fields, or one SELECT on a miss"""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(user_id)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(user_id)
+            fields = dict(entry[1])
+        else:
+            fields = None
+    record_cache_lookup('user', fields is not None)
+    if fields is not None:
+        return CachedUser(fields)
+
+    with using_primary():
+        user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    fields = _snapshot(user)
+    with _lock:
+        _cache[user_id] = (now + _settings['ttl'], dict(fields))
+        _cache.move_to_end(user_id)
+        while len(_cache) > _settings['size']:
+            _cache.popitem(last=False)
+
+    cached = CachedUser(fields)
+    object.__setattr__(cached, '_user', user)
+    return cached
+
+
+def _load_user_uncached(user_id):
+    with using_primary():
+        return db.session.get(User, int(user_id))
+
+
+def invalidate_user(user_id):
+    with _lock:
+        _cache.pop(user_id, None)
+
+
+def clear_user_cache():
+    with _lock:
+        _cache.clear()
+
+
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+event.listen(User, 'after_update', _invalidate_on_change)
+event.listen(User, 'after_delete', _invalidate_on_change)
+
+
+def install_user_cache(app, login_manager):
+    """Register the cached loader with Flask-Login"""
+    _settings['ttl'] = app.config.get('USER_CACHE_TTL', 30.0)
+    _settings['size'] = app.config.get('USER_CACHE_SIZE', 10000)
+    if _settings['ttl'] <= 0:
+        login_manager.user_loader(_load_user_uncached)
+        return
+    login_manager.user_loader(load_user)
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for serving workers, e.g.
+
+    gunicorn --workers 4 wsgi:app
+"""
+from app import app
+from utils.metrics import registry
+
+# Only processes that serve requests share their metrics through METRICS_DIR;
+# scripts and shells that import the app leave no files behind
+registry.enable_flush()